@@ -1,18 +1,44 @@
 import numpy as np
-from scipy.fft import rfft, rfftfreq
-from typing import Optional
+from functools import partial
+from typing import Callable, Optional
 import threading
 import queue
-
-try:
-    import sounddevice as sd
-    AUDIO_AVAILABLE = True
-except (ImportError, OSError):
-    AUDIO_AVAILABLE = False
-
 import time
 
-from config import SAMPLE_RATE, CHUNK_SIZE, FFT_WINDOW, AUDIO_DEVICE
+from config import (
+    SAMPLE_RATE,
+    CHUNK_SIZE,
+    FFT_WINDOW,
+    AUDIO_DEVICE,
+    AUDIO_CHANNELS,
+    TONE_TRACKING,
+    TRACK_WINDOW_HZ,
+    TRACK_SMOOTHING,
+    TRACK_HOLD_FRAMES,
+    TRACK_SCAN_INTERVAL,
+    NOISE_GATE,
+)
+from metrics import FFT_FRAME_SECONDS, AUDIO_QUEUE_DEPTH, DSP_SKIPPED_FRAMES
+from tracker import ToneTracker
+
+# SciPy and sounddevice (PortAudio) are slow to import on the Pi, so they are
+# loaded on first use rather than at server start
+rfft = rfftfreq = None
+
+
+def _load_fft():
+    global rfft, rfftfreq
+    if rfft is None:
+        from scipy.fft import rfft as _rfft, rfftfreq as _rfftfreq
+        rfft, rfftfreq = _rfft, _rfftfreq
+
+
+def _load_sounddevice():
+    try:
+        import sounddevice
+        return sounddevice
+    except (ImportError, OSError):
+        return None
 
 
 class AudioAnalyzer:
@@ -23,9 +49,25 @@ class AudioAnalyzer:
     - Each miner controls their tone frequency via a slider
     - Server detects the frequency being played and compares to target
     - Pure sine tones are distinguished from voice/noise by checking spectral purity
+
+    Several microphones (`channels` inputs on each of one or more devices) are
+    analyzed together: one windowed FFT over a (channels, window) array per
+    frame, tones picked per channel, then fused so each tone comes from the
+    channel that hears it with the best SNR.
+
+    With tone tracking (tracker.py) each miner's tone is followed from frame to
+    frame with a narrow search, and the full scan only runs to find miners
+    that have no track.
+
+    Chunks arriving while nobody mines, or quieter than the noise gate
+    (NOISE_GATE), are not analyzed at all.
     """
 
-    def __init__(self):
+    def __init__(self, device=AUDIO_DEVICE, channels: int = AUDIO_CHANNELS, tracking: bool = TONE_TRACKING):
+        # sounddevice index or name (None for the system default), or a list of them
+        self.devices = list(device) if isinstance(device, (list, tuple)) else [device]
+        self.device = self.devices[0]
+        self.channels = channels  # Inputs captured per device
         self.sample_rate = SAMPLE_RATE
         self.chunk_size = CHUNK_SIZE
         self.fft_window = FFT_WINDOW
@@ -35,129 +77,346 @@ class AudioAnalyzer:
         self.max_freq = 2000  # Hz - maximum detectable frequency
         self.min_power_threshold = 5.0  # Minimum FFT power to consider a tone
         self.purity_threshold = 0.6  # Minimum purity to consider it a sine tone (0-1)
+        self.fundamental_bandwidth = 20  # Hz either side of a tone counted as its energy
+        # Frames quieter than this RMS are skipped. A Hann-windowed sine of RMS r
+        # peaks at about r * fft_window / (2 * sqrt(2)) in the spectrum, so below
+        # this no tone reaches min_power_threshold.
+        self.gate_rms = NOISE_GATE * self.min_power_threshold * 2 * np.sqrt(2) / self.fft_window
 
         self._audio_queue: queue.Queue = queue.Queue()
         self._running = False
-        self._stream = None
+        self._streams = []
         self._thread: Optional[threading.Thread] = None
+        self._feeder: Optional[threading.Thread] = None
+        self._window: Optional[np.ndarray] = None
+        self._freqs: Optional[np.ndarray] = None
 
         # Detected tones: list of (frequency, power, purity) for each detected pure tone
         self.detected_tones: list[tuple[float, float, float]] = []
+        # The same per input channel, with the tone's SNR: (frequency, power, purity, snr)
+        self.channel_tones: list[list[tuple[float, float, float, float]]] = []
 
         # Miner frequency assignments (user_id -> their current frequency from slider)
         self.miner_frequencies: dict[str, float] = {}
+        self.tracker: Optional[ToneTracker] = ToneTracker(
+            TRACK_WINDOW_HZ, TRACK_SMOOTHING, TRACK_HOLD_FRAMES, TRACK_SCAN_INTERVAL) if tracking else None
 
         self._last_log_time: float = 0.0
         self._log_interval: float = 2.0
 
-    def _audio_callback(self, indata, frames, time_info, status):
+        # Optional recorder.FlightRecorder fed from the analysis thread
+        self.recorder = None
+
+    @property
+    def input_channels(self) -> int:
+        """Microphones analyzed: channels per device times devices."""
+        return self.channels * len(self.devices)
+
+    def _audio_callback(self, device_index: int, indata, frames, time_info, status):
         if status:
             print(f"Audio status: {status}")
-        self._audio_queue.put(indata.copy())
+        self._audio_queue.put((device_index, indata.copy()))
 
-    def _calculate_spectral_purity(self, fft_result: np.ndarray, freqs: np.ndarray,
-                                    peak_freq: float, peak_power: float) -> float:
+    def _calculate_spectral_purity(self, spectra: np.ndarray, energy: np.ndarray, total_energy: np.ndarray,
+                                    freqs: np.ndarray, channels: np.ndarray, peak_freqs: np.ndarray,
+                                    peak_powers: np.ndarray) -> np.ndarray:
         """
-        Calculate how 'pure' a tone is (sine wave vs complex sound like voice).
+        Calculate how 'pure' each peak is (sine wave vs complex sound like voice).
 
         Pure sine wave: energy concentrated in fundamental frequency
         Voice/noise: energy spread across harmonics and other frequencies
 
-        Returns 0-1 where 1 is a perfect sine wave.
-        """
-        if peak_power < self.min_power_threshold:
-            return 0.0
+        Peaks come from any channel of the (channels, bins) spectra. `energy`
+        is the cumulative sum of spectra ** 2 along bins with a leading zero,
+        so a band's energy is a difference of two entries; `total_energy` is
+        each channel's energy in the detectable range.
 
-        # Define bandwidth around fundamental (±20 Hz)
-        fundamental_bandwidth = 20
-        mask_fundamental = (freqs >= peak_freq - fundamental_bandwidth) & \
-                          (freqs <= peak_freq + fundamental_bandwidth)
+        Returns 0-1 per peak where 1 is a perfect sine wave.
+        """
+        # Define bandwidth around fundamental (±20 Hz), and the 2nd, 3rd and 4th harmonics
+        fundamental_bandwidth = self.fundamental_bandwidth
+        centers = peak_freqs[:, np.newaxis] * np.arange(1, 5)
+        start, stop = self._bands(freqs, centers - fundamental_bandwidth, centers + fundamental_bandwidth)
 
         # Energy in fundamental region
-        fundamental_energy = np.sum(fft_result[mask_fundamental] ** 2)
-
-        # Total energy in detectable range
-        mask_range = (freqs >= self.min_freq) & (freqs <= self.max_freq)
-        total_energy = np.sum(fft_result[mask_range] ** 2)
-
-        if total_energy < 1e-10:
-            return 0.0
+        fundamental_energy = energy[channels, stop[:, 0]] - energy[channels, start[:, 0]]
 
         # Purity = ratio of fundamental energy to total energy
-        purity = fundamental_energy / total_energy
+        total_energy = total_energy[channels]
+        silent = total_energy < 1e-10
+        purity = fundamental_energy / np.where(silent, 1.0, total_energy)
 
         # Also check harmonics - pure sine should have minimal harmonic content
-        harmonic_penalty = 0.0
-        for harmonic in [2, 3, 4]:  # Check 2nd, 3rd, 4th harmonics
-            harmonic_freq = peak_freq * harmonic
-            if harmonic_freq > self.max_freq:
-                break
-            mask_harmonic = (freqs >= harmonic_freq - fundamental_bandwidth) & \
-                           (freqs <= harmonic_freq + fundamental_bandwidth)
-            if np.any(mask_harmonic):
-                harmonic_power = np.max(fft_result[mask_harmonic])
-                # Penalize if harmonics are significant relative to fundamental
-                if harmonic_power > peak_power * 0.1:  # More than 10% of fundamental
-                    harmonic_penalty += 0.1
-
-        purity = max(0.0, purity - harmonic_penalty)
-        return min(1.0, purity)
+        harmonic_power = self._band_max(spectra, channels[:, np.newaxis], start[:, 1:], stop[:, 1:])
+        # Penalize if harmonics (in range) are significant relative to fundamental: more than 10%
+        significant = (centers[:, 1:] <= self.max_freq) & (harmonic_power > peak_powers[:, np.newaxis] * 0.1)
+        harmonic_penalty = significant.sum(axis=1) * 0.1
+
+        purity = np.minimum(np.maximum(purity - harmonic_penalty, 0.0), 1.0)
+        purity[silent | (peak_powers < self.min_power_threshold)] = 0.0
+        return purity
+
+    @staticmethod
+    def _bands(freqs: np.ndarray, low, high) -> tuple[np.ndarray, np.ndarray]:
+        """Bin ranges [start, stop) with low <= freq <= high (freqs is ascending)."""
+        return np.searchsorted(freqs, low, side="left"), np.searchsorted(freqs, high, side="right")
+
+    @staticmethod
+    def _band_max(spectra: np.ndarray, channels: np.ndarray, start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+        """Peak magnitude of each band (a few bins wide), -inf for empty bands."""
+        width = int((stop - start).max(initial=0))
+        if width <= 0:
+            return np.full(start.shape, -np.inf)
+        bins = start[..., np.newaxis] + np.arange(width)
+        values = spectra[channels[..., np.newaxis], np.minimum(bins, spectra.shape[1] - 1)]
+        return np.where(bins < stop[..., np.newaxis], values, -np.inf).max(axis=-1)
 
     def _find_pure_tones(self, fft_result: np.ndarray, freqs: np.ndarray) -> list[tuple[float, float, float]]:
         """
         Find all pure sine tones in the spectrum.
         Returns list of (frequency, power, purity) tuples.
         """
-        tones = []
-
-        # Mask for valid frequency range
-        mask = (freqs >= self.min_freq) & (freqs <= self.max_freq)
-        valid_freqs = freqs[mask]
-        valid_fft = fft_result[mask]
+        return [tone[:3] for tone in self._find_channel_tones(fft_result[np.newaxis], freqs)[0]]
 
-        if len(valid_fft) == 0:
+    def _find_channel_tones(self, spectra: np.ndarray, freqs: np.ndarray) -> list[list[tuple]]:
+        """
+        Pure tones in each row of a (channels, bins) magnitude array, as
+        (frequency, power, purity, snr). SNR is the peak over the median
+        magnitude of the channel's detectable range (its noise floor).
+        Peaks of all channels are scored together.
+        """
+        start, stop = (int(edge) for edge in self._bands(freqs, self.min_freq, self.max_freq))
+        channel_tones = [[] for _ in spectra]
+        valid = spectra[:, start:stop]
+        if valid.shape[1] < 3:
+            return channel_tones
+
+        # Find local maxima (peaks) above the power threshold
+        inner = valid[:, 1:-1]
+        is_peak = (inner > valid[:, :-2]) & (inner > valid[:, 2:]) & (inner > self.min_power_threshold)
+        # Sort by power and take top peaks (max 10 per channel); equal powers keep frequency order
+        candidates = np.where(is_peak, inner, -np.inf)
+        order = np.argsort(-candidates, axis=1, kind="stable")[:, :10]
+        channels, rank = np.nonzero(np.isfinite(np.take_along_axis(candidates, order, axis=1)))
+        if len(channels) == 0:
+            return channel_tones
+        peak_bins = order[channels, rank] + start + 1
+        peak_freqs = freqs[peak_bins]
+        peak_powers = spectra[channels, peak_bins]
+
+        energy, total_energy = self._energy(spectra, freqs, start, stop)
+        purity = self._calculate_spectral_purity(spectra, energy, total_energy, freqs,
+                                                 channels, peak_freqs, peak_powers)
+        pure = np.flatnonzero(purity >= self.purity_threshold)
+        if len(pure) == 0:
+            return channel_tones
+        noise_floor = self._noise_floor(valid)
+
+        # These are likely pure sine tones from phones
+        for i in pure:
+            channel = channels[i]
+            channel_tones[channel].append((peak_freqs[i], peak_powers[i], purity[i],
+                                           peak_powers[i] / noise_floor[channel]))
+        return channel_tones
+
+    def _find_tones_near(self, spectra: np.ndarray, freqs: np.ndarray, centers: np.ndarray,
+                         half_width: float) -> list[Optional[tuple[float, float, float, float]]]:
+        """
+        For each center frequency, the strongest bin within ±half_width Hz on
+        the channel where that bin has the best SNR, if it is a pure tone by the
+        same tests as the full scan: (frequency, power, purity, snr), or None.
+        Only one candidate per center is scored for purity.
+        """
+        tones = [None] * len(centers)
+        start, stop = (int(edge) for edge in self._bands(freqs, self.min_freq, self.max_freq))
+        # Peaks must have a neighbour on both sides inside the detectable range
+        low, high = self._bands(freqs, centers - half_width, centers + half_width)
+        low = np.maximum(low, start + 1)
+        high = np.minimum(high, stop - 1)
+        width = int((high - low).max(initial=0))
+        if width <= 0:
             return tones
 
-        # Find local maxima (peaks)
-        peaks = []
-        for i in range(1, len(valid_fft) - 1):
-            if valid_fft[i] > valid_fft[i-1] and valid_fft[i] > valid_fft[i+1]:
-                if valid_fft[i] > self.min_power_threshold:
-                    peaks.append((valid_freqs[i], valid_fft[i]))
-
-        # Sort by power and take top peaks
-        peaks.sort(key=lambda x: x[1], reverse=True)
-        peaks = peaks[:10]  # Max 10 peaks to analyze
-
-        for freq, power in peaks:
-            purity = self._calculate_spectral_purity(fft_result, freqs, freq, power)
-            if purity >= self.purity_threshold:
-                # This is likely a pure sine tone from a phone
-                tones.append((freq, power, purity))
-
+        # Window bins per center; bins past a window's end repeat its first bin
+        window_bins = low[:, np.newaxis] + np.arange(width)
+        window_bins = np.where(window_bins < high[:, np.newaxis], window_bins, low[:, np.newaxis])
+        # Strongest bin of each window on each channel: (channels, centers)
+        peak_bins = window_bins[np.arange(len(centers)), spectra[:, window_bins].argmax(axis=-1)]
+        channels = np.arange(len(spectra))[:, np.newaxis]
+        peak_powers = spectra[channels, peak_bins]
+        is_peak = ((peak_powers > spectra[channels, peak_bins - 1])
+                   & (peak_powers > spectra[channels, peak_bins + 1])
+                   & (peak_powers > self.min_power_threshold)
+                   & (high > low))
+        snr = np.where(is_peak, peak_powers / self._noise_floor(spectra[:, start:stop])[:, np.newaxis], -np.inf)
+
+        best = snr.argmax(axis=0)
+        found = np.flatnonzero(snr[best, np.arange(len(centers))] > -np.inf)
+        if len(found) == 0:
+            return tones
+        channels = best[found]
+        peak_bins = peak_bins[channels, found]
+        peak_powers = peak_powers[channels, found]
+        energy, total_energy = self._energy(spectra, freqs, start, stop)
+        purity = self._calculate_spectral_purity(spectra, energy, total_energy, freqs,
+                                                 channels, freqs[peak_bins], peak_powers)
+        for i in np.flatnonzero(purity >= self.purity_threshold):
+            tones[found[i]] = (freqs[peak_bins[i]], peak_powers[i], purity[i], snr[channels[i], found[i]])
         return tones
 
+    def _energy(self, spectra: np.ndarray, freqs: np.ndarray, start: int,
+                stop: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Cumulative spectra ** 2 along bins, with a leading zero, up to the
+        last bin a fundamental band can reach; and each channel's energy in
+        bins [start, stop).
+        """
+        limit = int(np.searchsorted(freqs, self.max_freq + self.fundamental_bandwidth, side="right"))
+        energy = np.zeros((len(spectra), limit + 1))
+        np.cumsum(spectra[:, :limit] ** 2, axis=1, out=energy[:, 1:])
+        return energy, energy[:, stop] - energy[:, start]
+
+    @staticmethod
+    def _noise_floor(valid: np.ndarray) -> np.ndarray:
+        """Median magnitude of each channel."""
+        middle = valid.shape[1] // 2
+        return np.maximum(np.partition(valid, middle, axis=1)[:, middle], 1e-12)
+
+    def _fuse_tones(self, channel_tones: list[list[tuple]]) -> list[tuple[float, float, float]]:
+        """
+        One tone list from per-channel lists. A phone heard by several
+        microphones peaks in the same bin on each of them, or a neighbouring
+        one; tones within a bin of a better one are taken as the same tone,
+        from the channel with the best SNR. Strongest (by SNR) first.
+        Miners' tones are fused per miner by the tracker instead.
+        """
+        if len(channel_tones) == 1:
+            return [tone[:3] for tone in channel_tones[0]]
+        bin_hz = self.sample_rate / self.fft_window
+        fused = []
+        tones = sorted((tone for tones in channel_tones for tone in tones), key=lambda tone: tone[3], reverse=True)
+        for tone in tones:
+            if all(abs(tone[0] - kept[0]) > bin_hz for kept in fused):
+                fused.append(tone)
+        return [tone[:3] for tone in fused]
+
+    def process_chunk(self, buffer: np.ndarray, chunk: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Slide a chunk into the analysis buffer, FFT it and update detected_tones.
+        `chunk` is (frames,) mono or (frames, channels); the buffer is (channels, fft_window).
+        Returns (buffer, fft_result, freqs), fft_result being (channels, bins).
+        """
+        buffer = self._slide(buffer, chunk)
+        fft_result, freqs = self.analyze(buffer)
+        return buffer, fft_result, freqs
+
+    def analyze(self, buffer: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """FFT the (channels, fft_window) buffer and update detected_tones. Returns (fft_result, freqs)."""
+        # Apply Hanning window and perform FFT, every channel in one call
+        _load_fft()
+        if self._window is None or len(self._window) != self.fft_window:
+            self._window = np.hanning(self.fft_window)
+            self._freqs = rfftfreq(self.fft_window, 1.0 / self.sample_rate)
+        fft_result = np.abs(rfft(buffer * self._window, axis=-1))
+        freqs = self._freqs
+
+        miners = dict(self.miner_frequencies)  # Set from the event loop thread
+        if self.tracker is None or not miners:
+            # Find all pure tones
+            self.channel_tones = self._find_channel_tones(fft_result, freqs)
+            self.detected_tones = self._fuse_tones(self.channel_tones)
+        else:
+            self._track_tones(fft_result, freqs, miners)
+        return fft_result, freqs
+
+    def _track_tones(self, spectra: np.ndarray, freqs: np.ndarray, miners: dict[str, float]):
+        """Follow tracked miners with a narrow search; full scan only for miners without a track."""
+        tracker = self.tracker
+        tracker.sync(miners)
+        if tracker.needs_scan(miners):
+            self.channel_tones = self._find_channel_tones(spectra, freqs)
+            tracker.observe_scan(self.channel_tones)
+            tracker.acquire(miners, self.channel_tones)
+        else:
+            self.channel_tones = []
+            if tracker.tracks:
+                user_ids = list(tracker.tracks)
+                centers = np.array([tracker.tracks[user_id].frequency for user_id in user_ids])
+                tracker.observe(user_ids, self._find_tones_near(spectra, freqs, centers, tracker.window_hz))
+        self.detected_tones = tracker.tones()
+
+    def is_silent(self, buffer: np.ndarray) -> bool:
+        """Whether every channel of the (channels, fft_window) buffer is below the noise gate."""
+        return float(np.max(np.mean(buffer * buffer, axis=-1))) < self.gate_rms * self.gate_rms
+
+    def _silent_frame(self):
+        """A gated frame: no tones heard. Held tracks count it as a miss."""
+        self.channel_tones = []
+        if self.tracker:
+            self.tracker.silence()
+            self.detected_tones = self.tracker.tones()
+        else:
+            self.detected_tones = []
+
+    def _slide(self, buffer: np.ndarray, chunk: np.ndarray) -> np.ndarray:
+        samples = np.atleast_2d(np.asarray(chunk).T)  # (channels, frames)
+        buffer = np.atleast_2d(buffer)
+        if buffer.shape != (len(samples), self.fft_window):
+            buffer = np.zeros((len(samples), self.fft_window))
+        # Shift buffer and add new data
+        shift = min(samples.shape[1], self.fft_window)
+        buffer = np.roll(buffer, -shift, axis=1)
+        buffer[:, -shift:] = samples[:, :shift]
+        return buffer
+
+    def warm_up(self):
+        """Import SciPy and run one FFT so the first real frame doesn't pay for it."""
+        channels = self.input_channels
+        self.process_chunk(np.zeros((channels, self.fft_window)), np.zeros((self.chunk_size, channels)))
+        self.detected_tones = []
+        self.channel_tones = []
+
     def _analysis_loop(self):
-        buffer = np.zeros(self.fft_window)
+        buffer = np.zeros((self.input_channels, self.fft_window))
+        # Latest chunk from each device; a frame is analyzed once every device has delivered
+        pending: list[Optional[np.ndarray]] = [None] * len(self.devices)
 
         while self._running:
             try:
-                data = self._audio_queue.get(timeout=0.1)
-                mono = data[:, 0] if data.ndim > 1 else data
-                mono = mono.flatten()
-
-                # Shift buffer and add new data
-                shift = min(len(mono), self.fft_window)
-                buffer = np.roll(buffer, -shift)
-                buffer[-shift:] = mono[:shift]
-
-                # Apply Hanning window and perform FFT
-                windowed = buffer * np.hanning(self.fft_window)
-                fft_result = np.abs(rfft(windowed))
-                freqs = rfftfreq(self.fft_window, 1.0 / self.sample_rate)
-
-                # Find all pure tones
-                self.detected_tones = self._find_pure_tones(fft_result, freqs)
+                device_index, data = self._audio_queue.get(timeout=0.1)
+                frame_start = time.perf_counter()
+                AUDIO_QUEUE_DEPTH.set(self._audio_queue.qsize())
+                # A device running slightly fast replaces its chunk instead of queueing up
+                pending[device_index] = data
+                if any(chunk is None for chunk in pending):
+                    continue
+                frames = min(len(chunk) for chunk in pending)
+                data = np.hstack([chunk[:frames].reshape(frames, -1) for chunk in pending])
+                pending = [None] * len(self.devices)
+                mono = data.mean(axis=1)
+
+                fft_result = None
+                if not self.miner_frequencies:
+                    # Nobody is mining: keep the buffer current but skip the FFT
+                    buffer = self._slide(buffer, data)
+                    self.detected_tones = []
+                    self.channel_tones = []
+                    if self.tracker:
+                        self.tracker.clear()
+                    DSP_SKIPPED_FRAMES.labels("no_miners").inc()
+                else:
+                    buffer = self._slide(buffer, data)
+                    if self.gate_rms > 0 and self.is_silent(buffer):
+                        # Nothing loud enough to be a tone: skip the FFT
+                        self._silent_frame()
+                        DSP_SKIPPED_FRAMES.labels("silence").inc()
+                    else:
+                        fft_result, freqs = self.analyze(buffer)
+                        FFT_FRAME_SECONDS.observe(time.perf_counter() - frame_start)
+                if self.recorder:
+                    # The ring is single-channel: record the downmix
+                    self.recorder.record_audio(mono)
+                    self.recorder.record_event("detections", {"tones": self.detected_tones})
 
                 # Periodic logging
                 now = time.time()
@@ -169,10 +428,15 @@ class AudioAnalyzer:
                         tones_str = " | ".join([f"{f:.0f}Hz (pwr:{p:.1f}, pur:{r:.2f})"
                                                for f, p, r in self.detected_tones])
                         print(f"[Audio] RMS:{rms:.4f} | Pure tones: {tones_str}")
+                    elif not self.miner_frequencies:
+                        print(f"[Audio] RMS:{rms:.4f} | No miners")
+                    elif fft_result is None:
+                        print(f"[Audio] RMS:{rms:.4f} | Silent (below noise gate)")
                     else:
                         # Show top FFT peaks for debugging when no pure tones found
-                        top_indices = np.argsort(fft_result)[-3:][::-1]
-                        top_peaks = [(int(freqs[i]), float(fft_result[i])) for i in top_indices if freqs[i] >= self.min_freq]
+                        loudest = fft_result.max(axis=0)  # Over channels
+                        top_indices = np.argsort(loudest)[-3:][::-1]
+                        top_peaks = [(int(freqs[i]), float(loudest[i])) for i in top_indices if freqs[i] >= self.min_freq]
                         if top_peaks:
                             peaks_str = " ".join([f"{f}Hz={p:.0f}" for f, p in top_peaks])
                             print(f"[Audio] RMS:{rms:.4f} | No pure tones | Top peaks: {peaks_str}")
@@ -183,7 +447,8 @@ class AudioAnalyzer:
                 print(f"Analysis error: {e}")
 
     def start(self):
-        if not AUDIO_AVAILABLE:
+        sd = _load_sounddevice()
+        if sd is None:
             print("Audio not available - running in simulation mode")
             self._running = True
             return
@@ -194,40 +459,75 @@ class AudioAnalyzer:
             devices = sd.query_devices()
             for i, dev in enumerate(devices):
                 if dev['max_input_channels'] > 0:
-                    marker = " <-- SELECTED" if AUDIO_DEVICE is not None and i == AUDIO_DEVICE else ""
+                    marker = " <-- SELECTED" if i in self.devices else ""
                     print(f"  [{i}] {dev['name']} (inputs: {dev['max_input_channels']}){marker}")
             print("===============================\n")
 
             self._running = True
-            self._stream = sd.InputStream(
-                device=AUDIO_DEVICE,
-                samplerate=self.sample_rate,
-                channels=1,
-                blocksize=self.chunk_size,
-                callback=self._audio_callback,
-            )
-            self._stream.start()
-
-            device_info = sd.query_devices(AUDIO_DEVICE, 'input') if AUDIO_DEVICE is not None else sd.query_devices(kind='input')
-            print(f"Audio analyzer started on device {AUDIO_DEVICE}: {device_info['name']}")
+            self._streams = []
+            for index, device in enumerate(self.devices):
+                stream = sd.InputStream(
+                    device=device,
+                    samplerate=self.sample_rate,
+                    channels=self.channels,
+                    blocksize=self.chunk_size,
+                    callback=partial(self._audio_callback, index),
+                )
+                self._streams.append(stream)
+                stream.start()
+
+                device_info = sd.query_devices(device, 'input') if device is not None else sd.query_devices(kind='input')
+                print(f"Audio analyzer started on device {device}: {device_info['name']} ({self.channels} channels)")
 
             self._thread = threading.Thread(target=self._analysis_loop, daemon=True)
             self._thread.start()
         except Exception as e:
             print(f"Failed to start audio: {e}")
             self._running = False
+            self._close_streams()
+
+    def start_synthetic(self, source: Callable[[int], np.ndarray]):
+        """
+        Run the analysis thread on generated audio instead of a microphone.
+        `source(frames)` must return `frames` mono samples, or (frames,
+        input_channels) samples; it is called at the real-time chunk rate,
+        like the sounddevice callback would be.
+        """
+        self._running = True
+        self._feeder = threading.Thread(target=self._synthetic_feed_loop, args=(source,), daemon=True)
+        self._feeder.start()
+        self._thread = threading.Thread(target=self._analysis_loop, daemon=True)
+        self._thread.start()
+        print("Audio analyzer started on synthetic source")
+
+    def _synthetic_feed_loop(self, source: Callable[[int], np.ndarray]):
+        period = self.chunk_size / self.sample_rate
+        next_chunk = time.monotonic()
+        while self._running:
+            chunk = source(self.chunk_size).reshape(self.chunk_size, -1)
+            # Split by device as the stream callbacks would deliver it
+            for index in range(len(self.devices)):
+                self._audio_queue.put((index, chunk[:, index * self.channels:(index + 1) * self.channels]))
+            next_chunk += period
+            time.sleep(max(0.0, next_chunk - time.monotonic()))
 
     def stop(self):
         self._running = False
-        if self._stream:
-            self._stream.stop()
-            self._stream.close()
-            self._stream = None
+        self._close_streams()
         if self._thread:
             self._thread.join(timeout=1.0)
             self._thread = None
+        if self._feeder:
+            self._feeder.join(timeout=1.0)
+            self._feeder = None
         print("Audio analyzer stopped")
 
+    def _close_streams(self):
+        for stream in self._streams:
+            stream.stop()
+            stream.close()
+        self._streams = []
+
     def set_miner_frequency(self, user_id: str, frequency: float):
         """Update a miner's current frequency (from their slider control)"""
         self.miner_frequencies[user_id] = frequency
@@ -242,24 +542,32 @@ class AudioAnalyzer:
         Calculate contributions for all miners based on frequency matching.
 
         For each miner, we:
-        1. Check if there's a detected pure tone near their frequency
+        1. Check if there's a detected pure tone near their frequency (their
+           track, when tracking, weighted by its confidence)
         2. Calculate how close that tone is to the target frequency
         3. Return contribution based on accuracy
 
         Returns: {user_id: {frequency: float, detected: bool, accuracy: float, contribution: float}}
         """
         result = {}
+        tracks = self.tracker.tracks if self.tracker else {}
 
         for user_id, miner_freq in self.miner_frequencies.items():
             # Find if there's a detected pure tone near the miner's frequency
             best_match = None
             best_distance = float('inf')
+            confidence = 1.0
 
-            for tone_freq, power, purity in self.detected_tones:
-                distance = abs(tone_freq - miner_freq)
-                if distance < tolerance_hz and distance < best_distance:
-                    best_match = (tone_freq, power, purity)
-                    best_distance = distance
+            track = tracks.get(user_id)
+            if track is not None and abs(track.frequency - miner_freq) < tolerance_hz:
+                best_match = (track.frequency, track.power, track.purity)
+                confidence = track.confidence
+            else:
+                for tone_freq, power, purity in self.detected_tones:
+                    distance = abs(tone_freq - miner_freq)
+                    if distance < tolerance_hz and distance < best_distance:
+                        best_match = (tone_freq, power, purity)
+                        best_distance = distance
 
             if best_match:
                 detected_freq, power, purity = best_match
@@ -269,7 +577,7 @@ class AudioAnalyzer:
                 # At ±100 Hz from target, accuracy = 0
                 max_error = 100.0  # Hz
                 accuracy = max(0.0, 1.0 - (freq_error / max_error))
-                contribution = accuracy * purity  # Weight by purity
+                contribution = accuracy * purity * confidence  # Weight by purity
 
                 result[user_id] = {
                     'frequency': detected_freq,
@@ -0,0 +1,163 @@
+"""
+Fixed-point balance table.
+
+Balances are integer minor units (UNITS_PER_COIN per coin) in one int64
+NumPy array indexed by a compact account number, so credits never
+accumulate float rounding error and a block's credits and rewards are
+applied in one vectorized pass. Amounts still travel as coins (floats) in
+transactions and messages; they are converted once, on the way in.
+
+`issued` counts every unit that entered the table (opening balances,
+grants, block subsidies), so supply is checked with a single sum.
+"""
+import sys
+from collections.abc import Sequence
+
+import numpy as np
+
+from config import UNITS_PER_COIN
+
+_INITIAL_CAPACITY = 1024
+
+
+def to_units(coins: float) -> int:
+    return round(coins * UNITS_PER_COIN)
+
+
+def to_coins(units: int) -> float:
+    return units / UNITS_PER_COIN
+
+
+def split_reward(total: int, shares: Sequence[float]) -> list[int]:
+    """Split `total` units by `shares` (summing to ~1). The rounding remainder goes to the largest share."""
+    rewards = [int(total * share) for share in shares]
+    if rewards:
+        largest = max(range(len(shares)), key=shares.__getitem__)
+        rewards[largest] += total - sum(rewards)
+    return rewards
+
+
+class AddressTable:
+    """Maps addresses to compact account numbers and back. Addresses are interned."""
+
+    def __init__(self):
+        self._numbers: dict[str, int] = {}
+        self.addresses: list[str] = []
+
+    def number(self, address: str) -> int:
+        number = self._numbers.get(address)
+        if number is None:
+            address = sys.intern(address)
+            number = len(self.addresses)
+            self._numbers[address] = number
+            self.addresses.append(address)
+        return number
+
+    def numbers(self, addresses) -> list[int]:
+        """number() for many addresses at once."""
+        lookup = self._numbers
+        table = self.addresses
+        result = []
+        for address in addresses:
+            number = lookup.get(address)
+            if number is None:
+                address = sys.intern(address)
+                number = len(table)
+                lookup[address] = number
+                table.append(address)
+            result.append(number)
+        return result
+
+    def get(self, address: str):
+        return self._numbers.get(address)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._numbers
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+
+class BalanceTable:
+    def __init__(self):
+        self.accounts = AddressTable()
+        self._units = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self.issued = 0
+
+    def __contains__(self, address: str) -> bool:
+        return address in self.accounts
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def open(self, address: str, units: int = 0) -> int:
+        """Account number for `address`, opening it with `units` if it is new."""
+        number = self.accounts.get(address)
+        if number is not None:
+            return number
+        number = self.accounts.number(address)
+        self._reserve(number + 1)
+        self._units[number] = units
+        self.issued += units
+        return number
+
+    def open_many(self, addresses: Sequence[str], units: Sequence[int]) -> np.ndarray:
+        """open() for many accounts at once. Returns their account numbers."""
+        start = len(self.accounts)
+        numbers = np.array(self.accounts.numbers(addresses), dtype=np.int64)
+        self._reserve(len(self.accounts))
+        new = numbers >= start
+        units = np.asarray(units, dtype=np.int64)[new]
+        self._units[numbers[new]] = units
+        self.issued += int(units.sum())
+        return numbers
+
+    def set_many(self, addresses: Sequence[str], units: Sequence[int]):
+        """set_units() for many accounts at once, opening any that are new."""
+        numbers = self.open_many(addresses, units)
+        units = np.asarray(units, dtype=np.int64)
+        self.issued += int(units.sum() - self._units[numbers].sum())
+        self._units[numbers] = units
+
+    def _reserve(self, size: int):
+        capacity = len(self._units)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        grown = np.zeros(capacity, dtype=np.int64)
+        grown[:len(self._units)] = self._units
+        self._units = grown
+
+    def units(self, number: int) -> int:
+        return int(self._units[number])
+
+    def set_units(self, number: int, units: int):
+        """Overwrite a balance; the difference counts as issued (or withdrawn)."""
+        self.issued += units - int(self._units[number])
+        self._units[number] = units
+
+    def debit(self, number: int, units: int):
+        self._units[number] -= units
+
+    def apply_block(self, receivers: np.ndarray, amounts: np.ndarray,
+                    miners: np.ndarray, rewards: np.ndarray, minted: int):
+        """Credit transaction receivers and miner rewards. `minted` is the new subsidy in the rewards."""
+        np.add.at(self._units, receivers, amounts)
+        np.add.at(self._units, miners, rewards)
+        self.issued += minted
+
+    def total(self) -> int:
+        return int(self._units[:len(self.accounts)].sum())
+
+    def negative_accounts(self) -> list[str]:
+        numbers = np.flatnonzero(self._units[:len(self.accounts)] < 0)
+        return [self.accounts.addresses[n] for n in numbers]
+
+    def snapshot(self) -> tuple[list[str], np.ndarray]:
+        """(addresses, balances) copies, account number order."""
+        return list(self.accounts.addresses), self._units[:len(self.accounts)].copy()
+
+    def recount(self, pending: int):
+        """Reset `issued` to the current total plus `pending` units held by the mempool (after a restore)."""
+        self.issued = self.total() + pending
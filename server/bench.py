@@ -0,0 +1,1219 @@
+"""
+Standalone benchmark suite for the DSP, ledger and websocket fan-out hot paths.
+
+Runs without a microphone or GPIO: audio is synthesized, websockets are
+in-process fakes and the ledger persists into a temporary directory.
+
+    python bench.py                       # full run, JSON to bench_results.json
+    python bench.py --quick               # fewer sizes/iterations (smoke run)
+    python bench.py --only ledger         # benchmarks whose name contains "ledger"
+    python bench.py --output run.json
+
+Compare two runs with: python bench.py --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import gc
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Optional
+
+import numpy as np
+
+import blockchain
+from blockchain import Blockchain, Block, Transaction
+from config import SAMPLE_RATE, CHUNK_SIZE, TICK_RATE
+
+# Benchmark name -> function(quick) -> list of result dicts
+BENCHMARKS: dict[str, Callable[[bool], list[dict]]] = {}
+
+
+def benchmark(name: str):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def measure(name: str, params: dict, fn: Callable[[Any], Any], setup: Optional[Callable[[], Any]] = None,
+            min_time: float = 0.5, max_iterations: int = 10_000, min_iterations: int = 5) -> dict:
+    """
+    Time fn(state) repeatedly, where state comes from setup() (untimed, run before every call).
+    Stops after min_time seconds of measured time or max_iterations calls.
+    """
+    samples = []
+    total = 0.0
+    while len(samples) < max_iterations and (total < min_time or len(samples) < min_iterations):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        total += elapsed
+
+    samples.sort()
+    result = {
+        "name": name,
+        "params": params,
+        "iterations": len(samples),
+        "mean_s": statistics.fmean(samples),
+        "median_s": samples[len(samples) // 2],
+        "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_s": samples[0],
+    }
+    params_str = " ".join(f"{k}={v}" for k, v in params.items())
+    print(f"  {name:36s} {params_str:28s} median {result['median_s'] * 1e3:10.4f} ms  "
+          f"p95 {result['p95_s'] * 1e3:10.4f} ms  ({len(samples)} runs)")
+    return result
+
+
+# --- Fixtures -------------------------------------------------------------
+
+def synth_audio(samples: int, tones: list[float], noise: float = 0.01, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(samples) / SAMPLE_RATE
+    signal = sum(0.2 * np.sin(2 * np.pi * f * t) for f in tones) if tones else np.zeros(samples)
+    return signal + rng.normal(0.0, noise, samples)
+
+
+def make_blockchain(users: int) -> tuple[Blockchain, list[str]]:
+    chain = Blockchain()
+    ids = [chain.create_user(f"user{i}").user_id for i in range(users)]
+    return chain, ids
+
+
+def fill_mempool(chain: Blockchain, ids: list[str], count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        a, b = rng.choice(len(ids), 2, replace=False)
+        # Keep senders solvent regardless of mempool size
+        chain.users[ids[a]].wallet.balance += 1.0
+        chain.add_transaction(ids[a], ids[b], 0.5, 0.01)
+
+
+class FakeWebSocket:
+    """Stands in for a websocket connection: send() just accounts for bytes."""
+
+    def __init__(self):
+        self.sent_bytes = 0
+        self.remote_address = ("127.0.0.1", 0)
+
+    async def send(self, payload: str):
+        self.sent_bytes += len(payload)
+
+
+# --- DSP ------------------------------------------------------------------
+
+@benchmark("dsp.frame")
+def bench_dsp_frame(quick: bool) -> list[dict]:
+    from audio import AudioAnalyzer
+
+    results = []
+    windows = [2048] if quick else [1024, 2048, 4096, 8192]
+    audio = synth_audio(CHUNK_SIZE * 8, [440.0, 600.0, 880.0])
+    for window in windows:
+        analyzer = AudioAnalyzer()
+        analyzer.fft_window = window
+        state = {"buffer": np.zeros(window), "offset": 0}
+
+        def run(_):
+            offset = state["offset"]
+            chunk = audio[offset:offset + CHUNK_SIZE]
+            state["offset"] = (offset + CHUNK_SIZE) % (len(audio) - CHUNK_SIZE)
+            state["buffer"], _, _ = analyzer.process_chunk(state["buffer"], chunk)
+
+        results.append(measure("dsp.frame", {"fft_window": window, "chunk": CHUNK_SIZE}, run))
+    return results
+
+
+@benchmark("dsp.multichannel")
+def bench_multichannel(quick: bool) -> list[dict]:
+    """
+    One analysis frame over N microphones: all channels in one batched FFT
+    versus N single-channel passes. Each channel hears the same phones at a
+    different level plus its own noise.
+    """
+    from audio import AudioAnalyzer
+
+    results = []
+    tones = [440.0, 600.0, 880.0]
+    single = None
+    for channels in ([1, 4] if quick else [1, 2, 4, 8, 16]):
+        chunk = np.stack([synth_audio(CHUNK_SIZE, tones, seed=c) * (1.0 + c) / channels
+                          for c in range(channels)], axis=1)
+        batched = AudioAnalyzer(channels=channels)
+        state = {"buffer": np.zeros((channels, batched.fft_window))}
+
+        def run_batched(_):
+            state["buffer"], _, _ = batched.process_chunk(state["buffer"], chunk)
+
+        result = measure("dsp.multichannel", {"channels": channels, "mode": "batched"}, run_batched)
+        if single is None:
+            single = result["median_s"]
+        result["per_channel_s"] = result["median_s"] / channels
+        result["vs_one_channel"] = result["median_s"] / single
+        results.append(result)
+
+        separate = [AudioAnalyzer() for _ in range(channels)]
+        buffers = [np.zeros(batched.fft_window) for _ in range(channels)]
+
+        def run_separate(_):
+            for c, analyzer in enumerate(separate):
+                buffers[c], _, _ = analyzer.process_chunk(buffers[c], chunk[:, c])
+
+        baseline = measure("dsp.multichannel", {"channels": channels, "mode": "separate"}, run_separate)
+        results.append(baseline)
+        print(f"  {'':36s} {'':28s} {result['per_channel_s'] * 1e3:.3f} ms/channel, "
+              f"{result['vs_one_channel']:.2f}x one channel, "
+              f"{baseline['median_s'] / result['median_s']:.2f}x faster than separate passes")
+    return results
+
+
+def tracking_frames(miners: int, frames: int, seed: int = 0) -> tuple[list[float], list[np.ndarray]]:
+    """
+    Miner frequencies and (CHUNK_SIZE, miners) chunks: each microphone hears
+    its own phone loudly and the others faintly. Phones fade, drop out for a
+    frame (10%) and the room has the odd clap (5% of frames).
+    """
+    rng = np.random.default_rng(seed)
+    freqs = [float(f) for f in rng.permutation(np.arange(320.0, 1180.0, 90.0))[:miners] + rng.uniform(0, 20, miners)]
+    t = np.arange(CHUNK_SIZE) / SAMPLE_RATE
+    tones = np.array([np.sin(2 * np.pi * f * t) for f in freqs])
+    chunks = []
+    for _ in range(frames):
+        levels = rng.uniform(0.3, 1.0, miners) * 0.2 * (rng.random(miners) >= 0.1)
+        noise = 0.2 if rng.random() < 0.05 else 0.01
+        mix = 0.05 + 0.95 * np.eye(miners)  # mic x phone attenuation
+        chunks.append(((mix * levels) @ tones + rng.normal(0.0, noise, (miners, CHUNK_SIZE))).T)
+    return freqs, chunks
+
+
+@benchmark("dsp.tracking")
+def bench_tracking(quick: bool) -> list[dict]:
+    """
+    Per-miner tone tracking against the stateless full scan, on the same
+    audio: CPU per analysis frame, and how steady each miner's contribution
+    is while they hold the target (its standard deviation over frames, and
+    the share of frames where it drops to zero).
+    """
+    from audio import AudioAnalyzer
+
+    results = []
+    for miners in ([1, 4] if quick else [1, 4, 8]):
+        freqs, chunks = tracking_frames(miners, 200)
+        for tracking in (False, True):
+            analyzer = AudioAnalyzer(channels=miners, tracking=tracking)
+            for i, freq in enumerate(freqs):
+                analyzer.set_miner_frequency(f"miner{i}", freq)
+
+            # Stability: one pass from a fresh start, each miner scored against its own frequency
+            buffer = np.zeros((miners, analyzer.fft_window))
+            contributions = []
+            for chunk in chunks:
+                buffer, _, _ = analyzer.process_chunk(buffer, chunk)
+                contributions.append([analyzer.get_miner_contributions(freq)[f"miner{i}"]["contribution"]
+                                      for i, freq in enumerate(freqs)])
+            contributions = np.array(contributions)
+
+            state = {"buffer": buffer, "frame": 0}
+
+            def run(_):
+                frame = state["frame"]
+                state["frame"] = (frame + 1) % len(chunks)
+                state["buffer"], _, _ = analyzer.process_chunk(state["buffer"], chunks[frame])
+
+            result = measure("dsp.tracking", {"miners": miners, "tracking": tracking}, run)
+            result["contribution_mean"] = float(contributions.mean())
+            result["contribution_std"] = float(contributions.std(axis=0).mean())
+            result["zero_frames"] = float((contributions == 0).mean())
+            print(f"  {'':36s} {'':28s} contribution mean {result['contribution_mean']:.3f}, "
+                  f"std {result['contribution_std']:.3f}, zero in {result['zero_frames']:.0%} of frames")
+            results.append(result)
+    return results
+
+
+@benchmark("recorder.overhead")
+def bench_recorder(quick: bool) -> list[dict]:
+    """Flight recorder cost per analysis frame, next to the frame itself, and freeze time."""
+    from audio import AudioAnalyzer
+    from recorder import FlightRecorder
+
+    results = []
+    audio = synth_audio(CHUNK_SIZE * 8, [440.0, 600.0, 880.0])
+    analyzer = AudioAnalyzer()
+    buffer = np.zeros(analyzer.fft_window)
+    buffer, _, _ = analyzer.process_chunk(buffer, audio[:CHUNK_SIZE])
+    frame = measure("dsp.frame", {"chunk": CHUNK_SIZE}, lambda _: analyzer.process_chunk(buffer, audio[:CHUNK_SIZE]))
+    results.append(frame)
+    for seconds in ([120] if quick else [60, 300]):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = FlightRecorder(os.path.join(directory, "recorder"), os.path.join(directory, "recordings"),
+                                      seconds, SAMPLE_RATE, 16 * 1024 * 1024, 2)
+            state = {"offset": 0}
+
+            def record(_):
+                offset = state["offset"]
+                state["offset"] = (offset + CHUNK_SIZE) % (len(audio) - CHUNK_SIZE)
+                recorder.record_audio(audio[offset:offset + CHUNK_SIZE])
+                recorder.record_event("detections", {"tones": analyzer.detected_tones})
+
+            params = {"window_s": seconds, "chunk": CHUNK_SIZE}
+            result = measure("recorder.record_frame", params, record)
+            result["share_of_frame"] = result["median_s"] / frame["median_s"]
+            results.append(result)
+            # Fill the ring so the freeze writes a full window
+            for _ in range(int(seconds * SAMPLE_RATE / CHUNK_SIZE) + 1):
+                record(None)
+
+            def freeze(_):
+                recorder.freeze("bench")
+                recorder.wait()
+
+            results.append(measure("recorder.freeze", params, freeze, min_time=0.0, min_iterations=3))
+            recorder.close()
+    return results
+
+
+@benchmark("dsp.find_pure_tones")
+def bench_find_pure_tones(quick: bool) -> list[dict]:
+    from audio import AudioAnalyzer
+    from scipy.fft import rfft, rfftfreq
+
+    results = []
+    analyzer = AudioAnalyzer()
+    window = analyzer.fft_window
+    freqs = rfftfreq(window, 1.0 / SAMPLE_RATE)
+    for tone_count in ([4] if quick else [0, 1, 4, 8]):
+        tones = list(np.linspace(350, 1150, tone_count)) if tone_count else []
+        spectrum = np.abs(rfft(synth_audio(window, tones) * np.hanning(window)))
+        results.append(measure("dsp.find_pure_tones", {"tones": tone_count},
+                               lambda _: analyzer._find_pure_tones(spectrum, freqs)))
+    return results
+
+
+@benchmark("dsp.miner_contributions")
+def bench_miner_contributions(quick: bool) -> list[dict]:
+    from audio import AudioAnalyzer
+
+    results = []
+    for miners in ([4, 64] if quick else [4, 16, 64, 256, 1024]):
+        analyzer = AudioAnalyzer()
+        miner_freqs = np.linspace(300, 1200, miners)
+        for i, freq in enumerate(miner_freqs):
+            analyzer.set_miner_frequency(f"miner{i}", float(freq))
+        # Every other miner is audible
+        analyzer.detected_tones = [(float(f) + 3.0, 50.0, 0.9) for f in miner_freqs[::2]]
+        results.append(measure("dsp.miner_contributions", {"miners": miners},
+                               lambda _: analyzer.get_miner_contributions(600.0, 30.0)))
+    return results
+
+
+# --- Ledger ---------------------------------------------------------------
+
+@benchmark("ledger.add_transaction")
+def bench_add_transaction(quick: bool) -> list[dict]:
+    results = []
+    for mempool in ([0, 1000] if quick else [0, 100, 1000, 10_000]):
+        chain, ids = make_blockchain(100)
+        fill_mempool(chain, ids, mempool)
+        sender, receiver = ids[0], ids[1]
+        chain.users[sender].wallet.balance = 1e12
+        results.append(measure("ledger.add_transaction", {"mempool": mempool},
+                               lambda _: chain.add_transaction(sender, receiver, 1.0, 0.01),
+                               max_iterations=2000))
+    return results
+
+
+@benchmark("ledger.mine_block")
+def bench_mine_block(quick: bool) -> list[dict]:
+    results = []
+    for mempool in ([10, 1000] if quick else [10, 100, 1000, 10_000]):
+        chain, ids = make_blockchain(100)
+        contributions = {ids[i]: 0.5 + i * 0.1 for i in range(4)}
+
+        def setup():
+            fill_mempool(chain, ids, mempool)
+
+        results.append(measure("ledger.mine_block", {"mempool": mempool, "users": 100},
+                               lambda _: chain.mine_block(contributions), setup=setup,
+                               min_time=0.3, max_iterations=50))
+    return results
+
+
+@benchmark("ledger.apply_block")
+def bench_apply_block(quick: bool) -> list[dict]:
+    """Balance updates for one block: vectorized BalanceTable pass vs crediting wallets one at a time."""
+    from balances import to_units
+
+    results = []
+    for tx_count in ([10_000] if quick else [100, 1000, 10_000]):
+        chain, ids = make_blockchain(1000)
+        fill_mempool(chain, ids, tx_count)
+        pending = chain.pending_transactions
+        account = chain.balances.open
+        miners = np.array([account(uid) for uid in ids[:4]], dtype=np.int64)
+        rewards = np.full(4, to_units(12.5), dtype=np.int64)
+        params = {"transactions": tx_count, "accounts": 1000}
+
+        def vectorized(_):
+            receivers = np.fromiter((account(tx.to_address) for tx in pending), dtype=np.int64, count=len(pending))
+            amounts = np.fromiter((to_units(tx.amount) for tx in pending), dtype=np.int64, count=len(pending))
+            chain.balances.apply_block(receivers, amounts, miners, rewards, minted=0)
+
+        def per_wallet(_):
+            for miner_id in ids[:4]:
+                chain.users[miner_id].wallet.balance += 12.5
+            for tx in pending:
+                receiver = chain.get_user(tx.to_address)
+                if receiver:
+                    receiver.wallet.balance += tx.amount
+
+        results.append(measure("ledger.apply_block_vectorized", params, vectorized, min_iterations=3))
+        results.append(measure("ledger.apply_block_per_wallet", params, per_wallet, min_iterations=3))
+    for accounts in ([10_000] if quick else [1000, 100_000]):
+        chain, ids = make_blockchain(accounts)
+        fill_mempool(chain, ids, 1000)
+        results.append(measure("ledger.check_supply", {"accounts": accounts, "mempool": 1000},
+                               lambda _: chain.check_supply()))
+    return results
+
+
+@benchmark("ledger.calculate_hash")
+def bench_calculate_hash(quick: bool) -> list[dict]:
+    results = []
+    for tx_count in ([0, 100] if quick else [0, 10, 100, 1000]):
+        txs = [Transaction.create(f"a{i}", f"b{i}", 1.0, 0.01) for i in range(tx_count)]
+        block = Block(index=1, timestamp=time.time(), transactions=txs, previous_hash="0" * 64,
+                      miner_contributions={"m1": 0.5, "m2": 0.5}, total_reward=50.0)
+        results.append(measure("ledger.calculate_hash", {"transactions": tx_count},
+                               lambda _: block.calculate_hash()))
+    return results
+
+
+@benchmark("state.get_state")
+def bench_get_state(quick: bool) -> list[dict]:
+    results = []
+    for users in ([10, 1000] if quick else [10, 100, 1000, 10_000]):
+        chain, ids = make_blockchain(users)
+        for uid in ids[:4]:
+            chain.assign_miner_slot(uid)
+        results.append(measure("state.get_state", {"users": users},
+                               lambda _: json.dumps(chain.get_state()), max_iterations=2000))
+        results.append(measure("state.get_leaderboard", {"users": users},
+                               lambda _: json.dumps(chain.get_leaderboard()), max_iterations=2000))
+    return results
+
+
+def build_chain(blocks: int, tx_per_block: int, users: int = 100) -> tuple[Blockchain, list[str]]:
+    chain, ids = make_blockchain(users)
+    for uid in ids:
+        chain.users[uid].wallet.balance = 1e12
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, users, size=(blocks * tx_per_block, 2))
+    contributions = {ids[0]: 0.5, ids[1]: 0.5}
+    for height in range(blocks):
+        for a, b in pairs[height * tx_per_block:(height + 1) * tx_per_block]:
+            if a != b:
+                chain.add_transaction(ids[a], ids[b], 1.0, 0.01)
+        chain.mine_block(contributions)
+    return chain, ids
+
+
+@benchmark("ledger.history")
+def bench_history(quick: bool) -> list[dict]:
+    results = []
+    for blocks in ([100, 2000] if quick else [100, 1000, 10_000]):
+        chain, ids = build_chain(blocks, 10)
+        address = ids[5]
+        _, cursor = chain.get_history(address, limit=20)
+        tx_id = chain.chain[blocks // 2].transactions[0].tx_id
+        params = {"blocks": blocks, "transactions": blocks * 10}
+        results.append(measure("ledger.get_history_first_page", params,
+                               lambda _: chain.get_history(address, limit=50)))
+        results.append(measure("ledger.get_history_next_page", params,
+                               lambda _: chain.get_history(address, before=cursor, limit=50)))
+        results.append(measure("ledger.get_transaction", params,
+                               lambda _: chain.get_transaction(tx_id)))
+    return results
+
+
+@benchmark("explorer.latest")
+def bench_explorer(quick: bool) -> list[dict]:
+    from explorer import ChainExplorer
+
+    results = []
+    for blocks in ([1000] if quick else [1000, 10_000]):
+        chain, _ = build_chain(blocks, 10)
+        explorer = ChainExplorer(chain)
+        explorer.latest_response(50)  # Warm the header cache
+        params = {"blocks": blocks, "page": 50}
+        results.append(measure("explorer.latest_cached", params, lambda _: explorer.latest_response(50)))
+        # What serving the same page costs without the cache
+        results.append(measure("explorer.latest_to_dict", params,
+                               lambda _: json.dumps([b.to_dict() for b in chain.chain[-50:]])))
+    return results
+
+
+def synthetic_chain(blocks: int, tx_per_block: int, users: int = 100) -> tuple[list[Block], list[str]]:
+    """A valid, linked chain built directly (much faster than mining it through Blockchain)."""
+    from config import INITIAL_REWARD, HALVING_INTERVAL
+
+    ids = [f"user-{i:04d}" for i in range(users)]
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, users, size=(blocks * tx_per_block, 2))
+    chain = [Block(index=0, timestamp=0.0, transactions=[], previous_hash="0" * 64,
+                   miner_contributions={}, total_reward=0.0)]
+    for height in range(1, blocks + 1):
+        txs = [Transaction.create(ids[a], ids[(b + 1) % users if a == b else b], 1.0, 0.01, timestamp=float(height))
+               for a, b in pairs[(height - 1) * tx_per_block:height * tx_per_block]]
+        subsidy = INITIAL_REWARD / (2 ** (height // HALVING_INTERVAL))
+        chain.append(Block(index=height, timestamp=float(height), transactions=txs,
+                           previous_hash=chain[-1].hash, miner_contributions={ids[0]: 0.5, ids[1]: 0.5},
+                           total_reward=subsidy + sum(tx.fee for tx in txs)))
+    return chain, ids
+
+
+@benchmark("verify.chain")
+def bench_verify_chain(quick: bool) -> list[dict]:
+    from verify import verify_chain
+
+    results = []
+    cores = os.cpu_count() or 1
+    for blocks in ([10_000] if quick else [10_000, 100_000]):
+        chain, ids = synthetic_chain(blocks, 5)
+        opening = {uid: 1e12 for uid in ids}
+        for workers in sorted({1, cores}):
+            result = measure("verify.chain", {"blocks": blocks, "workers": workers},
+                             lambda _: verify_chain(chain, workers=workers, opening_balances=opening),
+                             min_time=0.0, min_iterations=1 if blocks > 10_000 else 3)
+            result["blocks_per_s"] = blocks / result["median_s"]
+            results.append(result)
+    return results
+
+
+def write_saved_state(directory: str, blocks: int, accounts: int, mempool: int, replay: int = 10):
+    """Block log, checkpoint `replay` blocks behind the tip, and users.json, as a restart would find them."""
+    from balances import to_units
+    from checkpoint import ChainStore
+
+    chain, ids = synthetic_chain(blocks, 5)
+    state = Blockchain(columnar=False)
+    state.persisted_users = {
+        f"device-{i}": {"user_id": ids[i] if i < len(ids) else f"account-{i}", "name": f"user{i}",
+                        "device_id": f"device-{i}", "balance": 1e6}
+        for i in range(accounts)
+    }
+    for record in state.persisted_users.values():
+        state.balances.open(record["user_id"], to_units(record["balance"]))
+    state.load_chain(chain[:blocks + 1 - replay])
+    state.pending_transactions = [Transaction.create(ids[i % len(ids)], ids[(i + 1) % len(ids)], 0.5, 0.01)
+                                  for i in range(mempool)]
+    store = ChainStore(directory)
+    for block in chain:
+        store.append_block(block)
+    store.checkpoint(state, {"tolerance_hz": 25.0})
+    store.close()
+    with open(os.path.join(directory, "users.json"), "w") as f:
+        json.dump(list(state.persisted_users.values()), f)
+    return state
+
+
+@benchmark("checkpoint.restore")
+def bench_checkpoint_restore(quick: bool) -> list[dict]:
+    """Cold start: users.json + block log + newest checkpoint + replay of the last 10 blocks."""
+    from checkpoint import ChainStore, snapshot
+
+    results = []
+    sizes = [(1000, 10_000, 1000)] if quick else [(1000, 1000, 100), (10_000, 10_000, 1000), (10_000, 100_000, 10_000)]
+    users_file = blockchain.USERS_FILE
+    for blocks, accounts, mempool in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            state = write_saved_state(directory, blocks, accounts, mempool)
+            blockchain.USERS_FILE = os.path.join(directory, "users.json")
+            params = {"blocks": blocks, "accounts": accounts, "mempool": mempool}
+
+            def cold_start(_):
+                store = ChainStore(directory)
+                store.restore(Blockchain())
+                store.close()
+
+            results.append(measure("checkpoint.cold_start", params, cold_start, min_time=0.0, min_iterations=3))
+            # The part of writing a checkpoint that runs on the event loop
+            results.append(measure("checkpoint.snapshot", params, lambda _: snapshot(state, {}), min_iterations=3))
+            blockchain.USERS_FILE = users_file
+    return results
+
+
+@benchmark("startup.imports")
+def bench_startup_imports(quick: bool) -> list[dict]:
+    """Fresh interpreter importing what runs before the websocket listener opens, vs. everything."""
+    import subprocess
+    import sys
+
+    eager = "import main, blockchain, checkpoint, explorer, verify, audio, recorder, scipy.fft"
+    results = []
+    for label, code in (("listener", "import main"), ("eager", eager)):
+        run = lambda _: subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       check=True)
+        results.append(measure("startup.imports", {"imports": label}, run, min_time=0.0,
+                               min_iterations=3 if quick else 10))
+    return results
+
+
+@benchmark("memory.confirmed_transactions")
+def bench_transaction_memory(quick: bool) -> list[dict]:
+    """Retained memory per 100k confirmed transactions (not a timing benchmark)."""
+    results = []
+    total = 20_000 if quick else 100_000
+    per_block = 100
+    for columnar in (False, True):
+        chain, ids = make_blockchain(200)
+        for uid in ids:
+            chain.users[uid].wallet.balance = 1e12
+        rng = np.random.default_rng(0)
+        pairs = rng.integers(0, len(ids), size=(total, 2))
+        gc.collect()
+        tracemalloc.start()
+        if columnar:
+            from txstore import ColumnarTransactionStore
+            chain.tx_store = ColumnarTransactionStore()
+        for start in range(0, total, per_block):
+            for a, b in pairs[start:start + per_block]:
+                # Recipient ids arrive as fresh strings from JSON, as in handle_transfer
+                chain.add_transaction(ids[a], "".join(ids[(b + 1) % len(ids)]), 1.0, 0.01)
+            chain.mine_block({ids[0]: 0.5, ids[1]: 0.5})
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result = {
+            "name": "memory.confirmed_transactions",
+            "params": {"columnar": columnar, "transactions": total},
+            "bytes_per_100k_tx": retained * 100_000 / total,
+            "peak_bytes": peak,
+        }
+        print(f"  {result['name']:36s} columnar={columnar!s:22s} "
+              f"{result['bytes_per_100k_tx'] / 1e6:8.1f} MB per 100k tx")
+        results.append(result)
+    return results
+
+
+# --- Websocket fan-out ----------------------------------------------------
+
+@benchmark("ws.broadcast")
+def bench_broadcast(quick: bool) -> list[dict]:
+    from main import SoundChainServer
+
+    results = []
+    loop = asyncio.new_event_loop()
+    server = SoundChainServer()
+    try:
+        for clients in ([10, 1000] if quick else [10, 100, 1000, 5000]):
+            server.connections = {f"user{i}": FakeWebSocket() for i in range(clients)}
+            message = {"type": "state", **server.blockchain.get_state()}
+            results.append(measure("ws.broadcast", {"clients": clients},
+                                   lambda _: loop.run_until_complete(server.broadcast(message)),
+                                   max_iterations=2000))
+    finally:
+        loop.close()
+    return results
+
+
+@benchmark("ws.transfer_batch")
+def bench_transfer_batch(quick: bool) -> list[dict]:
+    """A host paying every guest: one transfer_batch vs the same transfers as single messages."""
+    from main import SoundChainServer
+
+    results = []
+    loop = asyncio.new_event_loop()
+    server = SoundChainServer()
+    try:
+        for guests in ([100] if quick else [10, 100, 200]):
+            host = server.blockchain.create_user("host").user_id
+            ids = [server.blockchain.create_user(f"guest{i}").user_id for i in range(guests)]
+            server.connections = {uid: FakeWebSocket() for uid in [host] + ids}
+            singles = [{"to": uid, "amount": 0.5, "fee": 0.01} for uid in ids]
+
+            def setup():
+                server.blockchain.pending_transactions = []
+                server.blockchain.users[host].wallet.balance = 1e6
+
+            async def one_by_one():
+                for item in singles:
+                    await server.handle_transfer(host, item)
+
+            params = {"transfers": guests, "clients": guests + 1}
+            single = measure("ws.transfer_singles", params, lambda _: loop.run_until_complete(one_by_one()),
+                             setup=setup, min_iterations=3)
+            batch = measure("ws.transfer_batch", params,
+                            lambda _: loop.run_until_complete(
+                                server.handle_transfer_batch(host, {"transfers": singles})),
+                            setup=setup, min_iterations=3)
+            for result in (single, batch):
+                result["transfers_per_s"] = guests / result["median_s"]
+            results.extend([single, batch])
+            for uid in [host] + ids:
+                server.blockchain.remove_user(uid)
+    finally:
+        loop.close()
+    return results
+
+
+class _FakeWriter:
+    """Stands in for a front-end worker's socket."""
+
+    def __init__(self):
+        self.sent_bytes = 0
+        self.last = b""
+
+    def write(self, data: bytes):
+        self.sent_bytes += len(data)
+        self.last = data
+
+    def is_closing(self) -> bool:
+        return False
+
+    async def drain(self):
+        pass
+
+
+@benchmark("ws.frontend_broadcast")
+def bench_frontend_broadcast(quick: bool) -> list[dict]:
+    """
+    A state broadcast as the authority pays for it: one send per client over
+    real loopback websockets vs one frame per front-end worker, and what each
+    worker then does for its share of the clients.
+    """
+    import websockets
+    from frontend import FrontendLink, FrontendWorker, Outbox, RemoteConnection, write_frame
+    from main import SoundChainServer
+
+    async def open_connections(count: int):
+        accepted = []
+
+        async def handler(ws):
+            accepted.append(ws)
+            await ws.wait_closed()
+
+        async def discard(client):
+            async for _ in client:
+                pass
+
+        listener = await websockets.serve(handler, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        clients = [await websockets.connect(f"ws://127.0.0.1:{port}") for _ in range(count)]
+        readers = [asyncio.create_task(discard(client)) for client in clients]
+        while len(accepted) < count:
+            await asyncio.sleep(0.01)
+        return listener, clients, readers, accepted
+
+    async def close_connections(listener, clients, readers):
+        for client in clients:
+            await client.close()
+        for reader in readers:
+            reader.cancel()
+        listener.close()
+        await listener.wait_closed()
+
+    results = []
+    loop = asyncio.new_event_loop()
+    server = SoundChainServer()
+    try:
+        # A small room's state (~2 kB): large payloads would measure loopback throughput instead
+        for uid in range(20):
+            server.blockchain.create_user(f"guest{uid}")
+        message = {"type": "state", **server.blockchain.get_state()}
+        for clients in ([500] if quick else [100, 1000, 2000]):
+            listener, sockets, readers, accepted = loop.run_until_complete(open_connections(clients))
+            server.connections = {f"user{i}": ws for i, ws in enumerate(accepted)}
+            results.append(measure("ws.frontend_broadcast", {"clients": clients, "workers": 0},
+                                   lambda _: loop.run_until_complete(server.broadcast(message)),
+                                   max_iterations=500))
+
+            for workers in ([2] if quick else [1, 2, 4]):
+                links = [FrontendLink(_FakeWriter()) for _ in range(workers)]
+                server.connections = {f"user{i}": RemoteConnection(links[i % workers], i, ("127.0.0.1", 0))
+                                      for i in range(clients)}
+
+                async def broadcast_and_flush():
+                    await server.broadcast(message)
+                    await asyncio.sleep(0)  # Let the links flush their frames
+
+                results.append(measure("ws.frontend_broadcast", {"clients": clients, "workers": workers},
+                                       lambda _: loop.run_until_complete(broadcast_and_flush()),
+                                       max_iterations=500))
+
+                # One worker's part, in parallel with the others: read the frame, send to its share
+                worker = FrontendWorker(0, "")
+                share = clients // workers
+                worker.connections = dict(enumerate(accepted[:share]))
+
+                async def open_outboxes():
+                    return {conn_id: Outbox(ws) for conn_id, ws in worker.connections.items()}
+
+                worker.outboxes = loop.run_until_complete(open_outboxes())
+                sink = _FakeWriter()
+                write_frame(sink, ("send", [(list(range(share)), json.dumps(message))]))
+
+                async def fan_out_and_send():
+                    reader = asyncio.StreamReader(loop=loop)
+                    reader.feed_data(sink.last)
+                    reader.feed_eof()
+                    try:
+                        await worker._fan_out(reader)
+                    except asyncio.IncompleteReadError:
+                        pass
+                    while any(outbox.queue for outbox in worker.outboxes.values()):
+                        await asyncio.sleep(0)
+
+                results.append(measure("ws.frontend_fanout", {"clients": share, "workers": workers},
+                                       lambda _: loop.run_until_complete(fan_out_and_send()),
+                                       max_iterations=500))
+                for outbox in worker.outboxes.values():
+                    outbox.task.cancel()
+            loop.run_until_complete(close_connections(listener, sockets, readers))
+    finally:
+        loop.close()
+    return results
+
+
+@benchmark("ws.reconnect")
+def bench_reconnect(quick: bool) -> list[dict]:
+    """
+    A phone dropping and reconnecting: leave + re-join, suspend + resume by
+    token, and suspend + join with the same device_id (what the web and iOS
+    clients send), which must keep the miner's one slot.
+    """
+    from main import SoundChainServer
+
+    results = []
+    loop = asyncio.new_event_loop()
+    server = SoundChainServer()
+    try:
+        for clients in ([100] if quick else [10, 100, 1000]):
+            ids = [server.blockchain.create_user(f"guest{i}", device_id=f"device-{i}").user_id
+                   for i in range(clients)]
+            server.connections = {uid: FakeWebSocket() for uid in ids}
+            user_id = ids[0]
+            params = {"clients": clients}
+
+            async def drop():
+                # What handle_connection does when the socket closes
+                del server.connections[user_id]
+                if not server.sessions.suspend(user_id, server.clock.time()):
+                    server._forget_user(user_id)
+                    await server.broadcast_state()
+
+            async def rejoin():
+                await drop()
+                return await server.handle_join(FakeWebSocket(), {"name": "guest0", "device_id": "device-0"})
+
+            async def resume():
+                await drop()
+                await server.handle_join(FakeWebSocket(), {"resume_token": token})
+
+            server.sessions.grace_period = 0.0
+            results.append(measure("ws.reconnect_rejoin", params,
+                                   lambda _: loop.run_until_complete(rejoin()), min_iterations=3))
+            user_id = ids[0]
+            server.sessions.grace_period = 30.0
+            token = server.sessions.create(user_id)
+            results.append(measure("ws.reconnect_resume", params,
+                                   lambda _: loop.run_until_complete(resume()), min_iterations=3))
+            server.blockchain.assign_miner_slot(user_id)
+            results.append(measure("ws.reconnect_device", params,
+                                   lambda _: loop.run_until_complete(rejoin()), min_iterations=3))
+            slots = [uid for uid in server.blockchain.miner_slots if uid is not None]
+            if slots != [user_id] or not server.blockchain.get_user(user_id).is_miner:
+                raise RuntimeError(f"device_id rejoin during the grace period broke the miner slots: {slots}")
+            for uid in list(server.blockchain.users):
+                server.blockchain.remove_user(uid)
+    finally:
+        loop.close()
+    return results
+
+
+@benchmark("ratelimit.allow")
+def bench_ratelimit(quick: bool) -> list[dict]:
+    """Per-message limiter check, and that a message the budget rejects keeps its type token."""
+    from config import DEFAULT_RATE_LIMIT, MESSAGE_BUDGET, RATE_LIMITS
+    from ratelimit import ConnectionLimiter
+
+    # The budget (which doesn't refill) runs out while "transfer" still has tokens
+    limiter = ConnectionLimiter({"transfer": (1.0, 5)}, DEFAULT_RATE_LIMIT, budget=(0.0, 1))
+    limiter.allow("transfer")
+    for _ in range(3):
+        if limiter.allow("transfer"):
+            raise RuntimeError("ratelimit: allowed a message past an empty budget")
+    tokens = limiter._bucket("transfer", time.monotonic()).tokens
+    if tokens < 3.9:
+        raise RuntimeError(f"ratelimit: budget rejections consumed type tokens ({tokens:.2f} of 4 left)")
+
+    limiter = ConnectionLimiter(RATE_LIMITS, DEFAULT_RATE_LIMIT, MESSAGE_BUDGET)
+    return [measure("ratelimit.allow", {"type": "transfer"}, lambda _: limiter.allow("transfer"))]
+
+
+# --- Rooms ----------------------------------------------------------------
+
+@benchmark("rooms.tick")
+def bench_rooms(quick: bool) -> list[dict]:
+    """
+    One host mining tick over N busy rooms (4 miners, 20 clients and a pending
+    transfer each), and the rooms one core can carry once each room's FFT
+    thread is counted too.
+    """
+    from main import RoomHost, SoundChainServer
+    from config import MIN_MINER_FREQUENCY
+
+    results = []
+    loop = asyncio.new_event_loop()
+    frame = bench_dsp_frame(True)[0]["median_s"]
+    frame_share = frame * SAMPLE_RATE / CHUNK_SIZE  # CPU seconds per second of audio
+    with tempfile.TemporaryDirectory() as directory:
+        rooms = {}
+        try:
+            for count in ([1, 4] if quick else [1, 2, 4, 8, 16]):
+                while len(rooms) < count:
+                    room_id = f"room{len(rooms)}"
+                    room = SoundChainServer(room_id=room_id, data_dir=os.path.join(directory, room_id))
+                    chain = room.blockchain
+                    ids = [chain.create_user(f"guest{i}").user_id for i in range(20)]
+                    room.connections = {uid: FakeWebSocket() for uid in ids}
+                    for uid in ids[:4]:
+                        chain.assign_miner_slot(uid)
+                        # Off target, so contributions are scored every tick but no block is mined
+                        room.audio.set_miner_frequency(uid, MIN_MINER_FREQUENCY)
+                    room.audio.detected_tones = [(MIN_MINER_FREQUENCY, 50.0, 0.9)]
+                    chain.add_transaction(ids[4], ids[5], 0.5, 0.01)
+                    rooms[room_id] = room
+                host = RoomHost(dict(rooms))
+                result = measure("rooms.tick", {"rooms": count}, lambda _: loop.run_until_complete(host.tick()))
+                result["per_room_s"] = result["median_s"] / count
+                result["tick_share"] = result["median_s"] / TICK_RATE
+                # Each room also analyzes its own microphone in real time
+                result["rooms_per_core"] = 1.0 / (result["per_room_s"] / TICK_RATE + frame_share)
+                print(f"  {'':36s} {'':28s} {result['per_room_s'] * 1e3:.3f} ms/room/tick, "
+                      f"~{result['rooms_per_core']:.0f} rooms per core")
+                results.append(result)
+        finally:
+            for room in rooms.values():
+                room.close()
+            loop.close()
+    return results
+
+
+@benchmark("rooms.memory")
+def bench_room_memory(quick: bool) -> list[dict]:
+    """Python heap retained by one more loaded room vs. peak RSS of a separate server process."""
+    import subprocess
+    import sys
+    from main import SoundChainServer
+
+    with tempfile.TemporaryDirectory() as directory:
+        SoundChainServer(room_id="warm", data_dir=os.path.join(directory, "warm")).close()
+        gc.collect()
+        tracemalloc.start()
+        room = SoundChainServer(room_id="extra", data_dir=os.path.join(directory, "extra"))
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        room.close()
+
+    code = "import resource, main, audio, blockchain, checkpoint, scipy.fft; " \
+           "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            check=True, capture_output=True, text=True).stdout
+    process_bytes = int(output.split()[-1]) * 1024  # ru_maxrss is in KiB on Linux
+    result = {
+        "name": "rooms.memory",
+        "params": {},
+        "room_bytes": retained,
+        "process_bytes": process_bytes,
+    }
+    print(f"  {result['name']:36s} {'':28s} {retained / 1e6:8.2f} MB per room, "
+          f"{process_bytes / 1e6:8.1f} MB per extra process")
+    return [result]
+
+
+# --- Idle -----------------------------------------------------------------
+
+@benchmark("idle.mining_loop")
+def bench_idle_mining_loop(quick: bool) -> list[dict]:
+    """
+    A room with 20 clients and no miners: process CPU and ticks per second
+    with the mining loop ticking at TICK_RATE vs idling, and the delay from
+    become_miner to the next tick, with and without the wake event.
+    """
+    import main
+    from main import RoomHost, SoundChainServer
+
+    seconds = 2.0 if quick else 5.0
+    joins = 5 if quick else 20
+    results = []
+    loop = asyncio.new_event_loop()
+    with tempfile.TemporaryDirectory() as directory:
+        room = SoundChainServer(room_id="idle", data_dir=os.path.join(directory, "idle"))
+        ids = [room.blockchain.create_user(f"guest{i}").user_id for i in range(20)]
+        room.connections = {uid: FakeWebSocket() for uid in ids}
+        room.audio.warm_up()
+        room._dsp_warm = True
+        host = RoomHost({"idle": room})
+        ticks: list[float] = []
+        host_tick = host.tick
+
+        async def tick():
+            ticks.append(time.monotonic())
+            await host_tick()
+
+        async def run_for(ticking: Callable[[], Awaitable[None]], seconds: float):
+            host._running = True
+            task = asyncio.create_task(ticking())
+            await asyncio.sleep(seconds)
+            host._running = False
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        loops = {
+            "ticking": lambda: main._run_ticks(lambda: host._running, tick),
+            "idle": lambda: main._run_ticks(lambda: host._running, tick, host.is_idle, host.wake),
+        }
+        try:
+            for mode, ticking in loops.items():
+                ticks.clear()
+                cpu = time.process_time()
+                loop.run_until_complete(run_for(ticking, seconds))
+                cpu = time.process_time() - cpu
+                result = {
+                    "name": "idle.mining_loop",
+                    "params": {"mode": mode},
+                    "cpu_share": cpu / seconds,
+                    "ticks_per_s": len(ticks) / seconds,
+                }
+                print(f"  {result['name']:36s} {'mode=' + mode:28s} CPU {result['cpu_share']:7.3%}, "
+                      f"{result['ticks_per_s']:.1f} ticks/s")
+                results.append(result)
+
+            async def wake_delays(wake: asyncio.Event) -> list[float]:
+                host._running = True
+                task = asyncio.create_task(main._run_ticks(lambda: host._running, tick, host.is_idle, wake))
+                delays = []
+                for _ in range(joins):
+                    # Let the loop settle into its idle wait
+                    await asyncio.sleep(0.2)
+                    ticks.clear()
+                    joined = time.monotonic()
+                    await room.handle_become_miner(ids[0])
+                    while not ticks:
+                        await asyncio.sleep(0.001)
+                    delays.append(ticks[0] - joined)
+                    await room.handle_leave_mining(ids[0])
+                host._running = False
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                return delays
+
+            # Without the wake event the join is only noticed on the next idle tick
+            for wake in (False, True):
+                delays = sorted(loop.run_until_complete(wake_delays(host.wake if wake else asyncio.Event())))
+                result = {
+                    "name": "idle.wake_tick",
+                    "params": {"wake": wake},
+                    "iterations": len(delays),
+                    "median_s": delays[len(delays) // 2],
+                    "max_s": delays[-1],
+                }
+                print(f"  {result['name']:36s} {'wake=' + str(wake):28s} median {result['median_s'] * 1e3:10.4f} ms  "
+                      f"max {result['max_s'] * 1e3:10.4f} ms  ({len(delays)} joins)")
+                results.append(result)
+
+            async def leave_for_good():
+                # A miner drops without a grace period (as when a session expires) and a
+                # non-miner moves the slider: the analyzer must be back to skipping the FFT
+                await room.handle_become_miner(ids[1])
+                del room.connections[ids[1]]
+                room.sessions.grace_period = 0.0
+                if not room.sessions.suspend(ids[1], room.clock.time()):
+                    room._forget_user(ids[1])
+                await room.handle_set_frequency(ids[2], {"frequency": 500})
+
+            loop.run_until_complete(leave_for_good())
+            if not room.is_idle() or room.audio.miner_frequencies:
+                raise RuntimeError(f"analyzer still has miners after they left: {room.audio.miner_frequencies}")
+        finally:
+            room.close()
+            loop.close()
+    return results
+
+
+@benchmark("idle.dsp")
+def bench_idle_dsp(quick: bool) -> list[dict]:
+    """
+    The analysis thread fed in real time with a quiet room (-60 dBFS noise):
+    process CPU with no miners, and with a miner but the noise gate off and
+    on. Then the delay from the first chunk of a miner's tone to its
+    detection after a second of silence.
+    """
+    from audio import AudioAnalyzer
+
+    seconds = 2.0 if quick else 5.0
+    onsets = 3 if quick else 8
+    quiet = np.random.default_rng(0).normal(0.0, 0.001, CHUNK_SIZE * 16)
+    tone = synth_audio(CHUNK_SIZE * 16, [600.0], noise=0.001)
+    results = []
+    for miners, gate in ((0, True), (1, False), (1, True)):
+        analyzer = AudioAnalyzer()
+        analyzer.warm_up()
+        if not gate:
+            analyzer.gate_rms = 0.0
+        if miners:
+            analyzer.set_miner_frequency("miner0", 600.0)
+        state = {"audio": quiet, "offset": 0, "tone_at": None}
+
+        def source(frames: int) -> np.ndarray:
+            offset = state["offset"]
+            state["offset"] = (offset + frames) % (len(quiet) - frames)
+            audio = state["audio"]
+            if audio is tone and state["tone_at"] is None:
+                state["tone_at"] = time.monotonic()
+            return audio[offset:offset + frames]
+
+        analyzer.start_synthetic(source)
+        try:
+            cpu = time.process_time()
+            time.sleep(seconds)
+            cpu = time.process_time() - cpu
+            result = {
+                "name": "idle.dsp",
+                "params": {"miners": miners, "gate": gate},
+                "cpu_share": cpu / seconds,
+            }
+            params_str = f"miners={miners} gate={gate}"
+            print(f"  {result['name']:36s} {params_str:28s} CPU {result['cpu_share']:7.3%}")
+            results.append(result)
+            if not miners:
+                continue
+
+            delays = []
+            for _ in range(onsets):
+                state["tone_at"] = None
+                state["audio"] = tone
+                while not analyzer.detected_tones:
+                    time.sleep(0.001)
+                delays.append(time.monotonic() - state["tone_at"])
+                state["audio"] = quiet
+                time.sleep(1.0)
+            delays.sort()
+            result = {
+                "name": "idle.wake_tone",
+                "params": {"gate": gate},
+                "iterations": len(delays),
+                "median_s": delays[len(delays) // 2],
+                "max_s": delays[-1],
+            }
+            print(f"  {result['name']:36s} {'gate=' + str(gate):28s} median {result['median_s'] * 1e3:10.4f} ms  "
+                  f"max {result['max_s'] * 1e3:10.4f} ms  ({len(delays)} onsets)")
+            results.append(result)
+        finally:
+            analyzer.stop()
+    return results
+
+
+# --- Instrumentation ------------------------------------------------------
+
+@benchmark("metrics.overhead")
+def bench_metrics_overhead(quick: bool) -> list[dict]:
+    from metrics import Counter, Histogram
+
+    histogram = Histogram("bench_seconds", "bench", (0.001, 0.01, 0.1))
+    labelled = Histogram("bench_labelled_seconds", "bench", (0.001, 0.01, 0.1), ("type",))
+    counter = Counter("bench_total", "bench")
+    ops = 10_000
+
+    def run_many(fn):
+        def run(_):
+            for _ in range(ops):
+                fn()
+        return run
+
+    results = [
+        measure("metrics.counter_inc", {"ops": ops}, run_many(counter.inc)),
+        measure("metrics.histogram_observe", {"ops": ops}, run_many(lambda: histogram.observe(0.003))),
+        measure("metrics.labelled_observe", {"ops": ops}, run_many(lambda: labelled.labels("transfer").observe(0.003))),
+    ]
+    # A tick records on the order of 10 observations; report that as a share of the tick budget
+    for result in results:
+        result["tick_share"] = result["median_s"] / ops * 10 / TICK_RATE
+    return results
+
+
+# --- Runner ---------------------------------------------------------------
+
+def compare(old_path: str, new_path: str):
+    def load(path):
+        with open(path) as f:
+            return {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]}
+
+    old, new = load(old_path), load(new_path)
+    for key in sorted(old.keys() & new.keys()):
+        if "median_s" not in old[key]:
+            continue
+        before, after = old[key]["median_s"], new[key]["median_s"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{key[0]:36s} {key[1]:40s} {before * 1e3:10.4f} -> {after * 1e3:10.4f} ms  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and iterations")
+    parser.add_argument("--only", help="run benchmarks whose name contains this string")
+    parser.add_argument("--output", default="bench_results.json", help="JSON results path")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # Never touch the real data/users.json
+    tmp = tempfile.TemporaryDirectory()
+    blockchain.DATA_DIR = tmp.name
+    blockchain.USERS_FILE = os.path.join(tmp.name, "users.json")
+
+    results = []
+    started = time.time()
+    for name, fn in BENCHMARKS.items():
+        if args.only and args.only not in name:
+            continue
+        print(name)
+        results.extend(fn(args.quick))
+
+    report = {
+        "meta": {
+            "timestamp": started,
+            "duration_s": time.time() - started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
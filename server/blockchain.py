@@ -1,19 +1,35 @@
 import hashlib
 import json
 import os
+import sys
 import time
 import uuid
-from dataclasses import dataclass, field, asdict
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from dataclasses import dataclass
 from typing import Optional
 
-from config import INITIAL_REWARD, HALVING_INTERVAL, MIN_FEE, INITIAL_BALANCE, DEFAULT_MINER_FREQUENCY
+import numpy as np
+
+from balances import BalanceTable, to_units, to_coins, split_reward
+from clock import Clock, SYSTEM_CLOCK
+from config import (
+    INITIAL_REWARD,
+    HALVING_INTERVAL,
+    MIN_FEE,
+    INITIAL_BALANCE,
+    DEFAULT_MINER_FREQUENCY,
+    COLUMNAR_TX_STORE,
+    HISTORY_PAGE_SIZE,
+)
 
 # Path for persisting user data
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
 
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     tx_id: str
     from_address: str
@@ -23,28 +39,37 @@ class Transaction:
     timestamp: float
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        return {
+            "tx_id": self.tx_id,
+            "from_address": self.from_address,
+            "to_address": self.to_address,
+            "amount": self.amount,
+            "fee": self.fee,
+            "timestamp": self.timestamp,
+        }
 
     def validate(self) -> bool:
         return self.amount > 0 and self.fee >= MIN_FEE
 
     @staticmethod
-    def create(from_address: str, to_address: str, amount: float, fee: float) -> "Transaction":
+    def create(from_address: str, to_address: str, amount: float, fee: float,
+               timestamp: Optional[float] = None) -> "Transaction":
+        # Addresses are user ids; interning makes every transaction share the user's string
         return Transaction(
             tx_id=str(uuid.uuid4()),
-            from_address=from_address,
-            to_address=to_address,
+            from_address=sys.intern(from_address),
+            to_address=sys.intern(to_address),
             amount=amount,
             fee=fee,
-            timestamp=time.time(),
+            timestamp=time.time() if timestamp is None else timestamp,
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Block:
     index: int
     timestamp: float
-    transactions: list[Transaction]
+    transactions: Sequence[Transaction]
     previous_hash: str
     miner_contributions: dict[str, float]
     total_reward: float
@@ -77,17 +102,51 @@ class Block:
             "hash": self.hash,
         }
 
+    def to_record(self) -> tuple:
+        """Plain tuple form for pickling (block log, worker processes)."""
+        txs = [(tx.tx_id, tx.from_address, tx.to_address, tx.amount, tx.fee, tx.timestamp)
+               for tx in self.transactions]
+        return (self.index, self.timestamp, txs, self.previous_hash, self.miner_contributions,
+                self.total_reward, self.hash)
+
+    @staticmethod
+    def from_record(record: tuple) -> "Block":
+        """Inverse of to_record(). The stored hash is kept, not recomputed."""
+        index, timestamp, txs, previous_hash, contributions, total_reward, block_hash = record
+        return Block(
+            index=index,
+            timestamp=timestamp,
+            transactions=[Transaction(*tx) for tx in txs],
+            previous_hash=previous_hash,
+            miner_contributions=contributions,
+            total_reward=total_reward,
+            hash=block_hash,
+        )
+
 
-@dataclass
 class Wallet:
-    address: str
-    balance: float = 0.0
+    """A user's account in the Blockchain's BalanceTable, in coins."""
+
+    __slots__ = ("address", "_table", "_account")
+
+    def __init__(self, address: str, table: BalanceTable):
+        self.address = address
+        self._table = table
+        self._account = table.open(address)
+
+    @property
+    def balance(self) -> float:
+        return to_coins(self._table.units(self._account))
+
+    @balance.setter
+    def balance(self, coins: float):
+        self._table.set_units(self._account, to_units(coins))
 
     def to_dict(self) -> dict:
         return {"address": self.address, "balance": self.balance}
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     user_id: str
     name: str
@@ -120,34 +179,59 @@ class User:
 
 
 class Blockchain:
-    def __init__(self):
+    def __init__(self, clock: Clock = SYSTEM_CLOCK, columnar: bool = COLUMNAR_TX_STORE,
+                 data_dir: Optional[str] = None):
+        self.clock = clock
+        # users.json lives in data_dir (DATA_DIR by default)
+        self.data_dir = data_dir or DATA_DIR
+        self.users_file = os.path.join(data_dir, "users.json") if data_dir else USERS_FILE
         self.chain: list[Block] = []
+        # Confirmed transactions are packed into NumPy columns when enabled
+        self.tx_store = None
+        self._columnar = columnar
+        if columnar:
+            from txstore import ColumnarTransactionStore
+            self.tx_store = ColumnarTransactionStore()
+        # Confirmed transactions are numbered in chain order ("sequence numbers").
+        # _block_offsets[h] is the sequence number of block h's first transaction.
+        self._block_offsets = array("q")
+        self._tx_count = 0
+        self.tx_index: dict[str, int] = {}  # tx_id -> sequence number
+        self.address_index: dict[str, array] = {}  # address -> ascending sequence numbers
         self.pending_transactions: list[Transaction] = []
+        # Every known account's balance, persisted users included, in integer units
+        self.balances = BalanceTable()
         self.users: dict[str, User] = {}  # Active users by user_id
         self.persisted_users: dict[str, dict] = {}  # Persisted users by device_id
+        # Balance each address had when it first appeared this session (for chain replay)
+        self.opening_balances: dict[str, float] = {}
         self.miner_slots: list[Optional[str]] = [None] * 4
-        self.block_start_time: float = time.time()
+        self.block_start_time: float = clock.time()
         self._create_genesis_block()
         self._load_persisted_users()
 
     def _create_genesis_block(self):
         genesis = Block(
             index=0,
-            timestamp=time.time(),
+            timestamp=self.clock.time(),
             transactions=[],
             previous_hash="0" * 64,
             miner_contributions={},
             total_reward=0.0,
         )
+        self._index_block(genesis, [])
         self.chain.append(genesis)
 
     def _load_persisted_users(self):
         """Load persisted user data from disk"""
-        if os.path.exists(USERS_FILE):
+        if os.path.exists(self.users_file):
             try:
-                with open(USERS_FILE, "r") as f:
+                with open(self.users_file, "r") as f:
                     data = json.load(f)
                     self.persisted_users = {u["device_id"]: u for u in data if u.get("device_id")}
+                    records = self.persisted_users.values()
+                    self.balances.open_many([r["user_id"] for r in records],
+                                            [to_units(r.get("balance", INITIAL_BALANCE)) for r in records])
                     print(f"Loaded {len(self.persisted_users)} persisted users")
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Error loading users: {e}")
@@ -155,15 +239,20 @@ class Blockchain:
 
     def _save_persisted_users(self):
         """Save user data to disk"""
-        os.makedirs(DATA_DIR, exist_ok=True)
+        os.makedirs(self.data_dir, exist_ok=True)
         try:
-            # Merge active users into persisted data
+            # Merge active users into persisted data; offline users may have been credited too
             for user in self.users.values():
                 if user.device_id:
                     self.persisted_users[user.device_id] = user.to_persist_dict()
+            units = self.balances.units
+            for record in self.persisted_users.values():
+                number = self.balances.accounts.get(record["user_id"])
+                if number is not None:
+                    record["balance"] = to_coins(units(number))
 
             data = list(self.persisted_users.values())
-            with open(USERS_FILE, "w") as f:
+            with open(self.users_file, "w") as f:
                 json.dump(data, f, indent=2)
         except IOError as e:
             print(f"Error saving users: {e}")
@@ -177,7 +266,7 @@ class Blockchain:
         return INITIAL_REWARD / (2**halvings)
 
     def get_total_fees(self) -> float:
-        return sum(tx.fee for tx in self.pending_transactions)
+        return to_coins(sum(to_units(tx.fee) for tx in self.pending_transactions))
 
     def get_target_from_transactions(self) -> Optional[float]:
         """Calculate mining target (0.05-0.95) from pending transaction hashes.
@@ -203,20 +292,27 @@ class Blockchain:
         # Check if we have persisted data for this device
         if device_id and device_id in self.persisted_users:
             persisted = self.persisted_users[device_id]
-            user_id = persisted["user_id"]
-            balance = persisted.get("balance", INITIAL_BALANCE)
+            user_id = sys.intern(persisted["user_id"])
+            # The same device joining again over its active user: don't leave its slot behind
+            self.release_miner_slot(user_id)
+            # The table already holds the persisted balance (plus anything received while offline)
+            self.balances.open(user_id, to_units(persisted.get("balance", INITIAL_BALANCE)))
+            wallet = Wallet(user_id, self.balances)
+            balance = wallet.balance
             # Update name if changed
-            wallet = Wallet(address=user_id, balance=balance)
             user = User(user_id=user_id, name=name, wallet=wallet, device_id=device_id)
             self.users[user_id] = user
+            self.opening_balances.setdefault(user_id, balance)
             print(f"Restored user {name} (device: {device_id[:8]}...) with balance {balance}")
             return user
 
         # Create new user
-        user_id = str(uuid.uuid4())
-        wallet = Wallet(address=user_id, balance=INITIAL_BALANCE)
+        user_id = sys.intern(str(uuid.uuid4()))
+        self.balances.open(user_id, to_units(INITIAL_BALANCE))
+        wallet = Wallet(user_id, self.balances)
         user = User(user_id=user_id, name=name, wallet=wallet, device_id=device_id)
         self.users[user_id] = user
+        self.opening_balances[user_id] = INITIAL_BALANCE
 
         # Persist immediately if we have a device_id
         if device_id:
@@ -228,9 +324,15 @@ class Blockchain:
     def get_user(self, user_id: str) -> Optional[User]:
         return self.users.get(user_id)
 
+    def get_user_by_device(self, device_id: str) -> Optional[User]:
+        """The active (or suspended) user restored from device_id, if any."""
+        persisted = self.persisted_users.get(device_id)
+        user = self.users.get(persisted["user_id"]) if persisted else None
+        return user if user is not None and user.device_id == device_id else None
+
     def get_free_miner_slot(self) -> Optional[int]:
         for i, slot in enumerate(self.miner_slots):
-            if slot is None:
+            if slot is None or slot not in self.users:
                 return i
         return None
 
@@ -276,34 +378,77 @@ class Blockchain:
             self.release_miner_slot(user_id)
             del self.users[user_id]
 
-    def add_transaction(self, from_id: str, to_id: str, amount: float, fee: float) -> tuple[Optional[Transaction], Optional[str]]:
-        sender = self.get_user(from_id)
-        receiver = self.get_user(to_id)
-
-        if not sender:
-            return None, "Sender not found"
-
-        if not receiver:
-            return None, "Recipient not found"
+    def _check_transfer(self, to_id: str, amount: float, fee: float) -> Optional[str]:
+        """Validation shared by single and batched transfers, except the funds check."""
+        if not self.get_user(to_id):
+            return "Recipient not found"
 
         if amount <= 0:
-            return None, "Amount must be positive"
+            return "Amount must be positive"
 
         if fee < MIN_FEE:
-            return None, f"Fee too low (minimum: {MIN_FEE})"
+            return f"Fee too low (minimum: {MIN_FEE})"
 
-        total = amount + fee
-        if sender.wallet.balance < total:
-            return None, f"Insufficient funds (need {total:.2f}, have {sender.wallet.balance:.2f})"
+        return None
 
-        tx = Transaction.create(from_id, to_id, amount, fee)
+    def add_transaction(self, from_id: str, to_id: str, amount: float, fee: float) -> tuple[Optional[Transaction], Optional[str]]:
+        if not self.get_user(from_id):
+            return None, "Sender not found"
+
+        error = self._check_transfer(to_id, amount, fee)
+        if error:
+            return None, error
+
+        total = to_units(amount) + to_units(fee)
+        account = self.balances.accounts.get(from_id)
+        available = self.balances.units(account)
+        if available < total:
+            return None, f"Insufficient funds (need {to_coins(total):.2f}, have {to_coins(available):.2f})"
+
+        tx = Transaction.create(from_id, to_id, amount, fee, timestamp=self.clock.time())
 
         # Deduct immediately (pending state)
-        sender.wallet.balance -= total
+        self.balances.debit(account, total)
 
         self.pending_transactions.append(tx)
         return tx, None
 
+    def add_transactions(self, from_id: str, transfers: list[tuple[str, float, float]]
+                         ) -> list[tuple[Optional[Transaction], Optional[str]]]:
+        """
+        Validate (to_id, amount, fee) transfers from one sender together and queue the
+        accepted ones with a single debit and mempool extend. Transfers are taken in
+        order while the sender's balance covers them. Returns (tx, error) per transfer.
+        """
+        if not self.get_user(from_id):
+            return [(None, "Sender not found")] * len(transfers)
+
+        account = self.balances.accounts.get(from_id)
+        available = self.balances.units(account)
+        now = self.clock.time()
+        debit = 0
+        accepted = []
+        results = []
+        for to_id, amount, fee in transfers:
+            error = self._check_transfer(to_id, amount, fee)
+            if error:
+                results.append((None, error))
+                continue
+            total = to_units(amount) + to_units(fee)
+            if available - debit < total:
+                results.append((None, f"Insufficient funds (need {to_coins(total):.2f}, "
+                                      f"have {to_coins(available - debit):.2f})"))
+                continue
+            tx = Transaction.create(from_id, to_id, amount, fee, timestamp=now)
+            debit += total
+            accepted.append(tx)
+            results.append((tx, None))
+
+        if accepted:
+            self.balances.debit(account, debit)
+            self.pending_transactions.extend(accepted)
+        return results
+
     def mine_block(self, contributions: dict[str, float]) -> Optional[Block]:
         if not contributions:
             return None
@@ -315,53 +460,136 @@ class Blockchain:
         # Normalize contributions
         normalized = {k: v / total_contribution for k, v in contributions.items()}
 
-        # Calculate rewards
-        block_reward = self.get_block_reward()
-        total_fees = self.get_total_fees()
-        total_reward = block_reward + total_fees
-
-        # Distribute rewards to miners
-        rewards = {}
-        for miner_id, share in normalized.items():
-            user = self.get_user(miner_id)
-            if user:
-                reward = total_reward * share
-                user.wallet.balance += reward
-                rewards[miner_id] = reward
-
-        # Credit receivers for pending transactions
-        for tx in self.pending_transactions:
-            receiver = self.get_user(tx.to_address)
-            if receiver:
-                receiver.wallet.balance += tx.amount
+        # Senders were debited when their transactions entered the mempool; credit
+        # receivers (online or not) and pay miners in one vectorized pass
+        pending = self.pending_transactions
+        account = self.balances.open
+        receivers = np.fromiter((account(tx.to_address) for tx in pending), dtype=np.int64, count=len(pending))
+        amounts = np.fromiter((to_units(tx.amount) for tx in pending), dtype=np.int64, count=len(pending))
+        subsidy = to_units(self.get_block_reward())
+        total_units = subsidy + sum(to_units(tx.fee) for tx in pending)
+        miners = np.fromiter((account(miner_id) for miner_id in normalized), dtype=np.int64, count=len(normalized))
+        rewards = np.array(split_reward(total_units, list(normalized.values())), dtype=np.int64)
+        self.balances.apply_block(receivers, amounts, miners, rewards, minted=subsidy)
+        total_reward = to_coins(total_units)
 
         # Create block
         block = Block(
             index=len(self.chain),
-            timestamp=time.time(),
+            timestamp=self.clock.time(),
             transactions=self.pending_transactions.copy(),
             previous_hash=self.last_block.hash,
             miner_contributions=normalized,
             total_reward=total_reward,
         )
 
+        self._index_block(block, block.transactions)
+        if self.tx_store is not None:
+            block.transactions = self.tx_store.extend(block.transactions)
+
         self.chain.append(block)
         self.pending_transactions = []
-        self.block_start_time = time.time()
+        self.block_start_time = self.clock.time()
 
         # Persist user balances after mining
         self._save_persisted_users()
 
         return block
 
+    def check_supply(self) -> Optional[str]:
+        """
+        Cheap ledger invariants: every issued unit is either in a balance or held
+        by a pending transaction, and no balance is negative. Returns a problem or None.
+        """
+        pending = sum(to_units(tx.amount) + to_units(tx.fee) for tx in self.pending_transactions)
+        total = self.balances.total()
+        if total + pending != self.balances.issued:
+            return (f"balances {to_coins(total)} + pending {to_coins(pending)} "
+                    f"!= issued {to_coins(self.balances.issued)}")
+        negative = self.balances.negative_accounts()
+        if negative:
+            return f"negative balance on {len(negative)} accounts, e.g. {negative[0]}"
+        return None
+
+    def restore_balances(self, balances: dict[str, int]):
+        """Set account balances (in units) restored from a checkpoint, after pending_transactions."""
+        self.balances.set_many(list(balances), list(balances.values()))
+        self.balances.recount(sum(to_units(tx.amount) + to_units(tx.fee) for tx in self.pending_transactions))
+
+    def _index_block(self, block: Block, transactions: list[Transaction]):
+        """Record a block's transactions in the tx_id and address indexes before it is appended."""
+        self._block_offsets.append(self._tx_count)
+        seq = self._tx_count
+        for tx in transactions:
+            self.tx_index[tx.tx_id] = seq
+            self.address_index.setdefault(tx.from_address, array("q")).append(seq)
+            if tx.to_address != tx.from_address:
+                self.address_index.setdefault(tx.to_address, array("q")).append(seq)
+            seq += 1
+        self._tx_count = seq
+
+    def load_chain(self, blocks: list[Block]):
+        """Replace the chain, genesis included, with blocks restored from the block log."""
+        self.chain = []
+        self._block_offsets = array("q")
+        self._tx_count = 0
+        self.tx_index = {}
+        self.address_index = {}
+        if self._columnar:
+            from txstore import ColumnarTransactionStore
+            self.tx_store = ColumnarTransactionStore()
+        for block in blocks:
+            self._index_block(block, block.transactions)
+            if self.tx_store is not None:
+                block.transactions = self.tx_store.extend(block.transactions)
+            self.chain.append(block)
+
+    def _locate(self, seq: int) -> tuple[int, Transaction]:
+        """Sequence number -> (block height, transaction)."""
+        height = bisect_right(self._block_offsets, seq) - 1
+        return height, self.chain[height].transactions[seq - self._block_offsets[height]]
+
+    def get_transaction(self, tx_id: str) -> Optional[tuple[Transaction, Optional[int]]]:
+        """Look up a transaction. Returns (tx, block height), height None if still pending."""
+        seq = self.tx_index.get(tx_id)
+        if seq is not None:
+            height, tx = self._locate(seq)
+            return tx, height
+        for tx in self.pending_transactions:
+            if tx.tx_id == tx_id:
+                return tx, None
+        return None
+
+    def get_history(self, address: str, before: Optional[int] = None,
+                    limit: int = HISTORY_PAGE_SIZE) -> tuple[list[dict], Optional[int]]:
+        """
+        Confirmed transactions involving an address, newest first.
+        `before` is the cursor returned by the previous page. Returns (entries, next_cursor).
+        """
+        seqs = self.address_index.get(address)
+        if not seqs:
+            return [], None
+        end = len(seqs) if before is None else bisect_left(seqs, before)
+        start = max(0, end - max(1, min(limit, HISTORY_PAGE_SIZE)))
+        entries = []
+        for i in range(end - 1, start - 1, -1):
+            height, tx = self._locate(seqs[i])
+            entries.append({"tx": tx.to_dict(), "block": height})
+        next_cursor = seqs[start] if start > 0 else None
+        return entries, next_cursor
+
+    def get_pending_for(self, address: str) -> list[Transaction]:
+        return [tx for tx in self.pending_transactions if tx.from_address == address or tx.to_address == address]
+
     def get_miners(self) -> list[User]:
-        return [self.users[uid] for uid in self.miner_slots if uid is not None]
+        # A slot whose user is gone counts as free
+        return [self.users[uid] for uid in self.miner_slots if uid in self.users]
 
     def get_state(self) -> dict:
         return {
             "chain_length": len(self.chain),
             "pending_tx": len(self.pending_transactions),
-            "miners": [self.users[uid].to_dict() for uid in self.miner_slots if uid is not None],
+            "miners": [user.to_dict() for user in self.get_miners()],
             "users": [u.to_dict() for u in self.users.values() if not u.is_miner],
             "block_reward": self.get_block_reward(),
             "pending_fees": self.get_total_fees(),
@@ -0,0 +1,225 @@
+"""
+Block log and periodic state checkpoints.
+
+Every mined block is appended to data/blocks.log as a length-prefixed,
+CRC-checked pickle record. Every CHECKPOINT_INTERVAL_BLOCKS blocks (and at
+shutdown) a checkpoint of the ledger state is written to data/checkpoints/:
+balances, mempool, chain tip, reward schedule position and server state
+such as the mining tolerance. Both are written by one background thread in
+submission order; checkpoints go through a temporary file and os.replace(),
+so a crash leaves the previous checkpoint intact rather than a torn one.
+
+On restart the block log is loaded, the newest checkpoint whose tip matches
+the log is restored, and only blocks mined after it are replayed.
+"""
+import glob
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Optional
+
+import blockchain as ledger
+from balances import to_units, to_coins, split_reward
+from blockchain import Block, Blockchain, Transaction
+from config import INITIAL_BALANCE, CHECKPOINT_KEEP
+
+_RECORD_HEADER = struct.Struct("<II")  # payload length, crc32
+_CHECKPOINT_MAGIC = b"SCCK"
+_CHECKPOINT_VERSION = 2
+_CHECKPOINT_HEADER = struct.Struct("<4sHI")  # magic, version, crc32
+
+
+def snapshot(blockchain: Blockchain, extra: dict) -> tuple:
+    """
+    Copy the state a checkpoint needs into plain tuples. Runs on the event
+    loop so the copy is consistent; serialization happens on the writer thread.
+    """
+    accounts = {
+        record["user_id"]: (record["user_id"], record["name"], device_id)
+        for device_id, record in blockchain.persisted_users.items()
+    }
+    for user in blockchain.users.values():
+        accounts[user.user_id] = (user.user_id, user.name, user.device_id)
+    addresses, units = blockchain.balances.snapshot()
+    mempool = [(tx.tx_id, tx.from_address, tx.to_address, tx.amount, tx.fee, tx.timestamp)
+               for tx in blockchain.pending_transactions]
+    return (
+        len(blockchain.chain) - 1,
+        blockchain.last_block.hash,
+        blockchain.get_block_reward(),
+        list(accounts.values()),
+        addresses,
+        units,
+        mempool,
+        dict(blockchain.opening_balances),
+        dict(extra),
+    )
+
+
+class ChainStore:
+    def __init__(self, data_dir: Optional[str] = None, keep: int = CHECKPOINT_KEEP):
+        data_dir = data_dir or ledger.DATA_DIR
+        self.log_path = os.path.join(data_dir, "blocks.log")
+        self.checkpoint_dir = os.path.join(data_dir, "checkpoints")
+        self.keep = keep
+        self.last_checkpoint_seconds = 0.0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, daemon=True, name="chain-store")
+        self._thread.start()
+
+    # --- Writing (background thread) ---
+
+    def append_block(self, block: Block):
+        self._queue.put(("block", block.to_record()))
+
+    def checkpoint(self, blockchain: Blockchain, extra: dict):
+        self._queue.put(("checkpoint", snapshot(blockchain, extra)))
+
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _writer(self):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        with open(self.log_path, "ab") as log:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                kind, payload = item
+                try:
+                    if kind == "block":
+                        data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+                        log.write(_RECORD_HEADER.pack(len(data), zlib.crc32(data)) + data)
+                        log.flush()
+                        os.fsync(log.fileno())
+                    else:
+                        self._write_checkpoint(payload)
+                except OSError as e:
+                    print(f"Error writing {kind}: {e}")
+
+    def _write_checkpoint(self, state: tuple):
+        start = time.perf_counter()
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        path = os.path.join(self.checkpoint_dir, f"checkpoint-{state[0]:010d}.bin")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_CHECKPOINT_HEADER.pack(_CHECKPOINT_MAGIC, _CHECKPOINT_VERSION, zlib.crc32(data)))
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        dir_fd = os.open(self.checkpoint_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        for old in self._checkpoint_paths()[self.keep:]:
+            os.remove(old)
+        self.last_checkpoint_seconds = time.perf_counter() - start
+
+    # --- Reading (startup) ---
+
+    def _checkpoint_paths(self) -> list[str]:
+        """Newest first."""
+        return sorted(glob.glob(os.path.join(self.checkpoint_dir, "checkpoint-*.bin")), reverse=True)
+
+    def read_blocks(self) -> list[Block]:
+        """Load the block log, truncating a torn record left by a crash mid-write."""
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+        blocks = []
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            length, crc = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            blocks.append(Block.from_record(pickle.loads(payload)))
+            offset = start + length
+        if offset < len(data):
+            print(f"Block log has a damaged tail, truncating {len(data) - offset} bytes")
+            with open(self.log_path, "r+b") as f:
+                f.truncate(offset)
+        return blocks
+
+    def read_checkpoint(self, blocks: list[Block]) -> Optional[tuple]:
+        """Newest readable checkpoint whose tip is in `blocks`."""
+        for path in self._checkpoint_paths():
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                magic, version, crc = _CHECKPOINT_HEADER.unpack_from(data)
+                payload = data[_CHECKPOINT_HEADER.size:]
+                if magic != _CHECKPOINT_MAGIC or version != _CHECKPOINT_VERSION or zlib.crc32(payload) != crc:
+                    print(f"Skipping unreadable checkpoint {os.path.basename(path)}")
+                    continue
+                state = pickle.loads(payload)
+            except (OSError, struct.error, pickle.UnpicklingError) as e:
+                print(f"Skipping checkpoint {os.path.basename(path)}: {e}")
+                continue
+            height, tip_hash = state[0], state[1]
+            if height < len(blocks) and blocks[height].hash == tip_hash:
+                return state
+            print(f"Skipping checkpoint {os.path.basename(path)}: tip not in the block log")
+        return None
+
+    def restore(self, blockchain: Blockchain) -> Optional[dict]:
+        """
+        Restore `blockchain` from the block log and newest checkpoint.
+        Returns the server state saved with the checkpoint, or None.
+        """
+        start = time.perf_counter()
+        blocks = self.read_blocks()
+        if not blocks:
+            # First run: start the log with this run's genesis block
+            self.append_block(blockchain.last_block)
+            return None
+        blockchain.load_chain(blocks)
+
+        state = self.read_checkpoint(blocks)
+        if state is None:
+            print(f"Loaded {len(blocks)} blocks, no usable checkpoint - balances from users.json")
+            return None
+        height, _tip_hash, _reward, accounts, addresses, units, mempool, opening_balances, extra = state
+
+        # Replay in integer units, exactly as mine_block applied the blocks.
+        # Checkpoint balances already include the debits of its mempool.
+        balances = dict(zip(addresses, units.tolist()))
+        opening = to_units(INITIAL_BALANCE)
+        pending_ids = {tx[0] for tx in mempool}
+        mined = set()
+        for block in blocks[height + 1:]:
+            for tx in block.transactions:
+                if tx.tx_id in pending_ids:
+                    mined.add(tx.tx_id)
+                else:
+                    balances[tx.from_address] = (balances.get(tx.from_address, opening)
+                                                 - to_units(tx.amount) - to_units(tx.fee))
+                balances[tx.to_address] = balances.get(tx.to_address, opening) + to_units(tx.amount)
+            shares = block.miner_contributions
+            for miner, reward in zip(shares, split_reward(to_units(block.total_reward), list(shares.values()))):
+                balances[miner] = balances.get(miner, opening) + reward
+
+        blockchain.pending_transactions = [Transaction(*tx) for tx in mempool if tx[0] not in mined]
+        blockchain.restore_balances(balances)
+        blockchain.opening_balances.update(opening_balances)
+        persisted = blockchain.persisted_users
+        for user_id, name, device_id in accounts:
+            if device_id and device_id not in persisted:
+                persisted[device_id] = {"user_id": user_id, "name": name, "device_id": device_id}
+        for record in persisted.values():
+            if record["user_id"] in balances:
+                record["balance"] = to_coins(balances[record["user_id"]])
+
+        print(f"Restored {len(blocks)} blocks from checkpoint at height {height}, "
+              f"replayed {len(blocks) - 1 - height} blocks in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return extra
@@ -0,0 +1,24 @@
+import time
+
+
+class Clock:
+    """Wall-clock time source. Game logic reads time through this so it can be simulated."""
+
+    def time(self) -> float:
+        return time.time()
+
+
+class VirtualClock(Clock):
+    """Manually advanced clock for headless simulations."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+SYSTEM_CLOCK = Clock()
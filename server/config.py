@@ -27,19 +27,124 @@ SLOW_BLOCK_THRESHOLD = 30.0  # seconds
 MIN_CONTRIBUTION_THRESHOLD = 0.3
 
 # Transactions
+UNITS_PER_COIN = 1_000_000  # Balances are kept as integer micro-coins
 MIN_FEE = 0.01
+MAX_TRANSFER_BATCH = 200  # Transfers per transfer_batch message
 INITIAL_BALANCE = 100.0  # Starting balance for new users
+HISTORY_PAGE_SIZE = 50  # Max transactions per get_history page
+COLUMNAR_TX_STORE = False  # Pack confirmed transactions into NumPy columns (saves memory on long runs)
+
+# Chain explorer (websocket queries + GET /api/... on the metrics server)
+EXPLORER_PAGE_SIZE = 100  # Max headers per page
+EXPLORER_BLOCK_CACHE = 64  # Full blocks kept serialized
 
 # Server
 WEBSOCKET_HOST = "0.0.0.0"
 WEBSOCKET_PORT = 8765
 TICK_RATE = 0.1  # 10 updates/sec
+# With no miners in any room there is nothing to broadcast or mine: the mining
+# loop ticks this rarely (sessions still expire) until a miner joins. 0 = always TICK_RATE.
+IDLE_TICK_INTERVAL = 1.0
+# Front-end worker processes that accept websockets on WEBSOCKET_PORT (SO_REUSEPORT),
+# rate-limit and fan out, forwarding commands to this process over a Unix socket
+# (data/frontends.sock). 0 = this process serves websockets itself.
+FRONTEND_WORKERS = 0
+
+# Rate limiting (per connection): message type -> (tokens per second, burst)
+RATE_LIMITS = {
+    "join": (0.5, 3),
+    "become_miner": (1.0, 3),
+    "leave_mining": (1.0, 3),
+    "set_frequency": (20.0, 20),  # Excess slider updates are coalesced, not rejected
+    "transfer": (5.0, 10),
+    "transfer_batch": (1.0, 3),
+    "get_state": (1.0, 3),
+    "get_leaderboard": (1.0, 3),
+    "get_history": (2.0, 5),
+    "get_transaction": (5.0, 10),
+    "get_block": (5.0, 10),
+    "get_headers": (2.0, 5),
+    "get_latest_blocks": (2.0, 5),
+}
+DEFAULT_RATE_LIMIT = (2.0, 5)  # Any message type not listed above
+MESSAGE_BUDGET = (40.0, 60)  # All message types combined
+THROTTLE_LOG_INTERVAL = 10.0  # seconds between throttling summaries
+
+# Session resume: a dropped client keeps its wallet and miner slot this long,
+# and can rebind with the resume_token from "joined" (0 disables)
+SESSION_GRACE_PERIOD = 30.0  # seconds
+SESSION_BACKLOG = 200  # Messages kept for replay per suspended session
+
+# Metrics (Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics)
+METRICS_ENABLED = True
+METRICS_HOST = "127.0.0.1"  # Local only - scrape from the Pi itself or via SSH tunnel
+METRICS_PORT = 9108
+
+# Event loop watchdog (logs the loop thread's stack when a callback blocks too long)
+LOOP_WATCHDOG_ENABLED = False
+LOOP_LAG_THRESHOLD = 0.05  # seconds
+LOOP_WATCHDOG_INTERVAL = 0.02  # seconds between heartbeats
+
+# On-demand sampling profiler, controlled from the local metrics server:
+#   curl -X POST "http://127.0.0.1:9108/debug/profile/start?seconds=30"
+#   curl -X POST "http://127.0.0.1:9108/debug/profile/stop"
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds
+PROFILE_MAX_SECONDS = 300
+
+# Flight recorder: keeps the last RECORDER_SECONDS of microphone audio (memory-mapped
+# int16 ring) and game events in data/recorder/, frozen to data/recordings/ when a
+# block is mined or on demand:
+#   curl -X POST "http://127.0.0.1:9108/debug/recorder/freeze"
+RECORDER_ENABLED = False
+RECORDER_SECONDS = 120
+RECORDER_FREEZE_ON_BLOCK = True
+RECORDER_EVENT_LOG_BYTES = 16 * 1024 * 1024  # Event log is rotated past this size
+RECORDER_KEEP = 20  # Recordings kept in data/recordings/
+
+# Chain verification (hashes, links, balance replay) - at startup and via
+#   curl -X POST "http://127.0.0.1:9108/debug/verify"
+VERIFY_ON_STARTUP = True
+VERIFY_WORKERS = None  # Process pool size for hash recomputation (None = all cores)
+
+# Block log and state checkpoints (data/blocks.log, data/checkpoints/). A restart
+# restores the newest checkpoint and replays only the blocks mined after it.
+CHECKPOINTS_ENABLED = True
+CHECKPOINT_INTERVAL_BLOCKS = 10
+CHECKPOINT_KEEP = 2  # Older checkpoints are deleted
 
 # Audio
 SAMPLE_RATE = 44100
 CHUNK_SIZE = 4096
 FFT_WINDOW = 2048
 AUDIO_DEVICE = 0  # Fifine microphone (use None for default, or device index)
+# Inputs captured from each device, one microphone each. All channels are
+# analyzed in one FFT per frame and each tone is taken from the microphone that
+# hears it best. A room's "audio_device" may also be a list of devices.
+AUDIO_CHANNELS = 1
+# Tone tracking: once a miner's tone is found, later frames only search
+# TRACK_WINDOW_HZ around it and blend it into a running estimate, so one bad
+# frame doesn't zero the miner. False scans the whole range every frame.
+TONE_TRACKING = True
+TRACK_WINDOW_HZ = 45  # ± around the estimate, about two FFT bins
+TRACK_SMOOTHING = 0.5  # Weight of the newest frame in the estimate
+TRACK_HOLD_FRAMES = 3  # Frames a track survives without its tone (~0.3 s)
+TRACK_SCAN_INTERVAL = 4  # Frames between full scans for miners that weren't found
+# Noise gate: a frame whose loudest microphone has a lower RMS than this fraction
+# of the quietest tone the detector accepts is skipped without an FFT (a quiet
+# room at night). A tone loud enough to count opens the gate on its first chunk.
+# 0 disables the gate.
+NOISE_GATE = 0.8
+
+# Rooms: independent games (chain, difficulty, miners, microphone) hosted by one
+# process. Clients pick a room with "room" in join, otherwise they get
+# DEFAULT_ROOM, whose data stays in data/; other rooms keep theirs in
+# data/rooms/<id>/. Each room needs its own input device.
+DEFAULT_ROOM = "main"
+ROOMS = {
+    DEFAULT_ROOM: {"audio_device": AUDIO_DEVICE},
+    # "kitchen": {"audio_device": 1},
+    # "hall": {"audio_device": [2, 3], "channels": 2},  # Four microphones
+}
 
 # GPIO (Raspberry Pi buzzer)
 BUZZER_PIN = 18
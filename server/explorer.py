@@ -0,0 +1,111 @@
+"""
+Read-only chain explorer queries over cached, pre-serialized JSON.
+
+Blocks never change once mined, so each block's header JSON is built once
+(lazily, the first time any query needs it) and responses are assembled by
+joining cached strings. Full blocks are serialized on demand and kept in a
+small LRU cache. Nothing here runs on the mining path, and queries may be
+served from the HTTP thread as well as the event loop.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from blockchain import Block, Blockchain
+from config import EXPLORER_PAGE_SIZE, EXPLORER_BLOCK_CACHE
+
+
+def block_header(block: Block) -> dict:
+    return {
+        "index": block.index,
+        "hash": block.hash,
+        "previous_hash": block.previous_hash,
+        "timestamp": block.timestamp,
+        "tx_count": len(block.transactions),
+        "miner_contributions": block.miner_contributions,
+        "total_reward": block.total_reward,
+    }
+
+
+class ChainExplorer:
+    def __init__(self, blockchain: Blockchain):
+        self.blockchain = blockchain
+        self._lock = threading.Lock()
+        self._headers: list[str] = []
+        self._heights_by_hash: dict[str, int] = {}
+        self._blocks: OrderedDict[int, str] = OrderedDict()
+
+    def _sync(self) -> int:
+        """Serialize headers for blocks appended since the last query. Returns chain length."""
+        chain = self.blockchain.chain
+        length = len(chain)
+        if len(self._headers) < length:
+            with self._lock:
+                for height in range(len(self._headers), length):
+                    block = chain[height]
+                    self._headers.append(json.dumps(block_header(block)))
+                    self._heights_by_hash[block.hash] = height
+        return length
+
+    def height_of(self, block_hash: str) -> Optional[int]:
+        self._sync()
+        return self._heights_by_hash.get(block_hash)
+
+    def block_json(self, height: int) -> Optional[str]:
+        """Full block (as in block_mined) by height."""
+        length = self._sync()
+        if not 0 <= height < length:
+            return None
+        with self._lock:
+            cached = self._blocks.get(height)
+            if cached is not None:
+                self._blocks.move_to_end(height)
+                return cached
+        text = json.dumps(self.blockchain.chain[height].to_dict())
+        with self._lock:
+            self._blocks[height] = text
+            while len(self._blocks) > EXPLORER_BLOCK_CACHE:
+                self._blocks.popitem(last=False)
+        return text
+
+    def headers(self, start: int, count: int) -> list[str]:
+        """Headers for heights [start, start + count), oldest first."""
+        length = self._sync()
+        start = max(0, start)
+        end = min(length, start + max(0, min(count, EXPLORER_PAGE_SIZE)))
+        return self._headers[start:end]
+
+    def latest(self, limit: int, before: Optional[int] = None) -> tuple[list[str], Optional[int]]:
+        """
+        Newest-first headers below height `before` (the tip if None).
+        Returns (headers, next_cursor); pass next_cursor as `before` for the next page.
+        """
+        length = self._sync()
+        end = length if before is None else max(0, min(before, length))
+        start = max(0, end - max(1, min(limit, EXPLORER_PAGE_SIZE)))
+        page = self._headers[start:end]
+        page.reverse()
+        return page, (start if start > 0 else None)
+
+    # --- Response assembly (shared by websocket and HTTP) ---
+
+    def block_response(self, height: Optional[int] = None, block_hash: Optional[str] = None) -> Optional[str]:
+        if height is None and block_hash is not None:
+            height = self.height_of(block_hash)
+        if height is None:
+            return None
+        block = self.block_json(height)
+        if block is None:
+            return None
+        return '{"type": "block", "block": ' + block + "}"
+
+    def headers_response(self, start: int, count: int) -> str:
+        start = max(0, start)
+        page = self.headers(start, count)
+        return '{"type": "headers", "start": ' + str(start) + ', "headers": [' + ", ".join(page) + "]}"
+
+    def latest_response(self, limit: int, before: Optional[int] = None) -> str:
+        page, next_cursor = self.latest(limit, before)
+        return ('{"type": "headers", "headers": [' + ", ".join(page) + '], "next_cursor": '
+                + json.dumps(next_cursor) + ', "chain_length": ' + str(len(self._headers)) + "}")
@@ -0,0 +1,364 @@
+"""
+Front-end worker processes for spreading websocket I/O over several cores.
+
+With FRONTEND_WORKERS > 0 the main process (the authority) doesn't accept
+websockets itself. It owns the ledgers and the mining loop. It starts
+FRONTEND_WORKERS worker processes, which all listen on WEBSOCKET_PORT
+(SO_REUSEPORT, so the kernel spreads new connections over them), and talks to
+them over a Unix socket with length-prefixed pickle frames:
+
+    worker -> authority   ("open", conn, remote_address)
+                          ("msg", conn, message)       validated client message
+                          ("close", conn)
+                          ("listening",)
+    authority -> worker   ("send", [(conns, payload), ...])
+
+A worker answers what it can on its own: invalid JSON, rate limiting (a
+throttled set_frequency is coalesced and forwarded on the next tick) and
+get_state, which is served from the last state broadcast the connection
+received. Everything else is forwarded. On the authority each client is a
+RemoteConnection, which RoomHost serves like a websocket. Consecutive sends of
+the same payload (a broadcast) go out as one frame per worker, and the worker
+does the per-client fan-out.
+
+Backpressure: the authority waits for the socket to drain when a worker falls
+behind reading, so that buffer stays bounded. A worker queues each client's
+messages in its own outbox, sent by the client's own task, so one slow phone
+doesn't hold up the others. A queued state or mining_status is replaced by a
+newer one, and a client whose outbox still grows past OUTBOX_LIMIT is
+disconnected (it can resume its session).
+"""
+import asyncio
+import itertools
+from collections import deque
+import json
+import multiprocessing as mp
+import os
+import pickle
+import struct
+from typing import Optional
+
+import websockets
+from websockets.server import WebSocketServerProtocol
+
+from config import RATE_LIMITS, DEFAULT_RATE_LIMIT, MESSAGE_BUDGET, TICK_RATE
+from ratelimit import ConnectionLimiter
+
+_FRAME_HEADER = struct.Struct("<I")  # payload length
+_STATE_PREFIX = '{"type": "state"'
+# Messages only the newest of which matters to a client
+_LATEST_ONLY = (_STATE_PREFIX, '{"type": "mining_status"')
+OUTBOX_LIMIT = 256  # Messages queued for one client before it is dropped as too slow
+
+
+def write_frame(writer: asyncio.StreamWriter, frame: tuple):
+    data = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_FRAME_HEADER.pack(len(data)) + data)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple:
+    """Next frame. Raises asyncio.IncompleteReadError when the other side has gone."""
+    (length,) = _FRAME_HEADER.unpack(await reader.readexactly(_FRAME_HEADER.size))
+    return pickle.loads(await reader.readexactly(length))
+
+
+# --- Authority side -------------------------------------------------------
+
+class FrontendLink:
+    """The authority's end of one worker's socket. Batches sends made in the same loop iteration."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.connections: dict[int, RemoteConnection] = {}
+        self._batch: list[tuple[list[int], str]] = []
+        self._flush_scheduled = False
+
+    def send(self, conn_id: int, payload: str):
+        # A broadcast sends one payload object to every connection in a row
+        if self._batch and self._batch[-1][1] is payload:
+            self._batch[-1][0].append(conn_id)
+        else:
+            self._batch.append(([conn_id], payload))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        batch, self._batch = self._batch, []
+        if not self.writer.is_closing():
+            write_frame(self.writer, ("send", batch))
+
+    async def drain(self):
+        """Wait while the worker is behind reading, so the socket buffer stays bounded."""
+        if not self.writer.is_closing():
+            await self.writer.drain()
+
+
+class RemoteConnection:
+    """A client of a front-end worker, as seen by the authority: enough of a websocket for RoomHost."""
+
+    def __init__(self, link: FrontendLink, conn_id: int, remote_address):
+        self.link = link
+        self.conn_id = conn_id
+        self.remote_address = remote_address
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+        self._messages: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        message = await self._messages.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def send(self, payload: str):
+        if not self.closed:
+            self.link.send(self.conn_id, payload)
+            await self.link.drain()
+
+    def feed(self, message: str):
+        self._messages.put_nowait(message)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._messages.put_nowait(None)
+
+
+class FrontendPool:
+    """
+    Async context manager run by the authority: the Unix socket server and the
+    worker processes. Each worker client is passed to `handle_connection`.
+    """
+
+    def __init__(self, handle_connection, socket_path: str, workers: int, host: str, port: int):
+        self.handle_connection = handle_connection
+        self.socket_path = socket_path
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.processes: list[mp.Process] = []
+        self.links: list[FrontendLink] = []
+        self._listening = 0
+        self._all_listening = asyncio.Event()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def __aenter__(self) -> "FrontendPool":
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._serve_link, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        # Spawned rather than forked: the workers never import NumPy or the ledger
+        context = mp.get_context("spawn")
+        self.processes = [
+            context.Process(target=run_worker, args=(index, self.socket_path, self.host, self.port),
+                            daemon=True, name=f"frontend-{index}")
+            for index in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        for link in self.links:
+            link.writer.close()
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            await asyncio.to_thread(process.join, 2.0)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    async def wait_listening(self):
+        """Until every worker accepts websocket connections."""
+        await self._all_listening.wait()
+
+    async def _serve_link(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        link = FrontendLink(writer)
+        self.links.append(link)
+        connections = link.connections
+        try:
+            while True:
+                frame = await read_frame(reader)
+                op = frame[0]
+                if op == "msg":
+                    conn = connections.get(frame[1])
+                    if conn is not None:
+                        conn.feed(frame[2])
+                elif op == "open":
+                    conn = RemoteConnection(link, frame[1], frame[2])
+                    connections[conn.conn_id] = conn
+                    conn.task = asyncio.create_task(self.handle_connection(conn))
+                elif op == "close":
+                    conn = connections.pop(frame[1], None)
+                    if conn is not None:
+                        conn.close()
+                elif op == "listening":
+                    self._listening += 1
+                    if self._listening == self.workers:
+                        print(f"{self.workers} front-end workers accepting on ws://{self.host}:{self.port}")
+                        self._all_listening.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            print(f"Front-end worker disconnected, dropping its {len(connections)} clients")
+        finally:
+            for conn in connections.values():
+                conn.close()
+            connections.clear()
+            self.links.remove(link)
+            writer.close()
+
+
+# --- Worker side ----------------------------------------------------------
+
+class Outbox:
+    """One client's outgoing messages, sent by its own task."""
+
+    def __init__(self, ws: WebSocketServerProtocol):
+        self.ws = ws
+        self.queue: deque[str] = deque()
+        self._ready = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    def put(self, payload: str):
+        for prefix in _LATEST_ONLY:
+            if payload.startswith(prefix):
+                # A queued one is stale now
+                for index, queued in enumerate(self.queue):
+                    if queued.startswith(prefix):
+                        del self.queue[index]
+                        break
+                break
+        self.queue.append(payload)
+        if len(self.queue) > OUTBOX_LIMIT:
+            self.queue.clear()
+            self.task.cancel()
+            asyncio.create_task(self.ws.close(1013, "Too slow"))
+            return
+        self._ready.set()
+
+    async def _run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self.queue:
+                    await self.ws.send(self.queue.popleft())
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+
+class FrontendWorker:
+    def __init__(self, index: int, socket_path: str):
+        self.index = index
+        self.socket_path = socket_path
+        self.connections: dict[int, WebSocketServerProtocol] = {}
+        self.outboxes: dict[int, Outbox] = {}
+        self.states: dict[int, str] = {}  # Last state broadcast per connection, for get_state
+        self._coalesced: dict[int, str] = {}  # Latest throttled set_frequency per connection
+        self._ids = itertools.count()
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def run(self, host: str, port: int):
+        for _ in range(100):
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(0.05)
+        else:
+            raise SystemExit(f"Front-end worker {self.index}: authority socket {self.socket_path} not available")
+
+        async with websockets.serve(self.handle_connection, host, port, reuse_port=True):
+            write_frame(self._writer, ("listening",))
+            flusher = asyncio.create_task(self._flush_coalesced())
+            try:
+                # Serve until the authority goes away
+                await self._fan_out(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            flusher.cancel()
+
+    async def handle_connection(self, ws: WebSocketServerProtocol):
+        conn_id = next(self._ids)
+        self.connections[conn_id] = ws
+        self.outboxes[conn_id] = Outbox(ws)
+        limiter = ConnectionLimiter(RATE_LIMITS, DEFAULT_RATE_LIMIT, MESSAGE_BUDGET)
+        write_frame(self._writer, ("open", conn_id, ws.remote_address))
+        try:
+            async for message in ws:
+                await self.handle_message(conn_id, ws, message, limiter)
+                # Yield so a client with a full receive buffer can't starve the others
+                await asyncio.sleep(0)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            del self.connections[conn_id]
+            self.outboxes.pop(conn_id).task.cancel()
+            self.states.pop(conn_id, None)
+            self._coalesced.pop(conn_id, None)
+            write_frame(self._writer, ("close", conn_id))
+
+    async def handle_message(self, conn_id: int, ws: WebSocketServerProtocol, message: str,
+                             limiter: ConnectionLimiter):
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError:
+            await ws.send(json.dumps({"type": "error", "message": "Invalid JSON"}))
+            return
+        if not isinstance(data, dict):
+            await ws.send(json.dumps({"type": "error", "message": "Message must be a JSON object"}))
+            return
+        msg_type = str(data.get("type"))
+
+        if not limiter.allow(msg_type):
+            if msg_type == "set_frequency":
+                # Slider spam: keep only the latest position, forwarded on the next tick
+                self._coalesced[conn_id] = message
+                return
+            await ws.send(json.dumps({
+                "type": "error",
+                "code": "rate_limited",
+                "message": f"Rate limited: {msg_type}",
+                "retry_after": round(limiter.retry_after(msg_type), 3),
+            }))
+            return
+
+        if msg_type == "get_state" and conn_id in self.states:
+            await ws.send(self.states[conn_id])
+            return
+        if msg_type == "set_frequency":
+            self._coalesced.pop(conn_id, None)
+        write_frame(self._writer, ("msg", conn_id, message))
+
+    async def _fan_out(self, reader: asyncio.StreamReader):
+        outboxes = self.outboxes
+        while True:
+            _, batch = await read_frame(reader)
+            for conn_ids, payload in batch:
+                is_state = payload.startswith(_STATE_PREFIX)
+                for conn_id in conn_ids:
+                    outbox = outboxes.get(conn_id)
+                    if outbox is None:
+                        continue
+                    if is_state:
+                        self.states[conn_id] = payload
+                    # Queued, not awaited: a slow client doesn't stall the authority's socket
+                    outbox.put(payload)
+
+    async def _flush_coalesced(self):
+        while True:
+            await asyncio.sleep(TICK_RATE)
+            pending, self._coalesced = self._coalesced, {}
+            for conn_id, message in pending.items():
+                write_frame(self._writer, ("msg", conn_id, message))
+
+
+def run_worker(index: int, socket_path: str, host: str, port: int):
+    """Process entry point."""
+    asyncio.run(FrontendWorker(index, socket_path).run(host, port))
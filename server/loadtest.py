@@ -0,0 +1,406 @@
+"""
+Client swarm load generator for the websocket server.
+
+Starts SoundChainServer in a child process (synthetic audio, temporary data
+directory, no HTTP/UI), optionally behind --frontends worker processes, and connects simulated phones over real local
+websockets from one or more client worker processes. Each simulated client
+joins with a device ID and then, at the configured Poisson rates, transfers
+coins to other clients, polls the leaderboard/state, and grabs or releases
+miner slots. Miners steer their slider toward the target from mining_status,
+and the synthetic audio plays every miner's current slider frequency.
+
+The client count is ramped in steps. For each step the report gives
+transfer -> transaction_pending and transfer -> transaction_confirmed
+latency, block_mined delivery delay, server CPU, and the share of 10 Hz
+mining ticks that missed their deadline. The first step where that share
+exceeds --overrun-threshold is the connection count the host can't carry.
+
+    python loadtest.py --ramp 50,100,250,500,1000 --step-seconds 20
+    python loadtest.py --ramp 2000 --workers 4 --output party.json
+    python loadtest.py --ramp 500,1000,2000 --frontends 3   # websocket I/O on 3 more cores
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+import urllib.request
+from collections import deque
+from functools import partial
+from typing import Optional
+
+import numpy as np
+
+from config import SAMPLE_RATE, TICK_RATE, MIN_MINER_FREQUENCY, MAX_MINER_FREQUENCY
+
+
+def _raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+# --- Server process -------------------------------------------------------
+
+class SyntheticRoom:
+    """Plays a clean sine for every miner's current slider frequency, plus room noise."""
+
+    def __init__(self, audio, noise: float = 0.005):
+        self.audio = audio
+        self.noise = noise
+        self._phases: dict[str, float] = {}
+        self._rng = np.random.default_rng(0)
+
+    def __call__(self, frames: int) -> np.ndarray:
+        t = np.arange(frames) / SAMPLE_RATE
+        signal = self._rng.normal(0.0, self.noise, frames)
+        for user_id, freq in list(self.audio.miner_frequencies.items()):
+            phase = self._phases.get(user_id, 0.0)
+            signal += 0.2 * np.sin(phase + 2 * np.pi * freq * t)
+            self._phases[user_id] = (phase + 2 * np.pi * freq * frames / SAMPLE_RATE) % (2 * np.pi)
+        return signal
+
+
+def run_server(port: int, metrics_port: int, ready, frontends: int = 0):
+    import blockchain
+    import metrics
+    import websockets
+    from main import RoomHost, SoundChainServer
+
+    _raise_fd_limit()
+    data_dir = tempfile.mkdtemp(prefix="soundchain-loadtest-")
+    blockchain.DATA_DIR = data_dir
+    blockchain.USERS_FILE = os.path.join(data_dir, "users.json")
+
+    async def serve():
+        server = SoundChainServer()
+        server.audio.start_synthetic(SyntheticRoom(server.audio))
+        host = RoomHost({server.room_id: server})
+        host._running = True
+        asyncio.create_task(host.mining_loop())
+        metrics.start_metrics_server("127.0.0.1", metrics_port)
+        if frontends:
+            from frontend import FrontendPool
+            # As in RoomHost.start: the workers rate-limit, the authority doesn't again
+            listener = FrontendPool(partial(host.handle_connection, rate_limit=False),
+                                    os.path.join(data_dir, "frontends.sock"), frontends, "127.0.0.1", port)
+        else:
+            listener = websockets.serve(host.handle_connection, "127.0.0.1", port, max_size=None)
+        async with listener:
+            if frontends:
+                await listener.wait_listening()
+            ready.set()
+            await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+def scrape_metrics(metrics_port: int) -> dict[str, float]:
+    with urllib.request.urlopen(f"http://127.0.0.1:{metrics_port}/metrics", timeout=10) as response:
+        text = response.read().decode()
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            values[name] = float(value)
+    return values
+
+
+# --- Client processes -----------------------------------------------------
+
+class WorkerStats:
+    def __init__(self):
+        self.pending_latency: list[float] = []
+        self.confirm_latency: list[float] = []
+        self.block_delivery: list[float] = []
+        self.transfers_sent = 0
+        self.transfers_failed = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.messages = 0
+        self.connect_failures = 0
+
+    def drain(self) -> dict:
+        data = dict(self.__dict__)
+        self.__init__()
+        return data
+
+
+class SimClient:
+    def __init__(self, name: str, args, stats: WorkerStats, peers: list[str]):
+        self.name = name
+        self.args = args
+        self.stats = stats
+        self.peers = peers
+        self.user_id: Optional[str] = None
+        self.is_miner = False
+        self.frequency = float(random.uniform(MIN_MINER_FREQUENCY, MAX_MINER_FREQUENCY))
+        self.target: Optional[float] = None
+        self._transfer_sends: deque[float] = deque()
+        self._unconfirmed: dict[str, float] = {}
+        self._joined = asyncio.Event()
+
+    async def run(self, uri: str, stop: asyncio.Event):
+        try:
+            async with websockets_connect(uri) as ws:
+                await ws.send(json.dumps({"type": "join", "name": self.name, "device_id": self.name}))
+                reader = asyncio.create_task(self._read(ws))
+                try:
+                    await asyncio.wait_for(self._joined.wait(), timeout=30)
+                    await self._act(ws, stop)
+                finally:
+                    reader.cancel()
+        except Exception:
+            self.stats.connect_failures += 1
+
+    async def _act(self, ws, stop: asyncio.Event):
+        a = self.args
+        rates = {
+            "transfer": a.transfer_rate,
+            "leaderboard": a.leaderboard_rate,
+            "state": a.state_rate,
+            "miner": a.miner_rate,
+            "slider": a.slider_rate,
+        }
+        now = time.monotonic()
+        due = {k: now + random.expovariate(r) for k, r in rates.items() if r > 0}
+        while not stop.is_set() and due:
+            action, when = min(due.items(), key=lambda item: item[1])
+            delay = when - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            due[action] = time.monotonic() + random.expovariate(rates[action])
+            await self._do(ws, action)
+
+    async def _do(self, ws, action: str):
+        if action == "transfer":
+            recipients = [p for p in self.peers if p != self.user_id]
+            if not recipients:
+                return
+            self._transfer_sends.append(time.perf_counter())
+            self.stats.transfers_sent += 1
+            await ws.send(json.dumps({"type": "transfer", "to": random.choice(recipients),
+                                      "amount": round(random.uniform(0.1, 2.0), 2), "fee": 0.01}))
+        elif action == "leaderboard":
+            await ws.send('{"type": "get_leaderboard"}')
+        elif action == "state":
+            await ws.send('{"type": "get_state"}')
+        elif action == "miner":
+            await ws.send('{"type": "leave_mining"}' if self.is_miner else '{"type": "become_miner"}')
+        elif action == "slider" and self.is_miner:
+            # Chase the target with some hand jitter
+            goal = self.target if self.target is not None else self.frequency
+            self.frequency += (goal - self.frequency) * 0.5 + random.gauss(0, 5)
+            await ws.send(json.dumps({"type": "set_frequency", "frequency": round(self.frequency, 1)}))
+
+    async def _read(self, ws):
+        async for message in ws:
+            now = time.perf_counter()
+            self.stats.messages += 1
+            # State broadcasts dominate traffic; don't parse what we don't use
+            if message.startswith('{"type": "state"'):
+                continue
+            data = json.loads(message)
+            msg_type = data.get("type")
+
+            if msg_type == "joined":
+                self.user_id = data["user_id"]
+                self.peers.append(self.user_id)
+                self._joined.set()
+            elif msg_type == "mining_status":
+                self.target = data.get("target_frequency")
+            elif msg_type == "became_miner":
+                self.is_miner = True
+                self.frequency = data["frequency"]
+            elif msg_type == "left_mining":
+                self.is_miner = False
+            elif msg_type == "transaction_pending":
+                if self._transfer_sends:
+                    sent = self._transfer_sends.popleft()
+                    self.stats.pending_latency.append(now - sent)
+                    self._unconfirmed[data["tx"]["tx_id"]] = sent
+            elif msg_type == "transaction_confirmed":
+                sent = self._unconfirmed.pop(data["tx"]["tx_id"], None)
+                if sent is not None:
+                    self.stats.confirm_latency.append(now - sent)
+            elif msg_type == "block_mined":
+                # Server and clients share a host clock
+                self.stats.block_delivery.append(time.time() - data["block"]["timestamp"])
+            elif msg_type == "error":
+                message_text = data.get("message", "")
+                if data.get("code") == "rate_limited":
+                    self.stats.rate_limited += 1
+                else:
+                    self.stats.errors += 1
+                if message_text.startswith("Transaction failed") or message_text == "Rate limited: transfer":
+                    if self._transfer_sends:
+                        self._transfer_sends.popleft()
+                    self.stats.transfers_failed += 1
+
+
+def websockets_connect(uri: str):
+    import websockets
+    return websockets.connect(uri, max_size=None, open_timeout=30, ping_interval=None)
+
+
+def run_client_worker(worker_id: int, args, schedule: list[int], start_at: float, results):
+    """Keep this worker's share of clients connected per ramp step and report stats per step."""
+    _raise_fd_limit()
+    random.seed(worker_id)
+
+    async def work():
+        uri = f"ws://127.0.0.1:{args.port}"
+        stats = WorkerStats()
+        peers: list[str] = []
+        stop = asyncio.Event()
+        tasks = []
+        for step, target in enumerate(schedule):
+            step_start = start_at + step * args.step_seconds
+            await asyncio.sleep(max(0.0, step_start - time.time()))
+            # Ramp up gradually over the first part of the step
+            missing = target - len(tasks)
+            for i in range(missing):
+                client = SimClient(f"loadtest-{worker_id}-{len(tasks)}", args, stats, peers)
+                tasks.append(asyncio.create_task(client.run(uri, stop)))
+                await asyncio.sleep(args.connect_interval)
+            # Discard samples from the ramp-up/settling period
+            await asyncio.sleep(max(0.0, step_start + args.step_seconds * args.settle - time.time()))
+            stats.drain()
+            await asyncio.sleep(max(0.0, step_start + args.step_seconds - time.time()))
+            results.put((worker_id, step, stats.drain()))
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(work())
+
+
+# --- Report ---------------------------------------------------------------
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))]
+    return {"count": len(samples), "p50_ms": pick(0.5) * 1e3, "p99_ms": pick(0.99) * 1e3,
+            "max_ms": samples[-1] * 1e3, "mean_ms": statistics.fmean(samples) * 1e3}
+
+
+def tick_stats(before: dict, after: dict) -> dict:
+    ticks = after["soundchain_mining_tick_seconds_count"] - before["soundchain_mining_tick_seconds_count"]
+    overruns = after["soundchain_mining_tick_overruns_total"] - before["soundchain_mining_tick_overruns_total"]
+    tick_time = after["soundchain_mining_tick_seconds_sum"] - before["soundchain_mining_tick_seconds_sum"]
+    return {
+        "ticks": ticks,
+        "overruns": overruns,
+        "overrun_ratio": overruns / ticks if ticks else 1.0,
+        "mean_tick_ms": tick_time / ticks * 1e3 if ticks else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ramp", default="50,100,250,500", help="comma-separated client counts per step")
+    parser.add_argument("--step-seconds", type=float, default=20.0)
+    parser.add_argument("--settle", type=float, default=0.25, help="fraction of each step ignored as warm-up")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="client processes")
+    parser.add_argument("--connect-interval", type=float, default=0.002, help="seconds between new connections")
+    parser.add_argument("--transfer-rate", type=float, default=0.05, help="transfers/sec per client")
+    parser.add_argument("--leaderboard-rate", type=float, default=0.02, help="leaderboard polls/sec per client")
+    parser.add_argument("--state-rate", type=float, default=0.01, help="get_state polls/sec per client")
+    parser.add_argument("--miner-rate", type=float, default=0.01, help="become/leave miner attempts/sec per client")
+    parser.add_argument("--slider-rate", type=float, default=8.0, help="slider updates/sec per miner")
+    parser.add_argument("--overrun-threshold", type=float, default=0.01,
+                        help="share of missed ticks that counts as 'missing the deadline'")
+    parser.add_argument("--frontends", type=int, default=0,
+                        help="front-end worker processes (0 = the server process serves websockets)")
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--metrics-port", type=int, default=19108)
+    parser.add_argument("--output", default="loadtest_results.json")
+    args = parser.parse_args()
+
+    ramp = [int(n) for n in args.ramp.split(",")]
+    ready = mp.Event()
+    # Daemonic processes can't start the front-end workers
+    server = mp.Process(target=run_server, args=(args.port, args.metrics_port, ready, args.frontends),
+                        daemon=not args.frontends)
+    server.start()
+    if not ready.wait(timeout=60):
+        raise SystemExit("Server did not start")
+
+    # Split every step's client count across workers
+    schedules = [[n // args.workers + (1 if w < n % args.workers else 0) for n in ramp] for w in range(args.workers)]
+    start_at = time.time() + 1.0
+    results = mp.Queue()
+    workers = [mp.Process(target=run_client_worker, args=(w, args, schedules[w], start_at, results), daemon=True)
+               for w in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    steps = []
+    breaking_point = None
+    for step, clients in enumerate(ramp):
+        step_start = start_at + step * args.step_seconds
+        time.sleep(max(0.0, step_start + args.step_seconds * args.settle - time.time()))
+        before, wall_before = scrape_metrics(args.metrics_port), time.time()
+        time.sleep(max(0.0, step_start + args.step_seconds - time.time()))
+        after, wall_after = scrape_metrics(args.metrics_port), time.time()
+
+        merged = WorkerStats()
+        for _ in workers:
+            _, _, data = results.get(timeout=args.step_seconds + 60)
+            for key, value in data.items():
+                setattr(merged, key, getattr(merged, key) + value)
+
+        cpu = after["soundchain_process_cpu_seconds"] - before["soundchain_process_cpu_seconds"]
+        ticks = tick_stats(before, after)
+        report = {
+            "clients": clients,
+            "connected": after["soundchain_connected_clients"],
+            "server_cpu_percent": cpu / (wall_after - wall_before) * 100,
+            "mining_ticks": ticks,
+            "transfer_to_pending": percentiles(merged.pending_latency),
+            "transfer_to_confirmed": percentiles(merged.confirm_latency),
+            "block_mined_delivery": percentiles(merged.block_delivery),
+            "transfers_sent": merged.transfers_sent,
+            "transfers_failed": merged.transfers_failed,
+            "rate_limited": merged.rate_limited,
+            "errors": merged.errors,
+            "connect_failures": merged.connect_failures,
+            "messages_received": merged.messages,
+        }
+        steps.append(report)
+        if breaking_point is None and ticks["overrun_ratio"] > args.overrun_threshold:
+            breaking_point = clients
+
+        pending, confirmed = report["transfer_to_pending"], report["transfer_to_confirmed"]
+        print(f"{clients:6d} clients ({int(report['connected'])} joined) | CPU {report['server_cpu_percent']:5.1f}% | "
+              f"ticks missed {ticks['overrun_ratio'] * 100:5.1f}% | "
+              f"pending p50/p99 {pending.get('p50_ms', float('nan')):.1f}/{pending.get('p99_ms', float('nan')):.1f} ms | "
+              f"confirmed p50/p99 {confirmed.get('p50_ms', float('nan')):.0f}/{confirmed.get('p99_ms', float('nan')):.0f} ms")
+
+    for worker in workers:
+        worker.join(timeout=30)
+    server.terminate()
+
+    if breaking_point is None:
+        print(f"\nMining loop held its {1 / TICK_RATE:.0f} Hz deadline up to {ramp[-1]} clients")
+    else:
+        print(f"\nMining loop starts missing its deadline at {breaking_point} clients")
+
+    with open(args.output, "w") as f:
+        json.dump({"args": vars(args), "steps": steps, "deadline_missed_at_clients": breaking_point}, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
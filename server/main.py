@@ -1,7 +1,12 @@
+import time
+
+# Origin for the startup report, taken before the remaining imports
+_IMPORT_START = time.monotonic()
+
 import asyncio
 import json
-import time
 import os
+from collections.abc import Awaitable, Callable
 from typing import Optional
 from http.server import SimpleHTTPRequestHandler
 from functools import partial
@@ -9,14 +14,21 @@ from functools import partial
 import websockets
 from websockets.server import WebSocketServerProtocol
 
-from blockchain import Blockchain
-from audio import AudioAnalyzer, Buzzer
+# NumPy/SciPy-backed modules (blockchain, audio, explorer, verify, checkpoint,
+# recorder) are imported in SoundChainServer.load(), after the listener is up
+from clock import Clock, SYSTEM_CLOCK
+from ratelimit import ConnectionLimiter
+from sessions import SessionManager
+from watchdog import LoopWatchdog, SamplingProfiler
+import metrics
 import math
+import signal
 
 from config import (
     WEBSOCKET_HOST,
     WEBSOCKET_PORT,
     TICK_RATE,
+    IDLE_TICK_INTERVAL,
     INITIAL_TOLERANCE_HZ,
     MIN_TOLERANCE_HZ,
     MAX_TOLERANCE_HZ,
@@ -31,22 +43,195 @@ from config import (
     MAX_MINER_FREQUENCY,
     DEFAULT_MINER_FREQUENCY,
     MIN_CONTRIBUTION_THRESHOLD,
+    HISTORY_PAGE_SIZE,
+    MAX_TRANSFER_BATCH,
+    EXPLORER_PAGE_SIZE,
+    RATE_LIMITS,
+    DEFAULT_RATE_LIMIT,
+    MESSAGE_BUDGET,
+    THROTTLE_LOG_INTERVAL,
+    METRICS_ENABLED,
+    METRICS_HOST,
+    METRICS_PORT,
+    LOOP_WATCHDOG_ENABLED,
+    LOOP_LAG_THRESHOLD,
+    LOOP_WATCHDOG_INTERVAL,
+    PROFILE_SAMPLE_INTERVAL,
+    PROFILE_MAX_SECONDS,
+    VERIFY_ON_STARTUP,
+    VERIFY_WORKERS,
+    CHECKPOINTS_ENABLED,
+    CHECKPOINT_INTERVAL_BLOCKS,
+    SESSION_GRACE_PERIOD,
+    SESSION_BACKLOG,
+    SAMPLE_RATE,
+    RECORDER_ENABLED,
+    RECORDER_SECONDS,
+    RECORDER_FREEZE_ON_BLOCK,
+    RECORDER_EVENT_LOG_BYTES,
+    RECORDER_KEEP,
+    AUDIO_DEVICE,
+    AUDIO_CHANNELS,
+    DEFAULT_ROOM,
+    ROOMS,
+    FRONTEND_WORKERS,
 )
 
 # Static files directory (relative to server directory)
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "..", "web", "soundchain", "build")
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "data", "profiles")
+ROOMS_DIR = os.path.join(os.path.dirname(__file__), "data", "rooms")  # Rooms other than DEFAULT_ROOM
+FRONTEND_SOCKET = os.path.join(os.path.dirname(__file__), "data", "frontends.sock")
 HTTP_PORT = 8080
 
+# Message types with their own handler latency series; anything else is "other"
+MESSAGE_TYPES = frozenset(
+    ["join", "become_miner", "leave_mining", "set_frequency", "transfer", "transfer_batch", "get_state", "get_leaderboard",
+     "get_history", "get_transaction", "get_block", "get_headers", "get_latest_blocks"]
+)
+EXPLORER_QUERIES = frozenset(["get_block", "get_headers", "get_latest_blocks"])
+
+
+def _optional_int(value) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+_INVALID_EXPLORER_QUERY = b'{"error": "Invalid explorer query"}'
+
+
+def _log_failure(what: str) -> Callable[[asyncio.Future], None]:
+    """Done-callback for background work nobody awaits: print its exception instead of losing it."""
+    def callback(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"{what} failed: {future.exception()!r}")
+    return callback
+
+
+class StartupReport:
+    """Offsets of startup milestones from when main.py started importing."""
+
+    def __init__(self, origin: float = _IMPORT_START):
+        self.origin = origin
+        self.phases: dict[str, float] = {}
+
+    def mark(self, phase: str):
+        if phase not in self.phases:
+            self.phases[phase] = time.monotonic() - self.origin
+            print(f"[startup] {phase} at {self.phases[phase] * 1000:.0f} ms")
+
+    def summary(self) -> str:
+        return " | ".join(f"{phase} {offset * 1000:.0f} ms" for phase, offset in self.phases.items())
+
+
+async def _run_ticks(running: Callable[[], bool], tick: Callable[[], Awaitable[None]],
+                     idle: Optional[Callable[[], bool]] = None, wake: Optional[asyncio.Event] = None):
+    """
+    Call tick() every TICK_RATE seconds while running() holds. While idle()
+    holds, tick every IDLE_TICK_INTERVAL seconds instead, or as soon as `wake` is set.
+    """
+    # Schedule ticks against a fixed deadline so time spent serving clients
+    # between ticks doesn't stretch the tick period
+    next_tick = time.monotonic()
+    while running():
+        tick_start = time.monotonic()
+        await tick()
+
+        now = time.monotonic()
+        metrics.MINING_TICK_SECONDS.observe(now - tick_start)
+        idling = idle is not None and IDLE_TICK_INTERVAL > 0 and idle()
+        metrics.MINING_IDLE.set(1 if idling else 0)
+        if idling:
+            # No await since idle(), so a miner joining from here on sets wake after this clear
+            wake.clear()
+            try:
+                await asyncio.wait_for(wake.wait(), IDLE_TICK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            next_tick = time.monotonic()
+            continue
+        next_tick += TICK_RATE
+        delay = next_tick - now
+        if delay < 0:
+            # Overran the deadline: drop the missed ticks instead of bursting
+            metrics.MINING_TICK_OVERRUNS.inc()
+            metrics.MINING_TICK_OVERRUN_SECONDS.inc(-delay)
+            next_tick = now
+            delay = 0
+        await asyncio.sleep(delay)
+
 
 class SoundChainServer:
-    def __init__(self):
-        self.blockchain = Blockchain()
-        self.audio = AudioAnalyzer()
-        self.buzzer = Buzzer(BUZZER_PIN)
+    """
+    One room: a chain, its miners and difficulty, and the microphone they play
+    into. Used on its own by the tools; RoomHost serves several in one process.
+    """
+
+    def __init__(self, clock: Clock = SYSTEM_CLOCK, load: bool = True, room_id: str = DEFAULT_ROOM,
+                 data_dir: Optional[str] = None, audio_device=AUDIO_DEVICE,
+                 audio_channels: int = AUDIO_CHANNELS,
+                 startup: Optional[StartupReport] = None):
+        """
+        With load=False the ledger, audio analyzer and buzzer are left for the host
+        to load in a worker thread once the websocket listener is accepting.
+        data_dir=None keeps the room's chain and users in blockchain.DATA_DIR.
+        """
+        self.clock = clock
+        self.room_id = room_id
+        self.data_dir = data_dir
+        self.audio_device = audio_device
+        self.audio_channels = audio_channels
+        self.startup = startup or StartupReport()
+        self.blockchain = None
+        self.explorer = None
+        self.audio = None
+        self.buzzer = None
+        self.chain_store = None
+        self.recorder = None
+        # Set once load() has finished; connections accepted earlier wait for it
+        self._ready = asyncio.Event()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # The serving loop, for other threads
+        self._dsp_warm = False
         self.connections: dict[str, WebSocketServerProtocol] = {}
+        self.sessions = SessionManager(SESSION_GRACE_PERIOD, SESSION_BACKLOG)
         self.tolerance_hz = INITIAL_TOLERANCE_HZ  # Hz tolerance for frequency matching
         self._running = False
-        self._drift_start_time = time.time()
+        self._drift_start_time = clock.time()
+        # Latest throttled slider update per miner, applied on the next mining tick
+        self._coalesced_frequencies: dict[str, dict] = {}
+        # Set when a miner joins, to end the mining loop's idle wait (RoomHost shares one between rooms)
+        self.wake = asyncio.Event()
+        # Rejected/coalesced message counts: client label -> {message type: count}
+        self.throttle_counts: dict[str, dict[str, int]] = {}
+        self._last_throttle_log = time.time()
+
+        if load:
+            self.load()
+            self._ready.set()
+
+    def load(self, buzzer=None):
+        """Import the heavy modules and build the ledger and audio analyzer. `buzzer` may be shared."""
+        import blockchain as ledger
+        from audio import AudioAnalyzer, Buzzer
+        from checkpoint import ChainStore
+        from explorer import ChainExplorer
+
+        self.blockchain = ledger.Blockchain(self.clock, data_dir=self.data_dir)
+        self.chain_store = ChainStore(self.data_dir) if CHECKPOINTS_ENABLED else None
+        if self.chain_store:
+            saved = self.chain_store.restore(self.blockchain)
+            if saved:
+                self.tolerance_hz = saved.get("tolerance_hz", self.tolerance_hz)
+        self.explorer = ChainExplorer(self.blockchain)
+        self.startup.mark(f"ledger_loaded:{self.room_id}")
+
+        self.audio = AudioAnalyzer(self.audio_device, self.audio_channels)
+        self.buzzer = buzzer or Buzzer(BUZZER_PIN)
+        if RECORDER_ENABLED:
+            from recorder import FlightRecorder
+            data_dir = self.blockchain.data_dir
+            self.recorder = FlightRecorder(os.path.join(data_dir, "recorder"), os.path.join(data_dir, "recordings"),
+                                           RECORDER_SECONDS, SAMPLE_RATE, RECORDER_EVENT_LOG_BYTES, RECORDER_KEEP)
+            self.audio.recorder = self.recorder
 
     def get_target_frequency(self) -> Optional[float]:
         """Get target frequency with sinusoidal drift - miners try to match this frequency."""
@@ -55,7 +240,7 @@ class SoundChainServer:
             return None
 
         # Calculate drift using sine wave for smooth oscillation
-        elapsed = time.time() - self._drift_start_time
+        elapsed = self.clock.time() - self._drift_start_time
         drift = math.sin(elapsed * TARGET_DRIFT_SPEED * 2 * math.pi) * TARGET_DRIFT_RANGE
 
         # Target frequency drifts around base
@@ -65,14 +250,97 @@ class SoundChainServer:
         target_freq = max(MIN_MINER_FREQUENCY, min(MAX_MINER_FREQUENCY, target_freq))
         return target_freq
 
+    def verify(self) -> bool:
+        from verify import verify_blockchain
+
+        result = verify_blockchain(self.blockchain, workers=VERIFY_WORKERS)
+        if result.ok:
+            print(f"Chain of room {self.room_id} verified: {result.blocks} blocks in "
+                  f"{result.seconds * 1000:.0f} ms ({result.workers} workers)")
+        else:
+            print(f"CHAIN VERIFICATION FAILED in room {self.room_id} at height {result.first_bad_height}: "
+                  f"{result.reason}")
+        return result.ok
+
+    def save_checkpoint(self):
+        """Queue a checkpoint of the current state (written in the background)."""
+        if self.chain_store:
+            self.chain_store.checkpoint(self.blockchain, {"tolerance_hz": self.tolerance_hz})
+
+    def _http_recorder_freeze(self, query: dict[str, str]) -> tuple[int, str, bytes]:
+        if self.recorder is None:
+            return 503, "text/plain; charset=utf-8", b"Still starting up\n"
+        if not self.recorder.freeze("manual"):
+            return 409, "text/plain; charset=utf-8", b"A freeze is already being written\n"
+        return 200, "text/plain; charset=utf-8", f"Freezing, output in {self.recorder.recordings_dir}\n".encode()
+
+    def _http_verify(self, query: dict[str, str]) -> tuple[int, str, bytes]:
+        if not self._ready.is_set() or self.loop is None:
+            return 503, "application/json", b'{"error": "Starting up"}'
+        # Runs on the metrics server's thread while the event loop keeps changing the ledger
+        result = asyncio.run_coroutine_threadsafe(self._verify_live(), self.loop).result()
+        return 200, "application/json", json.dumps(result.to_dict()).encode()
+
+    async def _verify_live(self):
+        """Snapshot the ledger between two loop callbacks, then verify it in a worker thread."""
+        from verify import snapshot_ledger, verify_snapshot
+
+        snapshot = snapshot_ledger(self.blockchain)
+        return await asyncio.to_thread(verify_snapshot, snapshot, VERIFY_WORKERS)
+
+    def _http_block(self, query: dict[str, str]) -> tuple[int, str, bytes]:
+        if self.explorer is None:
+            return 503, "application/json", b'{"error": "Starting up"}'
+        try:
+            height = _optional_int(query.get("height"))
+        except ValueError:
+            return 400, "application/json", _INVALID_EXPLORER_QUERY
+        payload = self.explorer.block_response(height=height, block_hash=query.get("hash"))
+        if payload is None:
+            return 404, "application/json", b'{"error": "Block not found"}'
+        return 200, "application/json", payload.encode()
+
+    def _http_headers(self, query: dict[str, str]) -> tuple[int, str, bytes]:
+        if self.explorer is None:
+            return 503, "application/json", b'{"error": "Starting up"}'
+        try:
+            start, count = int(query.get("start", 0)), int(query.get("count", EXPLORER_PAGE_SIZE))
+        except ValueError:
+            return 400, "application/json", _INVALID_EXPLORER_QUERY
+        payload = self.explorer.headers_response(start, count)
+        return 200, "application/json", payload.encode()
+
+    def _http_latest_blocks(self, query: dict[str, str]) -> tuple[int, str, bytes]:
+        if self.explorer is None:
+            return 503, "application/json", b'{"error": "Starting up"}'
+        try:
+            limit, before = int(query.get("limit", EXPLORER_PAGE_SIZE)), _optional_int(query.get("before"))
+        except ValueError:
+            return 400, "application/json", _INVALID_EXPLORER_QUERY
+        payload = self.explorer.latest_response(limit, before)
+        return 200, "application/json", payload.encode()
+
     async def send_to_user(self, user_id: str, message: dict):
         if user_id in self.connections:
             try:
                 await self.connections[user_id].send(json.dumps(message))
             except websockets.exceptions.ConnectionClosed:
                 pass
+        elif user_id in self.sessions.suspended:
+            self.sessions.record(user_id, message.get("type"), json.dumps(message))
+
+    async def send_raw_to_user(self, user_id: str, payload: str):
+        """Send an already-serialized JSON message."""
+        if user_id in self.connections:
+            try:
+                await self.connections[user_id].send(payload)
+            except websockets.exceptions.ConnectionClosed:
+                pass
+        elif user_id in self.sessions.suspended:
+            self.sessions.record(user_id, json.loads(payload).get("type"), payload)
 
     async def broadcast(self, message: dict, exclude: Optional[str] = None):
+        start = time.perf_counter()
         payload = json.dumps(message)
         for user_id, ws in list(self.connections.items()):
             if user_id != exclude:
@@ -80,20 +348,40 @@ class SoundChainServer:
                     await ws.send(payload)
                 except websockets.exceptions.ConnectionClosed:
                     pass
+        if self.sessions.suspended:
+            self.sessions.record_broadcast(message.get("type"), payload, exclude)
+        metrics.BROADCAST_SECONDS.observe(time.perf_counter() - start)
 
     async def handle_join(self, ws: WebSocketServerProtocol, data: dict) -> Optional[str]:
+        if data.get("resume_token"):
+            user_id = await self.handle_resume(ws, data["resume_token"])
+            if user_id:
+                return user_id
+
         name = data.get("name", "Anonymous")
         device_id = data.get("device_id")  # Optional device ID for authentication
+        if device_id:
+            existing = self.blockchain.get_user_by_device(device_id)
+            if existing is not None:
+                # The web and iOS clients reconnect with device_id, not resume_token
+                session = self.sessions.resume_user(existing.user_id)
+                if session is not None:
+                    return await self._rejoin(ws, existing, session)
+                self._forget_user(existing.user_id)
         user = self.blockchain.create_user(name, device_id=device_id)
+        # create_user frees the slot of a user it restores over; the analyzer must let go too
+        self.audio.remove_miner(user.user_id)
         self.connections[user.user_id] = ws
 
         await self.send_to_user(
             user.user_id,
             {
                 "type": "joined",
+                "room": self.room_id,
                 "user_id": user.user_id,
                 "role": "user",
                 "wallet": user.wallet.to_dict(),
+                "resume_token": self.sessions.create(user.user_id),
             },
         )
 
@@ -101,10 +389,101 @@ class SoundChainServer:
         await self.broadcast_state()
         return user.user_id
 
+    async def handle_resume(self, ws: WebSocketServerProtocol, token: str) -> Optional[str]:
+        """
+        Rebind a suspended (or not yet noticed as closed) session to a new connection
+        and replay what it missed. Touches neither disk nor other clients.
+        """
+        session = self.sessions.resume(token)
+        if session is None:
+            return None
+        user = self.blockchain.get_user(session.user_id)
+        if user is None:
+            self.sessions.discard(session.user_id)
+            return None
+
+        self.connections[user.user_id] = ws
+        metrics.SESSION_RESUMES.inc()
+        dropped = session.dropped
+        missed = session.take_missed()
+        await self.send_to_user(
+            user.user_id,
+            {
+                "type": "resumed",
+                "room": self.room_id,
+                "user_id": user.user_id,
+                "role": "miner" if user.is_miner else "user",
+                "wallet": user.wallet.to_dict(),
+                "miner_slot": user.miner_slot,
+                "frequency": user.frequency,
+                "missed": len(missed),
+                "dropped": dropped,
+            },
+        )
+        for payload in missed:
+            await self.send_raw_to_user(user.user_id, payload)
+        return user.user_id
+
+    async def _rejoin(self, ws: WebSocketServerProtocol, user, session) -> str:
+        """
+        A device_id join for a user whose session is still alive: rebind it like
+        handle_resume (same wallet and miner slot, no disk write or broadcast), but
+        answer with the "joined" and "became_miner" messages these clients expect.
+        """
+        self.connections[user.user_id] = ws
+        metrics.SESSION_RESUMES.inc()
+        missed = session.take_missed()
+        await self.send_to_user(
+            user.user_id,
+            {
+                "type": "joined",
+                "room": self.room_id,
+                "user_id": user.user_id,
+                "role": "miner" if user.is_miner else "user",
+                "wallet": user.wallet.to_dict(),
+                "resume_token": session.token,
+            },
+        )
+        if user.is_miner:
+            await self.send_to_user(
+                user.user_id,
+                {
+                    "type": "became_miner",
+                    "frequency": round(user.frequency),
+                    "slot": user.miner_slot,
+                    "min_frequency": MIN_MINER_FREQUENCY,
+                    "max_frequency": MAX_MINER_FREQUENCY,
+                },
+            )
+        for payload in missed:
+            await self.send_raw_to_user(user.user_id, payload)
+        return user.user_id
+
+    def _forget_user(self, user_id: str):
+        """A user has left for good: persist their wallet and free their miner slot."""
+        self._coalesced_frequencies.pop(user_id, None)
+        self.sessions.discard(user_id)
+        self.blockchain.remove_user(user_id)
+        # Otherwise the analyzer keeps running the FFT (and scoring) for a miner who is gone
+        self.audio.remove_miner(user_id)
+
+    async def expire_sessions(self):
+        expired = self.sessions.expire(self.clock.time())
+        for user_id in expired:
+            self._forget_user(user_id)
+        if expired:
+            await self.broadcast_state()
+
     async def handle_become_miner(self, user_id: str):
         result = self.blockchain.assign_miner_slot(user_id)
         if result:
+            if not self._dsp_warm:
+                # First miner: load SciPy and plan the FFT off the event loop
+                self._dsp_warm = True
+                warm_up = asyncio.get_running_loop().run_in_executor(None, self._warm_up_dsp)
+                warm_up.add_done_callback(_log_failure(f"DSP warm-up of room {self.room_id}"))
             slot, _ = result  # We don't use fixed frequency anymore
+            self.wake.set()
             # Set default frequency for this miner
             self.audio.set_miner_frequency(user_id, DEFAULT_MINER_FREQUENCY)
             await self.send_to_user(
@@ -126,6 +505,11 @@ class SoundChainServer:
 
     async def handle_set_frequency(self, user_id: str, data: dict):
         """Handle miner changing their frequency via slider"""
+        # A fresh accepted update supersedes any coalesced one
+        self._coalesced_frequencies.pop(user_id, None)
+        user = self.blockchain.get_user(user_id)
+        if user is None or not user.is_miner:
+            return
         frequency = data.get("frequency", DEFAULT_MINER_FREQUENCY)
         # Clamp to valid range
         frequency = max(MIN_MINER_FREQUENCY, min(MAX_MINER_FREQUENCY, frequency))
@@ -136,6 +520,7 @@ class SoundChainServer:
     async def handle_leave_mining(self, user_id: str):
         if self.blockchain.release_miner_slot(user_id):
             self.audio.remove_miner(user_id)
+            self._coalesced_frequencies.pop(user_id, None)
             await self.send_to_user(user_id, {"type": "left_mining"})
             await self.broadcast_state()
 
@@ -157,11 +542,162 @@ class SoundChainServer:
                 {"type": "error", "message": f"Transaction failed: {error}"},
             )
 
-    async def handle_message(self, ws: WebSocketServerProtocol, user_id: Optional[str], message: str) -> Optional[str]:
+    async def handle_transfer_batch(self, user_id: str, data: dict):
+        """Many transfers from one sender: one mempool update, one reply, at most one state broadcast."""
+        items = data.get("transfers")
+        if not isinstance(items, list) or not 0 < len(items) <= MAX_TRANSFER_BATCH:
+            await self.send_to_user(
+                user_id,
+                {"type": "error", "message": f"transfers must be a list of 1-{MAX_TRANSFER_BATCH} items"},
+            )
+            return
+
+        transfers = []
+        malformed = set()
+        for i, item in enumerate(items):
+            amount = item.get("amount", 0) if isinstance(item, dict) else None
+            fee = item.get("fee", 0) if isinstance(item, dict) else None
+            if not isinstance(amount, (int, float)) or not isinstance(fee, (int, float)):
+                malformed.add(i)
+                continue
+            transfers.append((item.get("to"), amount, fee))
+
+        outcomes = iter(self.blockchain.add_transactions(user_id, transfers))
+        results = []
+        accepted = 0
+        for i in range(len(items)):
+            tx, error = (None, "Malformed transfer") if i in malformed else next(outcomes)
+            if tx:
+                accepted += 1
+                results.append({"tx_id": tx.tx_id})
+            else:
+                results.append({"error": error})
+
+        await self.send_to_user(
+            user_id,
+            {"type": "transfer_batch_result", "accepted": accepted, "rejected": len(items) - accepted,
+             "results": results},
+        )
+        if accepted:
+            await self.broadcast_state()
+
+    async def handle_get_history(self, user_id: str, data: dict):
+        """Paginated confirmed history for an address (the caller's own wallet by default)."""
+        address = data.get("address") or user_id
+        before = data.get("before")
+        limit = data.get("limit", HISTORY_PAGE_SIZE)
+        if not isinstance(limit, int) or (before is not None and not isinstance(before, int)):
+            await self.send_to_user(user_id, {"type": "error", "message": "Invalid history cursor or limit"})
+            return
+
+        entries, next_cursor = self.blockchain.get_history(address, before=before, limit=limit)
+        response = {
+            "type": "history",
+            "address": address,
+            "transactions": entries,
+            "next_cursor": next_cursor,
+        }
+        if before is None:
+            # First page also carries what's still in the mempool
+            response["pending"] = [tx.to_dict() for tx in self.blockchain.get_pending_for(address)]
+        await self.send_to_user(user_id, response)
+
+    async def handle_get_transaction(self, user_id: str, data: dict):
+        found = self.blockchain.get_transaction(data.get("tx_id"))
+        if found is None:
+            await self.send_to_user(user_id, {"type": "error", "message": "Transaction not found"})
+            return
+        tx, height = found
+        await self.send_to_user(
+            user_id,
+            {
+                "type": "transaction",
+                "tx": tx.to_dict(),
+                "status": "pending" if height is None else "confirmed",
+                "block": height,
+            },
+        )
+
+    async def handle_explorer_query(self, user_id: str, msg_type: str, data: dict):
+        try:
+            if msg_type == "get_block":
+                payload = self.explorer.block_response(height=_optional_int(data.get("height")),
+                                                       block_hash=data.get("hash"))
+            elif msg_type == "get_headers":
+                payload = self.explorer.headers_response(int(data.get("start", 0)),
+                                                         int(data.get("count", EXPLORER_PAGE_SIZE)))
+            else:
+                payload = self.explorer.latest_response(int(data.get("limit", EXPLORER_PAGE_SIZE)),
+                                                        _optional_int(data.get("before")))
+        except (TypeError, ValueError):
+            await self.send_to_user(user_id, {"type": "error", "message": "Invalid explorer query"})
+            return
+
+        if payload is None:
+            await self.send_to_user(user_id, {"type": "error", "message": "Block not found"})
+            return
+        await self.send_raw_to_user(user_id, payload)
+
+    def _record_throttle(self, ws: WebSocketServerProtocol, user_id: Optional[str], msg_type: str):
+        metrics.THROTTLED_MESSAGES.labels(msg_type if msg_type in MESSAGE_TYPES else "other").inc()
+        user = self.blockchain.get_user(user_id) if user_id else None
+        if user:
+            label = f"{user.name} ({user_id[:8]})"
+        else:
+            label = f"unjoined {ws.remote_address}"
+        counts = self.throttle_counts.setdefault(label, {})
+        counts[msg_type] = counts.get(msg_type, 0) + 1
+
+    def _log_throttling(self):
+        now = time.time()
+        if now - self._last_throttle_log < THROTTLE_LOG_INTERVAL:
+            return
+        self._last_throttle_log = now
+        if not self.throttle_counts:
+            return
+        summary = " | ".join(
+            f"{label}: " + ", ".join(f"{t}={n}" for t, n in counts.items())
+            for label, counts in self.throttle_counts.items()
+        )
+        print(f"[RateLimit] Throttled in last {THROTTLE_LOG_INTERVAL:.0f}s: {summary}")
+        self.throttle_counts = {}
+
+    async def handle_throttled(self, ws: WebSocketServerProtocol, user_id: Optional[str],
+                               msg_type: str, data: dict, limiter: ConnectionLimiter):
+        self._record_throttle(ws, user_id, msg_type)
+
+        if msg_type == "set_frequency" and user_id is not None:
+            # Slider spam: keep only the latest position, applied on the next tick
+            self._coalesced_frequencies[user_id] = data
+            return
+
+        await ws.send(json.dumps({
+            "type": "error",
+            "code": "rate_limited",
+            "message": f"Rate limited: {msg_type}",
+            "retry_after": round(limiter.retry_after(msg_type), 3),
+        }))
+
+    async def apply_coalesced_frequencies(self):
+        pending, self._coalesced_frequencies = self._coalesced_frequencies, {}
+        for user_id, data in pending.items():
+            try:
+                await self.handle_set_frequency(user_id, data)
+            except Exception as e:
+                print(f"Error applying coalesced frequency: {e}")
+
+    async def handle_message(self, ws: WebSocketServerProtocol, user_id: Optional[str], message: str,
+                             limiter: Optional[ConnectionLimiter] = None) -> Optional[str]:
+        start = time.perf_counter()
+        msg_type = None
         try:
             data = json.loads(message)
             msg_type = data.get("type")
 
+            if limiter is not None and not limiter.allow(str(msg_type)):
+                await self.handle_throttled(ws, user_id, str(msg_type), data, limiter)
+                return user_id
+
             if msg_type == "join":
                 return await self.handle_join(ws, data)
             elif user_id is None:
@@ -176,6 +712,8 @@ class SoundChainServer:
                 await self.handle_set_frequency(user_id, data)
             elif msg_type == "transfer":
                 await self.handle_transfer(user_id, data)
+            elif msg_type == "transfer_batch":
+                await self.handle_transfer_batch(user_id, data)
             elif msg_type == "get_state":
                 await self.send_to_user(user_id, {"type": "state", **self.blockchain.get_state()})
             elif msg_type == "get_leaderboard":
@@ -183,12 +721,21 @@ class SoundChainServer:
                     user_id,
                     {"type": "leaderboard", "entries": self.blockchain.get_leaderboard()},
                 )
+            elif msg_type == "get_history":
+                await self.handle_get_history(user_id, data)
+            elif msg_type == "get_transaction":
+                await self.handle_get_transaction(user_id, data)
+            elif msg_type in EXPLORER_QUERIES:
+                await self.handle_explorer_query(user_id, msg_type, data)
 
         except json.JSONDecodeError:
             await ws.send(json.dumps({"type": "error", "message": "Invalid JSON"}))
         except Exception as e:
             print(f"Error handling message: {e}")
             await ws.send(json.dumps({"type": "error", "message": str(e)}))
+        finally:
+            label = msg_type if msg_type in MESSAGE_TYPES else "other"
+            metrics.HANDLER_SECONDS.labels(label).observe(time.perf_counter() - start)
 
         return user_id
 
@@ -239,6 +786,9 @@ class SoundChainServer:
             "max_frequency": MAX_MINER_FREQUENCY,
         }
 
+        if self.recorder:
+            self.recorder.record_event("mining_status", status)
+
         # Send to all miners
         for miner in miners:
             await self.send_to_user(miner.user_id, status)
@@ -296,12 +846,30 @@ class SoundChainServer:
         if total_contrib < 0.1:
             return
 
+        block_start_time = self.blockchain.block_start_time
         block = self.blockchain.mine_block(contributions)
         if block:
-            block_time = time.time() - self.blockchain.block_start_time
+            metrics.BLOCKS_MINED.inc()
+            block_time = block.timestamp - block_start_time
             self.adjust_difficulty(block_time)
             # Reset drift timer for next block
-            self._drift_start_time = time.time()
+            self._drift_start_time = self.clock.time()
+
+            if self.recorder:
+                self.recorder.record_event("block", {
+                    "index": block.index,
+                    "hash": block.hash,
+                    "block_time": block_time,
+                    "miner_contributions": block.miner_contributions,
+                    "tolerance_hz": self.tolerance_hz,
+                })
+                if RECORDER_FREEZE_ON_BLOCK:
+                    self.recorder.freeze(f"block-{block.index}")
+
+            if self.chain_store:
+                self.chain_store.append_block(block)
+                if block.index % CHECKPOINT_INTERVAL_BLOCKS == 0:
+                    self.save_checkpoint()
 
             # Buzz!
             self.buzzer.beep()
@@ -334,31 +902,218 @@ class SoundChainServer:
 
             await self.broadcast_state()
 
-    async def mining_loop(self):
-        while self._running:
-            await self.broadcast_mining_status()
-            await self.mine_block_if_ready()
-            await asyncio.sleep(TICK_RATE)
+    async def tick(self):
+        await self.apply_coalesced_frequencies()
+        await self.broadcast_mining_status()
+        await self.mine_block_if_ready()
+        await self.expire_sessions()
+        self._log_throttling()
 
-    async def handle_connection(self, ws: WebSocketServerProtocol):
+    def is_idle(self) -> bool:
+        """No miners: no mining_status to send and no block to mine until one joins."""
+        return self.blockchain is None or not (self.blockchain.get_miners() or self._coalesced_frequencies)
+
+    async def mining_loop(self):
+        await _run_ticks(lambda: self._running, self.tick, self.is_idle, self.wake)
+
+    async def handle_connection(self, ws: WebSocketServerProtocol, first_message: Optional[str] = None,
+                                limiter: Optional[ConnectionLimiter] = None, rate_limit: bool = True):
+        """
+        Serve a connection, starting with `first_message` if the host already read it.
+        rate_limit=False for clients a front-end worker has already rate-limited.
+        """
         user_id: Optional[str] = None
+        if limiter is None and rate_limit:
+            limiter = ConnectionLimiter(RATE_LIMITS, DEFAULT_RATE_LIMIT, MESSAGE_BUDGET)
         try:
+            # Accepted while the ledger is still loading: messages wait in the socket buffer
+            await self._ready.wait()
+            if first_message is not None:
+                user_id = await self.handle_message(ws, user_id, first_message, limiter)
             async for message in ws:
-                user_id = await self.handle_message(ws, user_id, message)
+                user_id = await self.handle_message(ws, user_id, message, limiter)
+                # Yield so a client with a full receive buffer can't starve the mining tick
+                await asyncio.sleep(0)
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
-            if user_id:
-                self.blockchain.remove_user(user_id)
-                if user_id in self.connections:
-                    del self.connections[user_id]
-                await self.broadcast_state()
-
-    async def start(self):
-        self._running = True
+            # If the session was already resumed on a new connection, there is nothing to do
+            if user_id and self.connections.get(user_id) is ws:
+                del self.connections[user_id]
+                if not self.sessions.suspend(user_id, self.clock.time()):
+                    self._forget_user(user_id)
+                    await self.broadcast_state()
+
+    def _warm_up_dsp(self):
+        self.audio.warm_up()
+        self.startup.mark("dsp_warm")
+
+    def _start_audio(self):
+        # Device enumeration and opening the input stream can take a while on the Pi
         self.audio.start()
+        self.startup.mark(f"audio_started:{self.room_id}")
 
-        mining_task = asyncio.create_task(self.mining_loop())
+    def close(self):
+        """Write a final checkpoint and release the microphone and recorder."""
+        self._running = False
+        if self.chain_store:
+            self.save_checkpoint()
+            self.chain_store.close()
+        if self.audio:
+            self.audio.stop()
+        if self.recorder:
+            self.recorder.close()
+
+
+class RoomHost:
+    """
+    Serves several rooms from one process. They share the event loop, the
+    websocket listener, the static and metrics HTTP servers and the buzzer. A
+    connection is bound to a room by its join message, and a single mining
+    loop ticks every room, starting with a different room each tick.
+    """
+
+    def __init__(self, rooms: dict[str, SoundChainServer], default_room: str = DEFAULT_ROOM,
+                 startup: Optional[StartupReport] = None):
+        self.rooms = rooms
+        self.default_room = default_room
+        self.startup = startup or StartupReport()
+        self.buzzer = None
+        # Set once every room has loaded; connections accepted earlier wait for it
+        self._ready = asyncio.Event()
+        if all(room._ready.is_set() for room in rooms.values()):
+            self._ready.set()
+        self._running = False
+        self._first_room = 0
+        self.wake = asyncio.Event()
+        for room in rooms.values():
+            room.wake = self.wake
+
+        rooms = self.rooms.values()
+        metrics.CONNECTED_CLIENTS.set_function(lambda: sum(len(room.connections) for room in rooms))
+        metrics.SUSPENDED_SESSIONS.set_function(lambda: sum(len(room.sessions.suspended) for room in rooms))
+        metrics.MEMPOOL_SIZE.set_function(
+            lambda: sum(len(room.blockchain.pending_transactions) for room in rooms if room.blockchain))
+
+        self.watchdog = LoopWatchdog(LOOP_LAG_THRESHOLD, LOOP_WATCHDOG_INTERVAL) if LOOP_WATCHDOG_ENABLED else None
+        self.profiler = SamplingProfiler(PROFILE_DIR, PROFILE_SAMPLE_INTERVAL, PROFILE_MAX_SECONDS)
+        metrics.add_route("POST", "/debug/profile/start", self._http_profile_start)
+        metrics.add_route("POST", "/debug/profile/stop", self._http_profile_stop)
+        # Per-room endpoints take ?room=<id> (DEFAULT_ROOM without it)
+        metrics.add_route("POST", "/debug/verify", self._room_route("_http_verify"))
+        if RECORDER_ENABLED:
+            metrics.add_route("POST", "/debug/recorder/freeze", self._room_route("_http_recorder_freeze"))
+        metrics.add_route("GET", "/api/block", self._room_route("_http_block"))
+        metrics.add_route("GET", "/api/headers", self._room_route("_http_headers"))
+        metrics.add_route("GET", "/api/blocks/latest", self._room_route("_http_latest_blocks"))
+
+    @classmethod
+    def from_config(cls, clock: Clock = SYSTEM_CLOCK) -> "RoomHost":
+        """The rooms in config.ROOMS, not loaded yet."""
+        startup = StartupReport()
+        rooms = {
+            room_id: SoundChainServer(
+                clock, load=False, room_id=room_id,
+                data_dir=None if room_id == DEFAULT_ROOM else os.path.join(ROOMS_DIR, room_id),
+                audio_device=settings.get("audio_device"),
+                audio_channels=settings.get("channels", AUDIO_CHANNELS), startup=startup)
+            for room_id, settings in ROOMS.items()
+        }
+        return cls(rooms, DEFAULT_ROOM, startup)
+
+    def load(self):
+        from audio import Buzzer
+
+        self.buzzer = Buzzer(BUZZER_PIN)
+        for room in self.rooms.values():
+            room.load(self.buzzer)
+
+    def _room_route(self, handler: str):
+        def route(query: dict[str, str]) -> tuple[int, str, bytes]:
+            room = self.rooms.get(query.get("room", self.default_room))
+            if room is None:
+                return 404, "application/json", b'{"error": "Unknown room"}'
+            return getattr(room, handler)(query)
+        return route
+
+    def _http_profile_start(self, query: dict[str, str]) -> tuple[int, str, bytes]:
+        try:
+            seconds = float(query.get("seconds", 10))
+        except ValueError:
+            seconds = math.nan
+        # Written so nan fails too
+        if not 0 < seconds <= PROFILE_MAX_SECONDS:
+            return 400, "text/plain; charset=utf-8", f"seconds must be in (0, {PROFILE_MAX_SECONDS}]\n".encode()
+        if not self.profiler.start(seconds):
+            return 409, "text/plain; charset=utf-8", b"Profiler already running\n"
+        return 200, "text/plain; charset=utf-8", f"Profiling, output in {PROFILE_DIR}\n".encode()
+
+    def _http_profile_stop(self, query: dict[str, str]) -> tuple[int, str, bytes]:
+        if not self.profiler.stop():
+            return 409, "text/plain; charset=utf-8", b"Profiler not running\n"
+        return 200, "text/plain; charset=utf-8", b"Profiler stopping\n"
+
+    async def handle_connection(self, ws: WebSocketServerProtocol, rate_limit: bool = True):
+        """rate_limit=False for front-end worker clients: the worker has already rate-limited them."""
+        self.startup.mark("first_accept")
+        limiter = ConnectionLimiter(RATE_LIMITS, DEFAULT_RATE_LIMIT, MESSAGE_BUDGET) if rate_limit else None
+        lobby = self.rooms[self.default_room]
+        try:
+            # Accepted while the rooms are still loading: messages wait in the socket buffer
+            await self._ready.wait()
+            async for message in ws:
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError:
+                    data = None
+                if isinstance(data, dict) and data.get("type") == "join":
+                    room_id = data.get("room") or self.default_room
+                    room = self.rooms.get(room_id) if isinstance(room_id, str) else None
+                    if room is not None:
+                        # The room serves the connection from its join message on
+                        await room.handle_connection(ws, message, limiter, rate_limit)
+                        return
+                    if limiter is None or limiter.allow("join"):
+                        await ws.send(json.dumps({"type": "error", "message": f"Unknown room: {room_id}"}))
+                    continue
+                # Not joined yet: the default room answers (errors, rate limiting)
+                await lobby.handle_message(ws, None, message, limiter)
+                await asyncio.sleep(0)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def tick(self):
+        """One mining tick of every room. The starting room rotates so no room always goes last."""
+        rooms = list(self.rooms.values())
+        self._first_room = (self._first_room + 1) % len(rooms)
+        for room in rooms[self._first_room:] + rooms[:self._first_room]:
+            start = time.monotonic()
+            try:
+                await room.tick()
+            except Exception as e:
+                print(f"Error in mining tick of room {room.room_id}: {e}")
+            metrics.ROOM_TICK_SECONDS.labels(room.room_id).observe(time.monotonic() - start)
+            # Serve client messages between rooms
+            await asyncio.sleep(0)
+
+    def is_idle(self) -> bool:
+        return all(room.is_idle() for room in self.rooms.values())
+
+    async def mining_loop(self):
+        await _run_ticks(lambda: self._running, self.tick, self.is_idle, self.wake)
+
+    async def start(self):
+        """
+        Open the websocket listener first, then load the rooms in a worker thread.
+        Audio devices are probed in the background and the FFT is only warmed up
+        when a room gets its first miner.
+        """
+        if self.watchdog:
+            self.watchdog.start()
+
+        if METRICS_ENABLED:
+            metrics.start_metrics_server(METRICS_HOST, METRICS_PORT)
+            print(f"Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
 
         # Start HTTP server for static files
         http_task = None
@@ -368,15 +1123,59 @@ class SoundChainServer:
         else:
             print(f"Static files not found at {STATIC_DIR}, skipping HTTP server")
 
-        print(f"SoundChain server starting on ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
-        async with websockets.serve(self.handle_connection, WEBSOCKET_HOST, WEBSOCKET_PORT):
-            await asyncio.Future()  # Run forever
-
-        mining_task.cancel()
+        print(f"SoundChain server starting on ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT} "
+              f"(rooms: {', '.join(self.rooms)})")
+        # Stop cleanly on SIGTERM (systemctl stop/restart) so the final checkpoint is written
+        stopped = asyncio.get_running_loop().create_future()
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: stopped.done() or stopped.set_result(None))
+        except (NotImplementedError, RuntimeError):
+            pass  # Not available on this platform / thread
+        mining_task = None
+        try:
+            if FRONTEND_WORKERS:
+                from frontend import FrontendPool
+                listener = FrontendPool(partial(self.handle_connection, rate_limit=False), FRONTEND_SOCKET,
+                                        FRONTEND_WORKERS, WEBSOCKET_HOST, WEBSOCKET_PORT)
+            else:
+                listener = websockets.serve(self.handle_connection, WEBSOCKET_HOST, WEBSOCKET_PORT)
+            async with listener:
+                loading = None if self._ready.is_set() else asyncio.ensure_future(asyncio.to_thread(self.load))
+                if FRONTEND_WORKERS:
+                    # The ledger loads meanwhile
+                    await listener.wait_listening()
+                self.startup.mark("listening")
+                if loading:
+                    await loading
+                for room in self.rooms.values():
+                    if VERIFY_ON_STARTUP:
+                        await asyncio.to_thread(room.verify)
+                    room._running = True
+                    room.loop = asyncio.get_running_loop()
+                    room._ready.set()
+                    audio = asyncio.get_running_loop().run_in_executor(None, room._start_audio)
+                    audio.add_done_callback(_log_failure(f"Starting audio of room {room.room_id}"))
+
+                self._running = True
+                mining_task = asyncio.create_task(self.mining_loop())
+                self._ready.set()
+                self.startup.mark("ready")
+                print(f"Startup: {self.startup.summary()}")
+                await stopped
+        finally:
+            self._running = False
+            for room in self.rooms.values():
+                room.close()
+
+        if mining_task:
+            mining_task.cancel()
+        if self.watchdog:
+            self.watchdog.stop()
         if http_task:
             http_task.cancel()
-        self.audio.stop()
-        self.buzzer.cleanup()
+        if self.buzzer:
+            self.buzzer.cleanup()
 
     async def start_http_server(self):
         """Start a simple HTTP server for static files using standard library."""
@@ -408,8 +1207,8 @@ class SoundChainServer:
 
 
 async def main():
-    server = SoundChainServer()
-    await server.start()
+    host = RoomHost.from_config()
+    await host.start()
 
 
 if __name__ == "__main__":
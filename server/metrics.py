@@ -0,0 +1,298 @@
+"""
+Minimal in-process metrics registry with Prometheus text exposition.
+
+Updates are plain attribute/list writes (no locks), so they are cheap enough
+for the audio thread and the mining tick. Readers (the /metrics endpoint) may
+observe a histogram mid-update; that is acceptable for monitoring.
+"""
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, *labelvalues: str):
+        child = self._children.get(labelvalues)
+        if child is None:
+            child = self._new_child()
+            self._children[labelvalues] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _samples(self, labelvalues: tuple[str, ...]) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if self.labelnames:
+            for labelvalues, child in list(self._children.items()):
+                lines.extend(child._samples(labelvalues))
+        else:
+            lines.extend(self._samples(()))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+        self._labelnames = labelnames
+
+    def _new_child(self) -> "Counter":
+        child = Counter(self.name, self.help)
+        child._labelnames = self.labelnames
+        return child
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def _samples(self, labelvalues: tuple[str, ...]) -> list[str]:
+        return [f"{self.name}{_format_labels(self._labelnames, labelvalues)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.value = 0.0
+        self._labelnames = labelnames
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self) -> "Gauge":
+        child = Gauge(self.name, self.help)
+        child._labelnames = self.labelnames
+        return child
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the value at scrape time instead of on every update."""
+        self._function = function
+
+    def _samples(self, labelvalues: tuple[str, ...]) -> list[str]:
+        value = self.value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                value = float("nan")
+        return [f"{self.name}{_format_labels(self._labelnames, labelvalues)} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...], labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket plus the +Inf overflow slot (non-cumulative)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._labelnames = labelnames
+
+    def _new_child(self) -> "Histogram":
+        child = Histogram(self.name, self.help, self.buckets)
+        child._labelnames = self.labelnames
+        return child
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def _samples(self, labelvalues: tuple[str, ...]) -> list[str]:
+        lines = []
+        cumulative = 0
+        counts = list(self.counts)
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self._labelnames, labelvalues, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self._labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_format_value(self.sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...],
+                  labelnames: tuple[str, ...] = ()) -> Histogram:
+        return self.register(Histogram(name, help, buckets, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Bucket layouts (seconds)
+_FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+_TICK_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5)
+
+# DSP
+FFT_FRAME_SECONDS = REGISTRY.histogram(
+    "soundchain_fft_frame_seconds", "Time to analyze one audio chunk (FFT + tone search)", _FAST_BUCKETS)
+AUDIO_QUEUE_DEPTH = REGISTRY.gauge(
+    "soundchain_audio_queue_depth", "Audio chunks waiting for analysis")
+DSP_SKIPPED_FRAMES = REGISTRY.counter(
+    "soundchain_dsp_skipped_frames_total", "Audio chunks not analyzed, by reason (no_miners, silence)", ("reason",))
+
+# Event loop
+MINING_TICK_SECONDS = REGISTRY.histogram(
+    "soundchain_mining_tick_seconds", "Duration of one mining_loop tick", _TICK_BUCKETS)
+MINING_TICK_OVERRUNS = REGISTRY.counter(
+    "soundchain_mining_tick_overruns_total", "Mining ticks that missed their deadline")
+MINING_TICK_OVERRUN_SECONDS = REGISTRY.counter(
+    "soundchain_mining_tick_overrun_seconds_total", "Total time mining ticks ran past their deadline")
+MINING_IDLE = REGISTRY.gauge(
+    "soundchain_mining_idle", "1 while the mining loop is idling (no miners)")
+ROOM_TICK_SECONDS = REGISTRY.histogram(
+    "soundchain_room_tick_seconds", "One room's share of a mining tick", _TICK_BUCKETS, ("room",))
+
+# Websocket
+BROADCAST_SECONDS = REGISTRY.histogram(
+    "soundchain_broadcast_seconds", "Time to fan a message out to all connections", _FAST_BUCKETS)
+HANDLER_SECONDS = REGISTRY.histogram(
+    "soundchain_handler_seconds", "Message handler latency by message type", _FAST_BUCKETS, ("type",))
+THROTTLED_MESSAGES = REGISTRY.counter(
+    "soundchain_throttled_messages_total", "Messages rejected or coalesced by rate limiting", ("type",))
+CONNECTED_CLIENTS = REGISTRY.gauge(
+    "soundchain_connected_clients", "Joined websocket connections")
+SUSPENDED_SESSIONS = REGISTRY.gauge(
+    "soundchain_suspended_sessions", "Disconnected users within their resume grace period")
+SESSION_RESUMES = REGISTRY.counter(
+    "soundchain_session_resumes_total", "Reconnects that resumed a session instead of re-joining")
+
+# Ledger
+MEMPOOL_SIZE = REGISTRY.gauge(
+    "soundchain_mempool_size", "Pending transactions")
+BLOCKS_MINED = REGISTRY.counter(
+    "soundchain_blocks_mined_total", "Blocks mined since start")
+
+# Process
+PROCESS_CPU_SECONDS = REGISTRY.gauge(
+    "soundchain_process_cpu_seconds", "CPU time (user + system) consumed by the server process")
+PROCESS_CPU_SECONDS.set_function(time.process_time)
+
+# Watchdog
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "soundchain_loop_lag_seconds", "Event loop scheduling lag measured by the watchdog", _TICK_BUCKETS)
+LOOP_STALLS = REGISTRY.counter(
+    "soundchain_loop_stalls_total", "Event loop stalls longer than the watchdog threshold")
+
+
+# Route handler: query params -> (status, content type, body)
+RouteHandler = Callable[[dict[str, str]], tuple[int, str, bytes]]
+
+_routes: dict[tuple[str, str], RouteHandler] = {}
+
+
+def add_route(method: str, path: str, handler: RouteHandler):
+    """Expose an extra endpoint on the local metrics server (e.g. debug controls)."""
+    _routes[(method, path)] = handler
+
+
+def _render_metrics(query: dict[str, str]) -> tuple[int, str, bytes]:
+    return 200, "text/plain; version=0.0.4; charset=utf-8", REGISTRY.render().encode()
+
+
+add_route("GET", "/metrics", _render_metrics)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        handler = _routes.get((method, url.path))
+        if handler is None:
+            self.send_error(404)
+            return
+        try:
+            status, content_type, body = handler(dict(parse_qsl(url.query)))
+        except Exception as e:
+            status, content_type, body = 500, "text/plain; charset=utf-8", f"{e}\n".encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        pass  # Suppress logging
+
+
+def start_metrics_server(host: str, port: int) -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread so scrapes never block the event loop."""
+    httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
+
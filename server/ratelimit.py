@@ -0,0 +1,87 @@
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Classic token bucket: refills at `rate` tokens/sec up to `burst` tokens."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def available(self, now: float, tokens: float = 1.0) -> bool:
+        """Whether `tokens` could be consumed now, without consuming them."""
+        self._refill(now)
+        return self.tokens >= tokens
+
+    def consume(self, now: float, tokens: float = 1.0) -> bool:
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def retry_after(self, now: float, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` will be available."""
+        self._refill(now)
+        missing = tokens - self.tokens
+        if missing <= 0 or self.rate <= 0:
+            return 0.0
+        return missing / self.rate
+
+
+class ConnectionLimiter:
+    """
+    Per-connection message limiter.
+
+    Every message must pass two buckets: the overall message budget for the
+    connection, and the bucket for its message type (or the default bucket for
+    types without an explicit limit). Rejections are counted per type so the
+    server can report who is being throttled.
+    """
+
+    def __init__(self, limits: dict[str, tuple[float, float]],
+                 default_limit: tuple[float, float], budget: tuple[float, float]):
+        now = time.monotonic()
+        self._limits = limits
+        self._default_limit = default_limit
+        self._budget = TokenBucket(*budget, now=now)
+        self._buckets: dict[str, TokenBucket] = {}
+        self.throttled: dict[str, int] = {}
+        self.throttled_total = 0
+
+    def _bucket(self, msg_type: str, now: float) -> TokenBucket:
+        # Unknown types share one bucket so arbitrary "type" strings can't mint new ones
+        key = msg_type if msg_type in self._limits else "*"
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, burst = self._limits.get(key, self._default_limit)
+            bucket = TokenBucket(rate, burst, now=now)
+            self._buckets[key] = bucket
+        return bucket
+
+    def allow(self, msg_type: str) -> bool:
+        now = time.monotonic()
+        bucket = self._bucket(msg_type, now)
+        # Take from neither unless both have a token, so a rejected message costs nothing
+        if bucket.available(now) and self._budget.available(now):
+            bucket.consume(now)
+            self._budget.consume(now)
+            return True
+        self.throttled[msg_type] = self.throttled.get(msg_type, 0) + 1
+        self.throttled_total += 1
+        return False
+
+    def retry_after(self, msg_type: str) -> float:
+        now = time.monotonic()
+        return max(self._bucket(msg_type, now).retry_after(now), self._budget.retry_after(now))
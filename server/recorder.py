@@ -0,0 +1,157 @@
+"""
+Flight recorder for postmortems of blocks that didn't register.
+
+Keeps the last few minutes of microphone audio in a memory-mapped int16 ring
+(data/recorder/audio.ring) and game events (per-frame detections,
+mining_status snapshots, blocks) in an append-only JSON-lines log. Both
+survive a crash. freeze() copies the current window to
+data/recordings/<time>-<reason>/ as audio.wav, events.jsonl and meta.json,
+on a background thread.
+
+The analysis thread only pays for an int16 conversion, a ring copy and one
+JSON line per frame.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import wave
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+_HEADER_WORDS = 2  # uint64: samples written in total, wall time of the last write (float64 bits)
+
+
+class FlightRecorder:
+    def __init__(self, directory: str, recordings_dir: str, seconds: float, sample_rate: int,
+                 event_log_bytes: int, keep: int):
+        self.directory = directory
+        self.recordings_dir = recordings_dir
+        self.sample_rate = sample_rate
+        self.seconds = seconds
+        self.event_log_bytes = event_log_bytes
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        os.makedirs(recordings_dir, exist_ok=True)
+
+        self._size = int(seconds * sample_rate)
+        ring_path = os.path.join(directory, "audio.ring")
+        header_bytes = _HEADER_WORDS * 8
+        if not os.path.exists(ring_path) or os.path.getsize(ring_path) != header_bytes + self._size * 2:
+            with open(ring_path, "wb") as f:
+                f.truncate(header_bytes + self._size * 2)
+        self._header = np.memmap(ring_path, dtype=np.uint64, mode="r+", shape=(_HEADER_WORDS,))
+        self._ring = np.memmap(ring_path, dtype=np.int16, mode="r+", offset=header_bytes, shape=(self._size,))
+        self._written = 0  # Samples written this run
+        self._last_write = 0.0
+
+        self._lock = threading.Lock()
+        self._events: deque[tuple[float, str]] = deque()
+        self._log_path = os.path.join(directory, "events.jsonl")
+        self._log = open(self._log_path, "a")
+        self._freezing = threading.Event()
+
+    # --- Recording (hot paths) ---
+
+    def record_audio(self, samples: np.ndarray):
+        """Append float samples in [-1, 1]. Called from the analysis thread only."""
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        if len(pcm) > self._size:
+            pcm = pcm[-self._size:]
+        start = self._written % self._size
+        first = min(len(pcm), self._size - start)
+        self._ring[start:start + first] = pcm[:first]
+        self._ring[:len(pcm) - first] = pcm[first:]
+        self._written += len(pcm)
+        self._last_write = time.time()
+        self._header[0] = self._written
+        self._header[1] = np.float64(self._last_write).view(np.uint64)
+
+    def record_event(self, kind: str, data: dict):
+        """Append an event. Safe from any thread."""
+        now = time.time()
+        line = json.dumps({"t": now, "type": kind, "data": data})
+        with self._lock:
+            self._events.append((now, line))
+            horizon = now - self.seconds
+            while self._events[0][0] < horizon:
+                self._events.popleft()
+            self._log.write(line + "\n")
+            if self._log.tell() > self.event_log_bytes:
+                self._rotate_log()
+
+    def _rotate_log(self):
+        self._log.close()
+        os.replace(self._log_path, self._log_path + ".1")
+        self._log = open(self._log_path, "a")
+
+    # --- Freezing ---
+
+    def freeze(self, reason: str) -> bool:
+        """Write the current window to a recording in the background. False if a freeze is already running."""
+        if self._freezing.is_set():
+            return False
+        self._freezing.set()
+        with self._lock:
+            events = [line for _, line in self._events]
+            self._log.flush()
+        threading.Thread(target=self._write_recording, args=(reason, events), daemon=True,
+                         name="recorder-freeze").start()
+        return True
+
+    def _window(self) -> tuple[np.ndarray, float]:
+        """Chronological copy of the ring and the wall time of its last sample."""
+        written, end_time = self._written, self._last_write
+        start = written % self._size
+        if written < self._size:
+            audio = np.array(self._ring[:written])
+        else:
+            audio = np.concatenate([self._ring[start:], self._ring[:start]])
+        # The analysis thread kept writing during the copy; drop what it overwrote
+        overwritten = min(len(audio), self._written - written)
+        return audio[overwritten:], end_time
+
+    def _write_recording(self, reason: str, events: list[str]):
+        try:
+            audio, end_time = self._window()
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime())
+            path = os.path.join(self.recordings_dir, f"{stamp}-{reason}")
+            os.makedirs(path, exist_ok=True)
+            with wave.open(os.path.join(path, "audio.wav"), "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(self.sample_rate)
+                wav.writeframes(audio.tobytes())
+            with open(os.path.join(path, "events.jsonl"), "w") as f:
+                f.writelines(line + "\n" for line in events)
+            with open(os.path.join(path, "meta.json"), "w") as f:
+                json.dump({
+                    "reason": reason,
+                    "frozen_at": time.time(),
+                    "sample_rate": self.sample_rate,
+                    "samples": len(audio),
+                    "audio_start": end_time - len(audio) / self.sample_rate,
+                    "audio_end": end_time,
+                    "events": len(events),
+                }, f, indent=2)
+            for old in sorted(os.listdir(self.recordings_dir))[:-self.keep]:
+                shutil.rmtree(os.path.join(self.recordings_dir, old), ignore_errors=True)
+        except OSError as e:
+            print(f"Error writing recording: {e}")
+        finally:
+            self._freezing.clear()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a running freeze has finished (tests, shutdown)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._freezing.is_set() and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.01)
+
+    def close(self):
+        self.wait(timeout=5.0)
+        with self._lock:
+            self._log.close()
+        self._ring.flush()
@@ -0,0 +1,115 @@
+"""
+Resumable sessions for clients on flaky Wi-Fi.
+
+A dropped connection doesn't remove its user straight away: the session is
+suspended for a grace period, keeping the wallet, miner slot and frequency.
+Messages meant for the user meanwhile are kept for replay (only the latest
+"state" is kept, mining_status is dropped). Reconnecting with the
+resume_token from "joined" rebinds the user without a disk write or a
+broadcast. Sessions not resumed in time are removed as if the user had left.
+"""
+import secrets
+from collections import deque
+from typing import Optional
+
+# Ephemeral messages that are stale by the time a client resumes
+_NOT_REPLAYED = frozenset(["mining_status"])
+
+
+class Session:
+    __slots__ = ("user_id", "token", "expires_at", "missed", "state", "dropped")
+
+    def __init__(self, user_id: str, token: str, backlog: int):
+        self.user_id = user_id
+        self.token = token
+        self.expires_at: Optional[float] = None  # Set while suspended
+        self.missed: deque[str] = deque(maxlen=backlog)
+        self.state: Optional[str] = None
+        self.dropped = 0
+
+    def record(self, msg_type: Optional[str], payload: str):
+        if msg_type in _NOT_REPLAYED:
+            return
+        if msg_type == "state":
+            self.state = payload
+            return
+        if len(self.missed) == self.missed.maxlen:
+            self.dropped += 1
+        self.missed.append(payload)
+
+    def take_missed(self) -> list[str]:
+        """Missed messages in order, the latest state last. Clears the backlog."""
+        payloads = list(self.missed)
+        if self.state is not None:
+            payloads.append(self.state)
+        self.missed.clear()
+        self.state = None
+        self.dropped = 0
+        return payloads
+
+
+class SessionManager:
+    def __init__(self, grace_period: float, backlog: int):
+        self.grace_period = grace_period
+        self.backlog = backlog
+        self._by_token: dict[str, Session] = {}
+        self._by_user: dict[str, Session] = {}
+        self.suspended: dict[str, Session] = {}  # user_id -> session
+
+    def create(self, user_id: str) -> str:
+        """Start a session for a newly joined user. Returns its resume token."""
+        self.discard(user_id)
+        session = Session(user_id, secrets.token_urlsafe(24), self.backlog)
+        self._by_token[session.token] = session
+        self._by_user[user_id] = session
+        return session.token
+
+    def suspend(self, user_id: str, now: float) -> bool:
+        """Keep a disconnected user's session. False if it can't be resumed (no session or no grace period)."""
+        session = self._by_user.get(user_id)
+        if session is None or self.grace_period <= 0:
+            self.discard(user_id)
+            return False
+        session.expires_at = now + self.grace_period
+        self.suspended[user_id] = session
+        return True
+
+    def resume(self, token: str) -> Optional[Session]:
+        """
+        Session for a resume token, if it is still alive. The old connection may
+        not have been noticed as closed yet, so active sessions resume as well.
+        """
+        session = self._by_token.get(token) if isinstance(token, str) else None
+        if session is None:
+            return None
+        self.suspended.pop(session.user_id, None)
+        session.expires_at = None
+        return session
+
+    def resume_user(self, user_id: str) -> Optional[Session]:
+        """resume() for a client that reconnected with its device_id instead of the token."""
+        session = self._by_user.get(user_id)
+        return self.resume(session.token) if session is not None else None
+
+    def record(self, user_id: str, msg_type: Optional[str], payload: str):
+        session = self.suspended.get(user_id)
+        if session is not None:
+            session.record(msg_type, payload)
+
+    def record_broadcast(self, msg_type: Optional[str], payload: str, exclude: Optional[str] = None):
+        for user_id, session in self.suspended.items():
+            if user_id != exclude:
+                session.record(msg_type, payload)
+
+    def expire(self, now: float) -> list[str]:
+        """Discard sessions whose grace period is over. Returns their user ids."""
+        expired = [user_id for user_id, session in self.suspended.items() if session.expires_at <= now]
+        for user_id in expired:
+            self.discard(user_id)
+        return expired
+
+    def discard(self, user_id: str):
+        session = self._by_user.pop(user_id, None)
+        if session is not None:
+            self._by_token.pop(session.token, None)
+        self.suspended.pop(user_id, None)
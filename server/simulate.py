@@ -0,0 +1,199 @@
+"""
+Headless accelerated simulation for difficulty and economy tuning.
+
+Drives a real SoundChainServer on a VirtualClock: no websockets, no
+microphone, no sleeping. Every simulated 100 ms tick, scripted miners move
+their sliders toward the drifting target (with reaction lag and hand
+jitter), the synthetic "microphone" reports a tone per miner (with
+detection noise and dropouts), users submit transactions as a Poisson
+process, and the server's own mine_block_if_ready() decides whether a
+block is mined and retargets the tolerance.
+
+    python simulate.py --blocks 2000
+    python simulate.py --blocks 500 --miners 2 --reaction 0.1 --output slow_miners.json
+
+Output: block-time distribution, tolerance trajectory and supply curve
+(JSON with one record per block, plus a printed summary).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import blockchain
+from clock import VirtualClock
+from config import (
+    TICK_RATE,
+    INITIAL_BALANCE,
+    MIN_MINER_FREQUENCY,
+    MAX_MINER_FREQUENCY,
+    HALVING_INTERVAL,
+)
+
+
+class _SilentBuzzer:
+    def beep(self, duration: float = 0.2):
+        pass
+
+    def cleanup(self):
+        pass
+
+
+class ScriptedMiner:
+    """A miner who steers toward the target with first-order lag plus jitter."""
+
+    def __init__(self, user_id: str, reaction: float, jitter_hz: float, rng: random.Random):
+        self.user_id = user_id
+        self.reaction = reaction
+        self.jitter_hz = jitter_hz
+        self.rng = rng
+        self.frequency = rng.uniform(MIN_MINER_FREQUENCY, MAX_MINER_FREQUENCY)
+
+    def move(self, target: float) -> float:
+        self.frequency += (target - self.frequency) * self.reaction + self.rng.gauss(0.0, self.jitter_hz)
+        self.frequency = max(MIN_MINER_FREQUENCY, min(MAX_MINER_FREQUENCY, self.frequency))
+        return self.frequency
+
+
+async def simulate(args) -> dict:
+    from main import SoundChainServer
+
+    rng = random.Random(args.seed)
+    clock = VirtualClock(start=1_700_000_000.0)
+    server = SoundChainServer(clock=clock)
+    server.buzzer = _SilentBuzzer()
+    chain = server.blockchain
+
+    users = [chain.create_user(f"user{i}").user_id for i in range(args.users)]
+    miners = []
+    for i in range(args.miners):
+        user_id = chain.create_user(f"miner{i}").user_id
+        await server.handle_become_miner(user_id)
+        miners.append(ScriptedMiner(user_id, args.reaction, args.jitter_hz, rng))
+
+    supply = INITIAL_BALANCE * (args.users + args.miners)
+    start = clock.time()
+    blocks = []
+    next_tx = clock.time() + rng.expovariate(args.tx_rate)
+    ticks = 0
+    max_ticks = int(args.max_hours * 3600 / TICK_RATE)
+
+    while len(blocks) < args.blocks and ticks < max_ticks:
+        ticks += 1
+        clock.advance(TICK_RATE)
+
+        while next_tx <= clock.time():
+            sender, receiver = rng.sample(users, 2)
+            chain.add_transaction(sender, receiver, round(rng.uniform(0.1, 5.0), 2), args.fee)
+            next_tx += rng.expovariate(args.tx_rate)
+
+        # Miners react to the target they see on their phone; the mic hears their tones
+        target = server.get_target_frequency()
+        tones = []
+        for miner in miners:
+            frequency = miner.move(target if target is not None else miner.frequency)
+            await server.handle_set_frequency(miner.user_id, {"frequency": frequency})
+            if rng.random() >= args.dropout:
+                detected = frequency + rng.gauss(0.0, args.detection_noise_hz)
+                tones.append((detected, 50.0, rng.uniform(args.purity_min, 1.0)))
+        server.audio.detected_tones = tones
+
+        tolerance_before = server.tolerance_hz
+        block_start_time = chain.block_start_time
+        height = len(chain.chain)
+        reward = chain.get_block_reward()
+        await server.mine_block_if_ready()
+        if len(chain.chain) > height:
+            block = chain.last_block
+            supply += reward  # Fees move existing coins, only the subsidy is new
+            blocks.append({
+                "height": block.index,
+                "time": block.timestamp - start,
+                "block_time": block.timestamp - block_start_time,
+                "transactions": len(block.transactions),
+                "reward": reward,
+                "fees": block.total_reward - reward,
+                "tolerance_before": tolerance_before,
+                "tolerance_after": server.tolerance_hz,
+                "supply": supply,
+            })
+
+    return {"blocks": blocks, "simulated_seconds": ticks * TICK_RATE, "ticks": ticks}
+
+
+def summarize(result: dict) -> dict:
+    blocks = result["blocks"]
+    if not blocks:
+        return {"blocks": 0}
+    block_times = sorted(b["block_time"] for b in blocks)
+    pick = lambda q: block_times[min(len(block_times) - 1, int(len(block_times) * q))]
+    edges = [0, 5, 10, 15, 20, 30, 45, 60, 120, float("inf")]
+    histogram = {}
+    for lo, hi in zip(edges, edges[1:]):
+        label = f"{lo}-{hi}s" if hi != float("inf") else f">{lo}s"
+        histogram[label] = sum(1 for t in block_times if lo <= t < hi)
+    tolerances = [b["tolerance_after"] for b in blocks]
+    return {
+        "blocks": len(blocks),
+        "simulated_hours": result["simulated_seconds"] / 3600,
+        "block_time": {
+            "mean_s": statistics.fmean(block_times),
+            "p10_s": pick(0.1),
+            "p50_s": pick(0.5),
+            "p90_s": pick(0.9),
+            "histogram": histogram,
+        },
+        "tolerance": {
+            "min_hz": min(tolerances),
+            "max_hz": max(tolerances),
+            "mean_hz": statistics.fmean(tolerances),
+            "final_hz": tolerances[-1],
+        },
+        "final_supply": blocks[-1]["supply"],
+        "final_reward": blocks[-1]["reward"],
+        "halvings": blocks[-1]["height"] // HALVING_INTERVAL,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=1000, help="stop after this many blocks")
+    parser.add_argument("--max-hours", type=float, default=1000.0, help="stop after this much simulated time")
+    parser.add_argument("--miners", type=int, default=4)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tx-rate", type=float, default=0.2, help="transactions per simulated second")
+    parser.add_argument("--fee", type=float, default=0.05)
+    parser.add_argument("--reaction", type=float, default=0.15, help="share of the gap to the target closed per tick")
+    parser.add_argument("--jitter-hz", type=float, default=4.0, help="slider hand jitter per tick")
+    parser.add_argument("--detection-noise-hz", type=float, default=5.0, help="FFT frequency error")
+    parser.add_argument("--dropout", type=float, default=0.1, help="probability a miner's tone is missed per tick")
+    parser.add_argument("--purity-min", type=float, default=0.6, help="detected purity is uniform in [min, 1]")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="simulation_results.json")
+    args = parser.parse_args()
+
+    # Keep simulated wallets out of data/users.json
+    tmp = tempfile.TemporaryDirectory()
+    blockchain.DATA_DIR = tmp.name
+    blockchain.USERS_FILE = os.path.join(tmp.name, "users.json")
+
+    started = time.perf_counter()
+    result = asyncio.run(simulate(args))
+    elapsed = time.perf_counter() - started
+    summary = summarize(result)
+    summary["wall_seconds"] = elapsed
+    summary["speedup"] = result["simulated_seconds"] / elapsed if elapsed else None
+
+    print(json.dumps(summary, indent=2))
+    with open(args.output, "w") as f:
+        json.dump({"args": vars(args), "summary": summary, "blocks": result["blocks"]}, f, indent=2)
+    print(f"Wrote {args.output}")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
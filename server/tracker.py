@@ -0,0 +1,150 @@
+"""
+Per-miner tone tracking.
+
+The stateless detector scans the whole detectable range every frame and
+replaces detected_tones wholesale, so one noisy frame zeroes a miner's
+contribution. A ToneTracker keeps an estimate per miner instead: frequency,
+power and purity, blended over frames, and a confidence. While a track is
+held, the analyzer only looks a few bins either side of its frequency. A
+frame without the tone lowers the confidence rather than dropping the miner.
+After TRACK_HOLD_FRAMES misses in a row the track is lost, and the analyzer
+falls back to the full scan to find it again.
+
+Miners without a track are looked for by a full scan as soon as they appear
+(joined, track lost, slider moved); that frame the held tracks are updated
+from the scan too, instead of by narrow searches. A miner the scan didn't
+find is looked for again every TRACK_SCAN_INTERVAL frames, so a silent phone
+doesn't cost a full scan per frame. After a silent frame (below the noise
+gate) they are looked for on the next one, so a tone is found on its first
+frame.
+
+With several microphones, a miner's tone is fused per miner: on each
+channel the tone nearest the miner (within the search window), then the one
+from the channel with the best SNR. So the same phone landing a bin apart on
+two microphones, or drifting by a bin, still counts once for its miner.
+Tones less than about two bins apart (~43 Hz at FFT_WINDOW 2048) are one
+peak in the spectrum; miners that close share it, as they do with the
+stateless detector.
+
+The tracker only keeps state; AudioAnalyzer does the DSP.
+"""
+from typing import Optional
+
+
+class Track:
+    __slots__ = ("frequency", "power", "purity", "misses", "confidence")
+
+    def __init__(self, frequency: float, power: float, purity: float):
+        self.frequency = frequency
+        self.power = power
+        self.purity = purity
+        self.misses = 0  # Frames in a row without the tone
+        self.confidence = 1.0
+
+
+class ToneTracker:
+    def __init__(self, window_hz: float, smoothing: float, hold_frames: int, scan_interval: int,
+                 acquire_hz: float = 50.0):
+        self.window_hz = window_hz  # Search ± around a track's frequency
+        self.smoothing = smoothing  # Weight of the newest frame in an estimate
+        self.hold_frames = hold_frames
+        self.scan_interval = scan_interval
+        self.acquire_hz = acquire_hz  # How far from the slider frequency a tone still belongs to the miner
+        self.tracks: dict[str, Track] = {}
+        # Miners the last full scan didn't find, with their slider frequency at the time
+        self._not_found: dict[str, float] = {}
+        self._frames_since_scan = 0
+
+    def sync(self, miners: dict[str, float]):
+        """Drop tracks of miners who left, or whose slider has moved away from their tone."""
+        for user_id in list(self.tracks):
+            frequency = miners.get(user_id)
+            if frequency is None or abs(self.tracks[user_id].frequency - frequency) >= self.acquire_hz:
+                del self.tracks[user_id]
+        for user_id in list(self._not_found):
+            if user_id not in miners:
+                del self._not_found[user_id]
+
+    def observe(self, user_ids: list[str], tones: list[Optional[tuple]]):
+        """Update tracks with what this frame's search found for each: (frequency, power, purity) or None."""
+        alpha = self.smoothing
+        for user_id, tone in zip(user_ids, tones):
+            track = self.tracks[user_id]
+            if tone is None:
+                track.misses += 1
+                if track.misses > self.hold_frames:
+                    del self.tracks[user_id]
+                else:
+                    track.confidence = 1.0 - track.misses / (self.hold_frames + 1)
+                continue
+            frequency, power, purity = tone[:3]
+            track.frequency += alpha * (frequency - track.frequency)
+            track.power += alpha * (power - track.power)
+            track.purity += alpha * (purity - track.purity)
+            track.misses = 0
+            track.confidence = 1.0
+
+    def observe_scan(self, channel_tones: list[list[tuple]]):
+        """observe() with a full scan's per-channel tones, fused per track within window_hz."""
+        user_ids = list(self.tracks)
+        self.observe(user_ids, [_fuse(channel_tones, self.tracks[user_id].frequency, self.window_hz)
+                                for user_id in user_ids])
+
+    def silence(self):
+        """A frame too quiet to hold any tone: held tracks miss it, and the next frame scans for everyone else."""
+        user_ids = list(self.tracks)
+        self.observe(user_ids, [None] * len(user_ids))
+        self._not_found = {}
+
+    def needs_scan(self, miners: dict[str, float]) -> bool:
+        """Whether this frame needs a full scan to find miners without a track."""
+        self._frames_since_scan += 1
+        untracked = [user_id for user_id in miners if user_id not in self.tracks]
+        if not untracked:
+            return False
+        if any(self._not_found.get(user_id) != miners[user_id] for user_id in untracked):
+            return True
+        return self._frames_since_scan >= self.scan_interval
+
+    def acquire(self, miners: dict[str, float], channel_tones: list[list[tuple]]):
+        """Start tracks for untracked miners from a full scan's per-channel tones, fused around their slider."""
+        self._frames_since_scan = 0
+        self._not_found = {}
+        for user_id, miner_freq in miners.items():
+            if user_id in self.tracks:
+                continue
+            tone = _fuse(channel_tones, miner_freq, self.acquire_hz)
+            if tone is None:
+                self._not_found[user_id] = miner_freq
+            else:
+                self.tracks[user_id] = Track(*tone[:3])
+
+    def tones(self) -> list[tuple[float, float, float]]:
+        """Current estimates as detected tones, strongest first."""
+        tracks = sorted(self.tracks.values(), key=lambda track: track.power, reverse=True)
+        return [(track.frequency, track.power, track.purity) for track in tracks]
+
+    def clear(self):
+        self.tracks = {}
+        self._not_found = {}
+
+
+def _fuse(channel_tones: list[list[tuple]], frequency: float, within_hz: float) -> Optional[tuple]:
+    """One miner's tone: the nearest to `frequency` on each channel, from the channel with the best SNR."""
+    best = None
+    for tones in channel_tones:
+        tone = _nearest(tones, frequency, within_hz)
+        if tone is not None and (best is None or tone[3] > best[3]):
+            best = tone
+    return best
+
+
+def _nearest(tones: list[tuple], frequency: float, within_hz: float) -> Optional[tuple]:
+    best_match = None
+    best_distance = within_hz
+    for tone in tones:
+        distance = abs(tone[0] - frequency)
+        if distance < best_distance:
+            best_match = tone
+            best_distance = distance
+    return best_match
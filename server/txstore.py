@@ -0,0 +1,111 @@
+"""
+Columnar store for confirmed transactions.
+
+Confirmed transactions never change, so instead of keeping one Transaction
+object per transaction forever, their fields are packed into growable NumPy
+columns (16-byte tx ids, int32 address numbers, float64 amounts) and each
+block keeps a TransactionRange view into them. Transaction objects are only
+rebuilt on access (to_dict, hashing, history lookups).
+"""
+import uuid
+from collections.abc import Sequence
+from typing import Iterator
+
+import numpy as np
+
+from balances import AddressTable
+from blockchain import Transaction
+
+_INITIAL_CAPACITY = 1024
+
+
+class ColumnarTransactionStore:
+    def __init__(self, addresses: AddressTable = None):
+        self.addresses = addresses or AddressTable()
+        self._size = 0
+        self._tx_ids = np.zeros((_INITIAL_CAPACITY, 16), dtype=np.uint8)
+        self._from = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._to = np.zeros(_INITIAL_CAPACITY, dtype=np.int32)
+        self._amount = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        self._fee = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        self._timestamp = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self._tx_ids, self._from, self._to, self._amount, self._fee, self._timestamp))
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = len(self._from)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_tx_ids", "_from", "_to", "_amount", "_fee", "_timestamp"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def extend(self, transactions: Sequence[Transaction]) -> "TransactionRange":
+        """Append transactions and return a view of them. tx ids must be UUID strings."""
+        count = len(transactions)
+        self._reserve(count)
+        start = self._size
+        end = start + count
+        number = self.addresses.number
+        self._tx_ids[start:end] = np.frombuffer(
+            b"".join(uuid.UUID(tx.tx_id).bytes for tx in transactions), dtype=np.uint8
+        ).reshape(count, 16)
+        self._from[start:end] = [number(tx.from_address) for tx in transactions]
+        self._to[start:end] = [number(tx.to_address) for tx in transactions]
+        self._amount[start:end] = [tx.amount for tx in transactions]
+        self._fee[start:end] = [tx.fee for tx in transactions]
+        self._timestamp[start:end] = [tx.timestamp for tx in transactions]
+        self._size = end
+        return TransactionRange(self, start, end)
+
+    def get(self, position: int) -> Transaction:
+        addresses = self.addresses.addresses
+        return Transaction(
+            tx_id=str(uuid.UUID(bytes=self._tx_ids[position].tobytes())),
+            from_address=addresses[self._from[position]],
+            to_address=addresses[self._to[position]],
+            amount=float(self._amount[position]),
+            fee=float(self._fee[position]),
+            timestamp=float(self._timestamp[position]),
+        )
+
+
+class TransactionRange(Sequence):
+    """Read-only list-like view of a block's transactions in a ColumnarTransactionStore."""
+
+    __slots__ = ("_store", "_start", "_end")
+
+    def __init__(self, store: ColumnarTransactionStore, start: int, end: int):
+        self._store = store
+        self._start = start
+        self._end = end
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._store.get(self._start + i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return self._store.get(self._start + index)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        get = self._store.get
+        for position in range(self._start, self._end):
+            yield get(position)
+
+    def copy(self) -> list[Transaction]:
+        return list(self)
@@ -0,0 +1,210 @@
+"""
+Full-chain verification.
+
+Three checks, reporting the first bad block:
+1. Every block's stored hash matches calculate_hash(). This is the expensive
+   part (JSON + SHA-256 per block), so height ranges are recomputed in a
+   ProcessPoolExecutor.
+2. Heights and previous_hash links are consistent (sequential, cheap).
+3. Replaying the chain keeps every balance non-negative, each block's
+   total_reward equals the scheduled subsidy plus its fees, and miner
+   shares sum to 1.
+
+Blocks are shipped to workers as plain tuples, which are much cheaper to
+pickle than to hash. Workers are spawned rather than forked: the server
+process already runs audio, chain-store and BLAS threads, and a forked child
+can inherit one of their locks held.
+
+A live ledger is verified from a LedgerSnapshot, taken where nothing else
+changes the ledger (on the event loop, between messages), so a transfer
+can't land between the supply check and the balance comparison.
+"""
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from blockchain import Block
+from config import INITIAL_REWARD, HALVING_INTERVAL, INITIAL_BALANCE
+
+_EPSILON = 1e-6
+# Below this many blocks, starting worker processes costs more than it saves
+_PARALLEL_MIN_BLOCKS = 2000
+
+
+@dataclass
+class VerificationResult:
+    ok: bool
+    blocks: int
+    first_bad_height: Optional[int] = None
+    reason: Optional[str] = None
+    seconds: float = 0.0
+    workers: int = 1
+    balances: dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "ok": self.ok,
+            "blocks": self.blocks,
+            "first_bad_height": self.first_bad_height,
+            "reason": self.reason,
+            "seconds": self.seconds,
+            "workers": self.workers,
+        }
+
+
+def _check_hashes(records: list[tuple]) -> Optional[int]:
+    """Worker: return the height of the first block whose hash doesn't match, if any."""
+    for record in records:
+        block = Block.from_record(record)
+        if block.calculate_hash() != block.hash:
+            return block.index
+    return None
+
+
+def _first_bad_hash(chain: list[Block], workers: int) -> Optional[int]:
+    if workers <= 1:
+        for block in chain:
+            if block.calculate_hash() != block.hash:
+                return block.index
+        return None
+
+    # Several ranges per worker keeps cores busy when blocks vary in size
+    chunk = max(1, -(-len(chain) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = [pool.submit(_check_hashes, [b.to_record() for b in chain[start:start + chunk]])
+                   for start in range(0, len(chain), chunk)]
+        # Ranges are in height order, so the first failing range holds the first bad block
+        for future in futures:
+            bad = future.result()
+            if bad is not None:
+                for other in futures:
+                    other.cancel()
+                return bad
+    return None
+
+
+def _check_links(chain: list[Block]) -> Optional[tuple[int, str]]:
+    for height, block in enumerate(chain):
+        if block.index != height:
+            return height, f"index {block.index} at height {height}"
+        if height > 0 and block.previous_hash != chain[height - 1].hash:
+            return height, "previous_hash does not match the parent block"
+    return None
+
+
+def _replay(chain: list[Block], balances: dict[str, float],
+            opening_balance: float) -> Optional[tuple[int, str]]:
+    for height, block in enumerate(chain):
+        if height == 0:
+            continue
+        fees = 0.0
+        for tx in block.transactions:
+            if tx.amount <= 0 or tx.fee < 0:
+                return height, f"transaction {tx.tx_id} has a non-positive amount or negative fee"
+            sender = balances.get(tx.from_address, opening_balance) - tx.amount - tx.fee
+            if sender < -_EPSILON:
+                return height, f"transaction {tx.tx_id} overdraws {tx.from_address}"
+            balances[tx.from_address] = sender
+            balances[tx.to_address] = balances.get(tx.to_address, opening_balance) + tx.amount
+            fees += tx.fee
+
+        # mine_block pays get_block_reward() for the chain length at mining time, i.e. this height
+        subsidy = INITIAL_REWARD / (2 ** (height // HALVING_INTERVAL))
+        if abs(block.total_reward - (subsidy + fees)) > _EPSILON * max(1.0, block.total_reward):
+            return height, f"total_reward {block.total_reward} != subsidy {subsidy} + fees {fees}"
+
+        shares = block.miner_contributions
+        if not shares or abs(sum(shares.values()) - 1.0) > _EPSILON:
+            return height, "miner shares do not sum to 1"
+        for miner, share in shares.items():
+            balances[miner] = balances.get(miner, opening_balance) + block.total_reward * share
+    return None
+
+
+def verify_chain(chain: list[Block], workers: Optional[int] = None,
+                 opening_balances: Optional[dict[str, float]] = None,
+                 opening_balance: float = INITIAL_BALANCE) -> VerificationResult:
+    """
+    Verify hashes, links and balances of `chain`.
+
+    `opening_balances` seeds known balances (e.g. restored users); any other
+    address starts at `opening_balance`. The replayed balances are returned
+    on the result for comparison with the live ledger.
+    """
+    start = time.perf_counter()
+    chain = list(chain)
+    workers = workers or os.cpu_count() or 1
+    if len(chain) < _PARALLEL_MIN_BLOCKS:
+        workers = 1
+    result = VerificationResult(ok=True, blocks=len(chain), workers=workers)
+
+    failures = []
+    bad_hash = _first_bad_hash(chain, workers)
+    if bad_hash is not None:
+        failures.append((bad_hash, "hash does not match block contents"))
+    bad_link = _check_links(chain)
+    if bad_link is not None:
+        failures.append(bad_link)
+    balances = dict(opening_balances or {})
+    bad_replay = _replay(chain, balances, opening_balance)
+    if bad_replay is not None:
+        failures.append(bad_replay)
+
+    if failures:
+        result.ok = False
+        result.first_bad_height, result.reason = min(failures, key=lambda f: f[0])
+    result.balances = balances
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+@dataclass
+class LedgerSnapshot:
+    """What verify_snapshot() compares a replay against, copied from a Blockchain at one instant."""
+    chain: list[Block]
+    pending: list
+    opening_balances: dict[str, float]
+    wallets: dict[str, float]  # Active user id -> balance
+    supply_problem: Optional[str]
+
+
+def snapshot_ledger(blockchain) -> LedgerSnapshot:
+    """Copy what verification needs. Cheap; take it on the thread that updates the ledger."""
+    return LedgerSnapshot(
+        chain=list(blockchain.chain),
+        pending=list(blockchain.pending_transactions),
+        opening_balances=dict(blockchain.opening_balances),
+        wallets={user.user_id: user.wallet.balance for user in blockchain.users.values()},
+        supply_problem=blockchain.check_supply(),
+    )
+
+
+def verify_snapshot(snapshot: LedgerSnapshot, workers: Optional[int] = None) -> VerificationResult:
+    """verify_chain() on a snapshot, also checking replayed balances against the active wallets."""
+    result = verify_chain(snapshot.chain, workers=workers, opening_balances=snapshot.opening_balances)
+    if not result.ok:
+        return result
+    if snapshot.supply_problem:
+        result.ok = False
+        result.reason = f"supply invariant: {snapshot.supply_problem}"
+        return result
+
+    # Pending transfers are already debited from the sender but not yet in a block
+    expected = dict(result.balances)
+    for tx in snapshot.pending:
+        expected[tx.from_address] = expected.get(tx.from_address, INITIAL_BALANCE) - tx.amount - tx.fee
+    for user_id, balance in snapshot.wallets.items():
+        replayed = expected.get(user_id, snapshot.opening_balances.get(user_id, INITIAL_BALANCE))
+        if abs(replayed - balance) > _EPSILON * max(1.0, abs(replayed)):
+            result.ok = False
+            result.reason = f"balance of {user_id} is {balance}, replay gives {replayed}"
+            break
+    return result
+
+
+def verify_blockchain(blockchain, workers: Optional[int] = None) -> VerificationResult:
+    """verify_snapshot() of a Blockchain nothing else is changing (startup, tools)."""
+    return verify_snapshot(snapshot_ledger(blockchain), workers)
@@ -0,0 +1,145 @@
+"""
+Event loop lag watchdog and on-demand sampling profiler.
+
+LoopWatchdog runs a heartbeat coroutine on the event loop and a plain thread
+that watches it. When the heartbeat goes quiet for longer than the threshold,
+the loop thread is stuck in a callback, so the watcher logs that thread's
+current stack - which points straight at the blocking call.
+
+SamplingProfiler periodically snapshots every thread's stack via
+sys._current_frames() and writes folded stacks (flamegraph.pl / speedscope
+format) to disk. It runs entirely outside the profiled code, so it can be
+turned on in production without restarting the service.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from metrics import LOOP_LAG_SECONDS, LOOP_STALLS
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float, interval: float):
+        self.threshold = threshold
+        self.interval = interval
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.perf_counter()
+        self._reported_beat: Optional[float] = None
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start monitoring the running event loop. Must be called from the loop thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._running = True
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        print(f"Loop watchdog started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while self._running:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            LOOP_LAG_SECONDS.observe(max(0.0, now - expected))
+            self._last_beat = now
+
+    def _watch(self):
+        while self._running:
+            time.sleep(self.interval / 2)
+            beat = self._last_beat
+            stalled_for = time.perf_counter() - beat - self.interval
+            # Report each stall once, while the loop is still stuck in it
+            if stalled_for > self.threshold and self._reported_beat != beat:
+                self._reported_beat = beat
+                LOOP_STALLS.inc()
+                self._log_stall(stalled_for)
+
+    def _log_stall(self, stalled_for: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+        print(f"[Watchdog] Event loop blocked for {stalled_for * 1000:.0f} ms+, loop thread stack:\n{stack}")
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir: str, interval: float = 0.005, max_seconds: float = 120.0):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float) -> bool:
+        """Profile for `seconds` in the background. Returns False if already running."""
+        if self.running:
+            return False
+        seconds = max(0.1, min(float(seconds), self.max_seconds))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(seconds,), name="sampling-profiler", daemon=True)
+        self._thread.start()
+        print(f"[Profiler] Sampling for {seconds:.1f}s")
+        return True
+
+    def stop(self) -> bool:
+        """Stop early; the samples collected so far are still written."""
+        if not self.running:
+            return False
+        self._stop.set()
+        return True
+
+    def _run(self, seconds: float):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.perf_counter() + seconds
+
+        while time.perf_counter() < deadline and not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+
+        path = self._write(stacks)
+        print(f"[Profiler] {samples} samples written to {path}")
+
+    def _write(self, stacks: Counter) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path